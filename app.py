@@ -6,7 +6,8 @@ import datetime as dt
 import pathlib
 from supabase import create_client, Client
 from dotenv import load_dotenv
-from collections import Counter
+import hashlib
+from functools import partial
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -30,22 +31,340 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 # GPT helpers
 from core.gpt_summaries import (
-    generate_issue_summary,
-    generate_smart_vehicle_summary,
-    generate_corrective_action
+    insight_index,
+    response_cache,
+    stream_vehicle_insight
 )
+from core.insight_streams import stream_concurrently
 
-# Load transformed data
+# Seconds each AI insight may take before its expander gives up on it
+AI_INSIGHT_TIMEOUT = 20
+
+from core.filter_index import DEFAULT_DATE_RANGE, FilterIndex, preset_dates
+from core.daily_rollup import day_bounds, normalize_rollup, select_rollup
+from core.trends import TrendStore
+from core.systemic import complaint_fingerprint, top_systemic_vehicles, vehicle_key
+from core.profiler import RenderProfiler, note_cache_miss
+from core.kpis import (
+    compute_kpis,
+    compute_kpis_from_rollup,
+    FIRST_TIME_FIX_TARGET,
+    REVENUE_PER_HOUR_TARGET,
+    PRODUCTIVITY_TARGET,
+    SATISFACTION_TARGET
+)
+
+# Render profiling: every run is appended to a local log; the timing panel is
+# only shown when the page is opened with ?admin=<DASHBOARD_ADMIN_KEY>
+DASHBOARD_ADMIN_KEY = os.getenv("DASHBOARD_ADMIN_KEY")
+RENDER_PROFILE_LOG = os.getenv("RENDER_PROFILE_LOG", str(pathlib.Path(__file__).parent / "logs" / "render_profile.jsonl"))
+profiler = RenderProfiler(RENDER_PROFILE_LOG)
+
+# Load transformed data (cached; the version string identifies the dataset for derived indexes)
+@st.cache_data(ttl=300, show_spinner=False)
 def load_transformed_data():
+    note_cache_miss()
     try:
         response = supabase.table("transformed_service_data").select("*").execute()
         if not response.data:
             st.warning("⚠️ No transformed data found. Please run build_transformed_service_data.py first.")
-            return pd.DataFrame()
-        return pd.DataFrame(response.data)
+            return pd.DataFrame(), None
+        df = pd.DataFrame(response.data)
+        data_version = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).values.tobytes()).hexdigest()
+        return df, data_version
     except Exception as e:
         st.error(f"❌ Error loading transformed data: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), None
+
+# AI insights precomputed by the transform pipeline (--with-insights), keyed by vehicle and
+# the complaint fingerprint they were generated from
+@st.cache_data(ttl=300, show_spinner=False)
+def load_vehicle_insights():
+    note_cache_miss()
+    try:
+        query = supabase.table("vehicle_insights").select("*")
+        if SHOP_ID:
+            query = query.eq("shop_id", SHOP_ID)
+        rows = query.order("generated_at", desc=True).execute().data or []
+    except Exception:
+        return {}
+    insights = {}
+    for row in rows:
+        insights.setdefault((vehicle_key(row["make"], row["model"], row["year"]), row["complaint_fingerprint"]), row)
+    return insights
+
+# Daily rollup maintained by the transform pipeline, read page by page (empty if the table isn't set up yet)
+@st.cache_data(ttl=300, show_spinner=False)
+def load_daily_rollup(page_size=1000):
+    note_cache_miss()
+    rows = []
+    try:
+        while True:
+            page = supabase.table("daily_rollup").select("*").order("shop_id").order("service_date") \
+                .range(len(rows), len(rows) + page_size - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+    except Exception:
+        rows = []
+    return normalize_rollup(pd.DataFrame(rows))
+
+# Sidebar filter index, built once per dataset version
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_filter_index(data_version, _df):
+    note_cache_miss()
+    return FilterIndex(_df)
+
+# Headline metrics, computed once per dataset version and filter state
+@st.cache_data(show_spinner=False, max_entries=64)
+def get_kpis(data_version, filter_state, _df_filtered):
+    note_cache_miss()
+    return compute_kpis(_df_filtered)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def get_rollup_kpis(data_version, filter_state, _rollup_rows, unique_customers):
+    note_cache_miss()
+    return compute_kpis_from_rollup(_rollup_rows, unique_customers)
+
+# Rolling/EWM trend engines, extended in place when a new dataset version only adds days
+@st.cache_resource(show_spinner=False)
+def get_trend_store():
+    return TrendStore()
+
+# The calculator owns its inputs, so it runs as a fragment: changing one of its
+# widgets reruns only the calculator, not the data load, filters or AI insights.
+@st.fragment
+def render_financial_calculator(kpis):
+    # Financial Impact Calculator
+    st.markdown("## 💰 Financial Impact Calculator")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("**📈 Investment Calculator**")
+        
+        # Training investment
+        training_cost = st.number_input(
+            "Training Investment ($):",
+            min_value=0,
+            max_value=50000,
+            value=5000,
+            step=500
+        )
+        
+        # Equipment investment
+        equipment_cost = st.number_input(
+            "Equipment Investment ($):",
+            min_value=0,
+            max_value=100000,
+            value=10000,
+            step=1000
+        )
+        
+        # Process improvement investment
+        process_cost = st.number_input(
+            "Process Improvement ($):",
+            min_value=0,
+            max_value=25000,
+            value=5000,
+            step=500
+        )
+        
+        total_investment = training_cost + equipment_cost + process_cost
+        
+        # Calculate ROI
+        annual_savings = kpis.potential_savings * 12  # Monthly to annual
+        roi_percentage = ((annual_savings - total_investment) / total_investment * 100) if total_investment > 0 else 0
+        payback_months = (total_investment / (kpis.potential_savings * 12)) if kpis.potential_savings > 0 else 0
+        
+        st.markdown(f"""
+        **Investment Summary:**
+        - **Total Investment:** ${total_investment:,.0f}
+        - **Annual Savings:** ${annual_savings:,.0f}
+        - **ROI:** {roi_percentage:.0f}%
+        - **Payback Period:** {payback_months:.1f} months
+        """)
+    
+    with col2:
+        st.markdown("**🎯 Break-Even Analysis**")
+        
+        # Break-even calculator
+        current_monthly_loss = kpis.estimated_loss
+        improvement_percentage = st.slider(
+            "Expected Improvement (%):",
+            min_value=10,
+            max_value=90,
+            value=70,
+            step=5
+        )
+        
+        monthly_savings = current_monthly_loss * (improvement_percentage / 100)
+        annual_savings_improved = monthly_savings * 12
+        
+        # Calculate break-even scenarios
+        break_even_training = training_cost / monthly_savings if monthly_savings > 0 else 0
+        break_even_equipment = equipment_cost / monthly_savings if monthly_savings > 0 else 0
+        break_even_total = total_investment / monthly_savings if monthly_savings > 0 else 0
+        
+        st.markdown(f"""
+        **Break-Even Analysis:**
+        - **Monthly Savings:** ${monthly_savings:,.0f}
+        - **Training Payback:** {break_even_training:.1f} months
+        - **Equipment Payback:** {break_even_equipment:.1f} months
+        - **Total Payback:** {break_even_total:.1f} months
+        """)
+        
+        # ROI recommendation
+        if roi_percentage > 200:
+            st.success("🚀 **Excellent ROI!** Strong case for investment.")
+        elif roi_percentage > 100:
+            st.info("✅ **Good ROI!** Investment recommended.")
+        elif roi_percentage > 50:
+            st.warning("⚠️ **Moderate ROI.** Consider phased approach.")
+        else:
+            st.error("❌ **Low ROI.** Focus on high-impact, low-cost improvements first.")
+
+def render_performance_forecasting(shop_trend, tech_trend, shop_id):
+    st.markdown("**📊 Performance Forecasting**")
+    
+    # Performance trend from the date-ordered daily series
+    if len(shop_trend) >= 2:
+        # Smoothed current level vs. the rolling mean at the start of the range
+        recent_efficiency = shop_trend["ewm_efficiency"].iloc[-1]
+        efficiency_trend = shop_trend["rolling_efficiency"].iloc[-1] - shop_trend["rolling_efficiency"].iloc[0]
+        
+        st.metric(
+            label="Efficiency Trend",
+            value=f"{recent_efficiency:.2f} hours",
+            delta=f"{efficiency_trend:.2f} hours",
+            delta_color="normal" if efficiency_trend < 0 else "inverse"
+        )
+        st.caption(f"Shop {shop_id}, all technicians, makes and complaints in the selected dates; "
+                   f"the loss threshold is not applied")
+        
+        # Predict next month performance
+        if efficiency_trend < 0:
+            st.success("📈 **Improving Trend** - Performance getting better!")
+        else:
+            st.warning("📉 **Declining Trend** - Immediate action needed!")
+        
+        # Predictive recommendations
+        st.markdown("**🤖 AI Recommendations:**")
+        if efficiency_trend > 0.5:
+            st.markdown("• **Immediate:** Schedule technician training")
+            st.markdown("• **Short-term:** Implement quality control checklist")
+            st.markdown("• **Long-term:** Consider equipment upgrades")
+        elif efficiency_trend > 0:
+            st.markdown("• **Monitor:** Keep current processes")
+            st.markdown("• **Optimize:** Fine-tune existing procedures")
+        else:
+            st.markdown("• **Maintain:** Current processes working well")
+            st.markdown("• **Scale:** Consider expanding successful methods")
+        
+        # Technicians whose rolling deviation rose the most over the range
+        tech_trend = tech_trend[tech_trend["technician"] != ""]
+        if not tech_trend.empty:
+            tech_change = tech_trend.groupby("technician")["rolling_efficiency"].agg(["first", "last"])
+            worsening = (tech_change["last"] - tech_change["first"]).sort_values(ascending=False)
+            worsening = worsening[worsening > 0].head(3)
+            if not worsening.empty:
+                st.markdown("**📉 Technicians Trending Worse:**")
+                for tech, change in worsening.items():
+                    st.markdown(f"• **{tech}**: +{change:.2f} hours deviation")
+
+def render_systemic_issues(df_filtered):
+    profiler.begin("Systemic issues", rows=len(df_filtered))
+    
+    # Detailed Systemic Issues Analysis
+    st.markdown("## 🔍 Detailed Systemic Issues Analysis")
+    
+    if "complaint" in df_filtered.columns:
+        systemic_issues = top_systemic_vehicles(df_filtered, n=5)
+        stored_insights = profiler.cached(load_vehicle_insights)
+        
+        # Display top systemic issues
+        ai_slots = {}
+        for i, issue in enumerate(systemic_issues):
+            total_impact = issue['total_impact']
+            issue_title = f"{issue['year']} {issue['make']} {issue['model']}: ${total_impact:,.2f} total impact"
+            
+            with st.expander(issue_title):
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.markdown(f"""
+                    **Financial Impact Breakdown:**
+                    - Estimated Loss: ${issue['total_loss']:,.2f}
+                    - Efficiency Loss: ${issue['efficiency_loss']:,.2f}
+                    - Misdiagnosis Cases: {issue['misdiagnosis_count']}
+                    - Recorded Complaints: {issue['complaint_count']}
+                    - Average Repair Cost: ${issue['avg_repair_cost']:,.2f}
+                    - Visit Frequency: {issue['visit_frequency']:.1f} visits/year
+                    """)
+                
+                with col2:
+                    st.markdown("**Common Complaints:**")
+                    for complaint, count in issue['complaint_counts'].most_common(3):
+                        st.write(f"• {complaint} ({count} times)")
+                
+                # Precomputed insights render immediately when they cover exactly the complaints in view
+                # (other filters change the fingerprint); the rest get placeholders filled concurrently below
+                stored = stored_insights.get((vehicle_key(issue['make'], issue['model'], issue['year']),
+                                              complaint_fingerprint(issue['complaints'])))
+                st.markdown("**AI Analysis:**")
+                if stored:
+                    st.info(stored["summary"])
+                else:
+                    ai_slots[(i, "summary")] = st.empty()
+                    ai_slots[(i, "summary")].caption("⏳ Generating analysis...")
+                st.markdown("**Recommended Action:**")
+                if stored:
+                    st.success(stored["corrective_action"])
+                    source = f" · reused from {stored['reused_from']}" if stored.get("reused_from") else ""
+                    st.caption(f"Precomputed insight · generated {str(stored.get('generated_at') or '')[:10]}{source}")
+                else:
+                    ai_slots[(i, "action")] = st.empty()
+                    ai_slots[(i, "action")].caption("⏳ Generating recommendations...")
+        
+        # One structured AI call per remaining vehicle, all launched at once; each
+        # streams its summary and corrective action into the vehicle's expander
+        profiler.begin("AI insights", rows=len(ai_slots) // 2)
+        cache_before = response_cache.stats()
+        ai_jobs = {}
+        for i, issue in enumerate(systemic_issues):
+            if (i, "summary") not in ai_slots:
+                continue
+            vehicle_args = (issue['make'], issue['model'], issue['year'], issue['complaints'], issue['diagnoses'], issue['parts'])
+            ai_jobs[i] = partial(stream_vehicle_insight, *vehicle_args, timeout=AI_INSIGHT_TIMEOUT)
+        
+        def render_ai_update(i, insight, status):
+            for field, slot_name, render in (("summary", "summary", "info"), ("corrective_action", "action", "success")):
+                slot = ai_slots[(i, slot_name)]
+                text = insight.get(field, "") if insight else ""
+                if not text:
+                    if status != "streaming":
+                        slot.warning("AI analysis temporarily unavailable")
+                    continue
+                if status == "timeout":
+                    text += " …"
+                elif status == "error":
+                    text += " … ⚠️ (response interrupted)"
+                if field == "corrective_action" and insight.get("reused_from"):
+                    with slot.container():
+                        st.success(text)
+                        st.caption(f"♻️ Reused from {insight['reused_from']} "
+                                   f"({insight['similarity']:.0%} similar complaints)")
+                    continue
+                getattr(slot, render)(text)
+        
+        stream_concurrently(ai_jobs, render_ai_update, timeout=AI_INSIGHT_TIMEOUT)
+        cache_after = response_cache.stats()
+        profiler.add_cache_stats(
+            hits=cache_after["hits"] - cache_before["hits"],
+            misses=cache_after["misses"] - cache_before["misses"],
+        )
+    
+    profiler.end()
 
 # Page configuration
 st.set_page_config(
@@ -103,7 +422,9 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-df = load_transformed_data()
+profiler.begin("Data load")
+df, data_version = profiler.cached(load_transformed_data)
+profiler.set_rows(len(df))
 
 if not df.empty:
     # Data preprocessing - use the actual column names from Supabase
@@ -115,6 +436,9 @@ if not df.empty:
     df["efficiency_deviation"] = pd.to_numeric(df["efficiency_deviation"], errors="coerce").fillna(0)
     df["efficiency_loss"] = pd.to_numeric(df["efficiency_loss"], errors="coerce").fillna(0)
     
+    profiler.begin("Filters", rows=len(df))
+    filter_index = profiler.cached(get_filter_index, data_version, df)
+    
     # Date range filter
     min_date = df["service_date"].min()
     max_date = df["service_date"].max()
@@ -157,21 +481,11 @@ if not df.empty:
     
     # Initialize session state if not exists
     if 'date_range' not in st.session_state:
-        st.session_state.date_range = "1y"
+        st.session_state.date_range = DEFAULT_DATE_RANGE
     
     # Handle quick selections
-    if st.session_state.date_range == "30d":
-        start_date = max_date - pd.DateOffset(days=30) if pd.notna(max_date) else dt.datetime.today() - pd.DateOffset(days=30)
-        end_date = max_date if pd.notna(max_date) else dt.datetime.today()
-    elif st.session_state.date_range == "6m":
-        start_date = max_date - pd.DateOffset(months=6) if pd.notna(max_date) else dt.datetime.today() - pd.DateOffset(months=6)
-        end_date = max_date if pd.notna(max_date) else dt.datetime.today()
-    elif st.session_state.date_range == "1y":
-        start_date = max_date - pd.DateOffset(years=1) if pd.notna(max_date) else dt.datetime.today() - pd.DateOffset(years=1)
-        end_date = max_date if pd.notna(max_date) else dt.datetime.today()
-    elif st.session_state.date_range == "all":
-        start_date = min_date if pd.notna(min_date) else dt.datetime.today() - pd.DateOffset(years=10)
-        end_date = max_date if pd.notna(max_date) else dt.datetime.today()
+    if st.session_state.date_range != "custom":
+        start_date, end_date = preset_dates(st.session_state.date_range, min_date, max_date)
     else:  # custom
         # Enhanced slider with better styling
         st.sidebar.markdown("---")
@@ -185,8 +499,8 @@ if not df.empty:
         custom_default_start = max_date - pd.DateOffset(months=3) if pd.notna(max_date) else dt.datetime.today() - pd.DateOffset(months=3)
         custom_default_end = max_date if pd.notna(max_date) else dt.datetime.today()
         
-    start_date, end_date = st.sidebar.slider(
-        "Select Date Range",
+        start_date, end_date = st.sidebar.slider(
+            "Select Date Range",
             min_value=slider_min,
             max_value=slider_max,
             value=(custom_default_start.to_pydatetime(), custom_default_end.to_pydatetime()),
@@ -203,9 +517,9 @@ if not df.empty:
         selected_days = (end_date - start_date).days
         st.sidebar.success(f"✅ **Custom Range:** {start_date.strftime('%b %d, %Y')} to {end_date.strftime('%b %d, %Y')} ({selected_days} days)")
     
-    # Add data summary for selected period
-    df_filtered = df[(df["service_date"] >= start_date) & (df["service_date"] <= end_date)]
-    records_in_period = len(df_filtered)
+    # Add data summary for selected period (binary search over the date-sorted index, whole days)
+    date_lo, date_hi = filter_index.date_window(*day_bounds(start_date, end_date))
+    records_in_period = date_hi - date_lo
     total_records = len(df)
     percentage = (records_in_period / total_records * 100) if total_records > 0 else 0
     
@@ -225,9 +539,12 @@ if not df.empty:
     st.sidebar.markdown("---")
     st.sidebar.markdown("**🔍 Interactive Filters**")
     
+    # Each multiselect offers the values still present under the filters chosen above it
+    active_filters = {}
+    
     # Technician Filter
-    if "technician" in df_filtered.columns:
-        all_technicians = ["All Technicians"] + sorted(df_filtered["technician"].unique().tolist())
+    if "technician" in df.columns:
+        all_technicians = ["All Technicians"] + filter_index.values_in("technician", date_lo, date_hi, active_filters)
         selected_technicians = st.sidebar.multiselect(
             "👨‍🔧 Filter by Technician:",
             all_technicians,
@@ -235,11 +552,11 @@ if not df.empty:
         )
         
         if "All Technicians" not in selected_technicians:
-            df_filtered = df_filtered[df_filtered["technician"].isin(selected_technicians)]
+            active_filters["technician"] = selected_technicians
     
     # Vehicle Make Filter
-    if "make" in df_filtered.columns:
-        all_makes = ["All Makes"] + sorted(df_filtered["make"].unique().tolist())
+    if "make" in df.columns:
+        all_makes = ["All Makes"] + filter_index.values_in("make", date_lo, date_hi, active_filters)
         selected_makes = st.sidebar.multiselect(
             "🚗 Filter by Vehicle Make:",
             all_makes,
@@ -247,11 +564,11 @@ if not df.empty:
         )
         
         if "All Makes" not in selected_makes:
-            df_filtered = df_filtered[df_filtered["make"].isin(selected_makes)]
+            active_filters["make"] = selected_makes
     
     # Complaint Type Filter
-    if "complaint" in df_filtered.columns:
-        all_complaints = ["All Complaints"] + sorted(df_filtered["complaint"].unique().tolist())
+    if "complaint" in df.columns:
+        all_complaints = ["All Complaints"] + filter_index.values_in("complaint", date_lo, date_hi, active_filters)
         selected_complaints = st.sidebar.multiselect(
             "🔧 Filter by Complaint Type:",
             all_complaints,
@@ -259,23 +576,56 @@ if not df.empty:
         )
         
         if "All Complaints" not in selected_complaints:
-            df_filtered = df_filtered[df_filtered["complaint"].isin(selected_complaints)]
+            active_filters["complaint"] = selected_complaints
     
     # Loss Threshold Filter
     st.sidebar.markdown("**💰 Loss Threshold Filter**")
     min_loss_threshold = st.sidebar.slider(
         "Minimum Loss Amount ($):",
         min_value=0,
-        max_value=int(df["estimated_loss"].max()) if len(df) > 0 else 1000,
+        max_value=int(filter_index.max_loss) if len(df) > 0 else 1000,
         value=0,
         step=100
     )
     
-    if min_loss_threshold > 0:
-        df_filtered = df_filtered[df_filtered["estimated_loss"] >= min_loss_threshold]
+    # Single row selection from the bitmap intersection - one frame copy for all filters
+    df_filtered = df.iloc[filter_index.select(date_lo, date_hi, active_filters, min_loss=min_loss_threshold)]
+    
+    profiler.begin("KPIs", rows=len(df_filtered))
+    filter_state = (
+        str(start_date),
+        str(end_date),
+        tuple((col, tuple(values)) for col, values in sorted(active_filters.items())),
+        min_loss_threshold,
+    )
+    # Unfiltered views sum the shop x day rollup; category filters and the loss threshold need raw rows.
+    # The rollup is only trusted when it covers exactly the selected rows (it lags a pipeline run otherwise).
+    kpis = None
+    if not active_filters and min_loss_threshold == 0:
+        shops = df_filtered["shop_id"].fillna("").astype(str).unique() if "shop_id" in df_filtered.columns else [""]
+        rollup_rows = select_rollup(load_daily_rollup(), start_date, end_date, shops)
+        if len(rollup_rows) and rollup_rows["job_count"].sum() == len(df_filtered):
+            unique_customers = int(df_filtered["customer_name"].nunique()) if "customer_name" in df_filtered.columns else 0
+            kpis = profiler.cached(get_rollup_kpis, data_version, filter_state, rollup_rows, unique_customers)
+    if kpis is None:
+        kpis = profiler.cached(get_kpis, data_version, filter_state, df_filtered)
+    
+    # Date-ordered trends for the shop in view (the configured shop, else the busiest one)
+    profiler.begin("Trends", rows=len(df))
+    trend_engines = get_trend_store().get(data_version, df)
+    shops_in_view = df_filtered["shop_id"].astype(str) if "shop_id" in df_filtered.columns else pd.Series("", index=df_filtered.index)
+    if SHOP_ID and (shops_in_view == SHOP_ID).any():
+        primary_shop = SHOP_ID
+    else:
+        primary_shop = shops_in_view.value_counts().idxmax() if len(shops_in_view) else ""
+    tech_scope = {"technician": active_filters["technician"]} if "technician" in active_filters else {}
+    shop_trend = trend_engines["shop"].series(start_date, end_date, shop_id=primary_shop)
+    tech_trend = trend_engines["technician"].series(start_date, end_date, shop_id=primary_shop, **tech_scope)
+    
+    profiler.begin("Summary & forecasting", rows=len(df_filtered))
     
     # Update records count after filtering
-    records_after_filter = len(df_filtered)
+    records_after_filter = kpis.total_jobs
     st.sidebar.markdown(f"**📊 Filtered Records:** {records_after_filter:,}")
 
     # Main dashboard
@@ -310,42 +660,37 @@ if not df.empty:
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_misdiagnosis = len(df_filtered[df_filtered["suspected_misdiagnosis"] == 1])
-        misdiagnosis_rate = (total_misdiagnosis / len(df_filtered)) * 100 if len(df_filtered) > 0 else 0
         st.markdown(f"""
         <div class="metric-highlight">
             <h3>🚨 Misdiagnosis Rate</h3>
-            <h2 style="color: #dc3545;">{misdiagnosis_rate:.1f}%</h2>
-            <p>{total_misdiagnosis} cases detected</p>
+            <h2 style="color: #dc3545;">{kpis.misdiagnosis_rate:.1f}%</h2>
+            <p>{kpis.misdiagnosis_cases} cases detected</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col2:
-        total_efficiency_loss = df_filtered["efficiency_loss"].sum()
         st.markdown(f"""
         <div class="metric-highlight">
             <h3>⏱️ Efficiency Loss</h3>
-            <h2 style="color: #fd7e14;">${total_efficiency_loss:,.2f}</h2>
+            <h2 style="color: #fd7e14;">${kpis.efficiency_loss:,.2f}</h2>
             <p>Lost due to inefficiency</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col3:
-        total_estimated_loss = df_filtered["estimated_loss"].sum()
         st.markdown(f"""
         <div class="metric-highlight">
             <h3>💰 Total Estimated Loss</h3>
-            <h2 style="color: #dc3545;">${total_estimated_loss:,.2f}</h2>
+            <h2 style="color: #dc3545;">${kpis.estimated_loss:,.2f}</h2>
             <p>Combined impact</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col4:
-        potential_savings = total_estimated_loss + total_efficiency_loss
         st.markdown(f"""
         <div class="metric-highlight">
             <h3>🎯 Potential Savings</h3>
-            <h2 style="color: #198754;">${potential_savings:,.2f}</h2>
+            <h2 style="color: #198754;">${kpis.potential_savings:,.2f}</h2>
             <p>With corrective action</p>
         </div>
         """, unsafe_allow_html=True)
@@ -357,137 +702,41 @@ if not df.empty:
     
     with col1:
         # First-time fix rate
-        total_jobs = len(df_filtered)
-        repeat_jobs = df_filtered["repeat_45d"].sum()
-        first_time_fix_rate = ((total_jobs - repeat_jobs) / total_jobs * 100) if total_jobs > 0 else 0
         st.metric(
             label="🎯 First-Time Fix Rate",
-            value=f"{first_time_fix_rate:.1f}%",
-            delta=f"{first_time_fix_rate - 85:.1f}%" if first_time_fix_rate > 0 else None,
-            delta_color="normal" if first_time_fix_rate >= 85 else "inverse"
+            value=f"{kpis.first_time_fix_rate:.1f}%",
+            delta=f"{kpis.first_time_fix_rate - FIRST_TIME_FIX_TARGET:.1f}%" if kpis.first_time_fix_rate > 0 else None,
+            delta_color="normal" if kpis.first_time_fix_rate >= FIRST_TIME_FIX_TARGET else "inverse"
         )
     
     with col2:
         # Revenue per hour
-        total_revenue = df_filtered["invoice_total"].sum()
-        total_hours = df_filtered["labor_hours_billed"].sum()
-        revenue_per_hour = total_revenue / total_hours if total_hours > 0 else 0
         st.metric(
             label="💵 Revenue per Hour",
-            value=f"${revenue_per_hour:.0f}",
-            delta=f"${revenue_per_hour - 120:.0f}" if revenue_per_hour > 0 else None,
-            delta_color="normal" if revenue_per_hour >= 120 else "inverse"
+            value=f"${kpis.revenue_per_hour:.0f}",
+            delta=f"${kpis.revenue_per_hour - REVENUE_PER_HOUR_TARGET:.0f}" if kpis.revenue_per_hour > 0 else None,
+            delta_color="normal" if kpis.revenue_per_hour >= REVENUE_PER_HOUR_TARGET else "inverse"
         )
     
     with col3:
-        # Technician productivity index
-        avg_efficiency = df_filtered["efficiency_deviation"].mean()
-        productivity_index = max(0, 100 - (avg_efficiency * 20))  # Convert to 0-100 scale
+        # Technician productivity index (0-100 scale)
         st.metric(
             label="👨‍🔧 Productivity Index",
-            value=f"{productivity_index:.0f}%",
-            delta=f"{productivity_index - 80:.0f}%" if productivity_index > 0 else None,
-            delta_color="normal" if productivity_index >= 80 else "inverse"
+            value=f"{kpis.productivity_index:.0f}%",
+            delta=f"{kpis.productivity_index - PRODUCTIVITY_TARGET:.0f}%" if kpis.productivity_index > 0 else None,
+            delta_color="normal" if kpis.productivity_index >= PRODUCTIVITY_TARGET else "inverse"
         )
     
     with col4:
         # Customer satisfaction score (based on repeat visits)
-        satisfaction_score = max(0, 100 - (repeat_jobs / total_jobs * 100)) if total_jobs > 0 else 0
         st.metric(
             label="😊 Customer Satisfaction",
-            value=f"{satisfaction_score:.0f}%",
-            delta=f"{satisfaction_score - 90:.0f}%" if satisfaction_score > 0 else None,
-            delta_color="normal" if satisfaction_score >= 90 else "inverse"
+            value=f"{kpis.satisfaction_score:.0f}%",
+            delta=f"{kpis.satisfaction_score - SATISFACTION_TARGET:.0f}%" if kpis.satisfaction_score > 0 else None,
+            delta_color="normal" if kpis.satisfaction_score >= SATISFACTION_TARGET else "inverse"
         )
 
-    # Financial Impact Calculator
-    st.markdown("## 💰 Financial Impact Calculator")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("**📈 Investment Calculator**")
-        
-        # Training investment
-        training_cost = st.number_input(
-            "Training Investment ($):",
-            min_value=0,
-            max_value=50000,
-            value=5000,
-            step=500
-        )
-        
-        # Equipment investment
-        equipment_cost = st.number_input(
-            "Equipment Investment ($):",
-            min_value=0,
-            max_value=100000,
-            value=10000,
-            step=1000
-        )
-        
-        # Process improvement investment
-        process_cost = st.number_input(
-            "Process Improvement ($):",
-            min_value=0,
-            max_value=25000,
-            value=5000,
-            step=500
-        )
-        
-        total_investment = training_cost + equipment_cost + process_cost
-        
-        # Calculate ROI
-        annual_savings = potential_savings * 12  # Monthly to annual
-        roi_percentage = ((annual_savings - total_investment) / total_investment * 100) if total_investment > 0 else 0
-        payback_months = (total_investment / (potential_savings * 12)) if potential_savings > 0 else 0
-        
-        st.markdown(f"""
-        **Investment Summary:**
-        - **Total Investment:** ${total_investment:,.0f}
-        - **Annual Savings:** ${annual_savings:,.0f}
-        - **ROI:** {roi_percentage:.0f}%
-        - **Payback Period:** {payback_months:.1f} months
-        """)
-    
-    with col2:
-        st.markdown("**🎯 Break-Even Analysis**")
-        
-        # Break-even calculator
-        current_monthly_loss = total_estimated_loss
-        improvement_percentage = st.slider(
-            "Expected Improvement (%):",
-            min_value=10,
-            max_value=90,
-            value=70,
-            step=5
-        )
-        
-        monthly_savings = current_monthly_loss * (improvement_percentage / 100)
-        annual_savings_improved = monthly_savings * 12
-        
-        # Calculate break-even scenarios
-        break_even_training = training_cost / monthly_savings if monthly_savings > 0 else 0
-        break_even_equipment = equipment_cost / monthly_savings if monthly_savings > 0 else 0
-        break_even_total = total_investment / monthly_savings if monthly_savings > 0 else 0
-        
-        st.markdown(f"""
-        **Break-Even Analysis:**
-        - **Monthly Savings:** ${monthly_savings:,.0f}
-        - **Training Payback:** {break_even_training:.1f} months
-        - **Equipment Payback:** {break_even_equipment:.1f} months
-        - **Total Payback:** {break_even_total:.1f} months
-        """)
-        
-        # ROI recommendation
-        if roi_percentage > 200:
-            st.success("🚀 **Excellent ROI!** Strong case for investment.")
-        elif roi_percentage > 100:
-            st.info("✅ **Good ROI!** Investment recommended.")
-        elif roi_percentage > 50:
-            st.warning("⚠️ **Moderate ROI.** Consider phased approach.")
-        else:
-            st.error("❌ **Low ROI.** Focus on high-impact, low-cost improvements first.")
+    render_financial_calculator(kpis)
 
     # Predictive Analytics Section
     st.markdown("## 🔮 Predictive Analytics & ML Insights")
@@ -498,21 +747,26 @@ if not df.empty:
         st.markdown("**🎯 Risk Prediction**")
         
         # Calculate risk factors for current data
-        if len(df_filtered) > 0:
-            # High-risk job prediction
-            high_risk_jobs = df_filtered[df_filtered["suspected_misdiagnosis"] == 1]
-            risk_percentage = (len(high_risk_jobs) / len(df_filtered) * 100) if len(df_filtered) > 0 else 0
-            
-            # Predict future misdiagnosis risk
-            avg_misdiagnosis_rate = df_filtered["suspected_misdiagnosis"].mean() * 100
-            predicted_risk = avg_misdiagnosis_rate * 1.1  # 10% increase prediction
+        if kpis.total_jobs > 0:
+            # Current rate and projected risk over the same scope: the trended shop in the date range
+            if not shop_trend.empty:
+                risk_percentage = shop_trend["misdiagnosis_cases"].sum() / shop_trend["jobs"].sum() * 100
+                # Projected risk: exponentially weighted daily misdiagnosis rate at the end of the range
+                predicted_risk = shop_trend["ewm_misdiagnosis"].iloc[-1] * 100
+                risk_delta = f"{predicted_risk - risk_percentage:.1f}%"
+            else:
+                risk_percentage = kpis.misdiagnosis_rate
+                risk_delta = None
             
             st.metric(
                 label="Current Misdiagnosis Risk",
                 value=f"{risk_percentage:.1f}%",
-                delta=f"{predicted_risk - risk_percentage:.1f}%",
+                delta=risk_delta,
                 delta_color="inverse"
             )
+            if not shop_trend.empty:
+                st.caption(f"Shop {primary_shop}, all makes and complaints in the selected dates; "
+                           f"delta is the projected (EWM) risk")
             
             # Risk factors analysis
             st.markdown("**Top Risk Factors:**")
@@ -522,46 +776,10 @@ if not df.empty:
                     st.markdown(f"• **{tech}**: {risk*100:.1f}% misdiagnosis rate")
     
     with col2:
-        st.markdown("**📊 Performance Forecasting**")
-        
-        # Performance trend prediction
-        if len(df_filtered) > 10:
-            # Calculate trend
-            recent_data = df_filtered.tail(10)
-            older_data = df_filtered.head(10)
-            
-            recent_efficiency = recent_data["efficiency_deviation"].mean()
-            older_efficiency = older_data["efficiency_deviation"].mean()
-            
-            efficiency_trend = recent_efficiency - older_efficiency
-            
-            st.metric(
-                label="Efficiency Trend",
-                value=f"{recent_efficiency:.2f} hours",
-                delta=f"{efficiency_trend:.2f} hours",
-                delta_color="normal" if efficiency_trend < 0 else "inverse"
-            )
-            
-            # Predict next month performance
-            if efficiency_trend < 0:
-                st.success("📈 **Improving Trend** - Performance getting better!")
-            else:
-                st.warning("📉 **Declining Trend** - Immediate action needed!")
-            
-            # Predictive recommendations
-            st.markdown("**🤖 AI Recommendations:**")
-            if efficiency_trend > 0.5:
-                st.markdown("• **Immediate:** Schedule technician training")
-                st.markdown("• **Short-term:** Implement quality control checklist")
-                st.markdown("• **Long-term:** Consider equipment upgrades")
-            elif efficiency_trend > 0:
-                st.markdown("• **Monitor:** Keep current processes")
-                st.markdown("• **Optimize:** Fine-tune existing procedures")
-            else:
-                st.markdown("• **Maintain:** Current processes working well")
-                st.markdown("• **Scale:** Consider expanding successful methods")
+        render_performance_forecasting(shop_trend, tech_trend, primary_shop)
 
     # Critical Alerts Section
+    profiler.begin("Alerts", rows=len(df_filtered))
     st.markdown("## 🚨 Critical Alerts & Systemic Issues")
     
     # Misdiagnosis Analysis
@@ -573,9 +791,9 @@ if not df.empty:
         st.markdown(f"""
         <div class="alert-box">
             <h4>⚠️ HIGH PRIORITY: Misdiagnosis Detection</h4>
-            <p><strong>Impact:</strong> ${misdiagnosis_data['estimated_loss'].sum():,.2f} in potential losses</p>
-            <p><strong>Frequency:</strong> {len(misdiagnosis_data)} cases ({misdiagnosis_rate:.1f}% of all service records)</p>
-            <p><strong>Risk Level:</strong> {'🔴 CRITICAL' if misdiagnosis_rate > 5 else '🟡 MODERATE' if misdiagnosis_rate > 2 else '🟢 LOW'}</p>
+            <p><strong>Impact:</strong> ${kpis.misdiagnosis_loss:,.2f} in potential losses</p>
+            <p><strong>Frequency:</strong> {kpis.misdiagnosis_cases} cases ({kpis.misdiagnosis_rate:.1f}% of all service records)</p>
+            <p><strong>Risk Level:</strong> {'🔴 CRITICAL' if kpis.misdiagnosis_rate > 5 else '🟡 MODERATE' if kpis.misdiagnosis_rate > 2 else '🟢 LOW'}</p>
         </div>
         """, unsafe_allow_html=True)
         
@@ -600,6 +818,7 @@ if not df.empty:
         st.success("✅ No suspected misdiagnoses detected in the selected date range.")
 
     # Technician Efficiency Analysis
+    profiler.begin("Technician analysis", rows=len(df_filtered))
     st.markdown("## 👨‍🔧 Technician Efficiency & Performance Analysis")
     
     # Efficiency deviation analysis
@@ -635,6 +854,7 @@ if not df.empty:
         st.success("✅ All technicians are performing within acceptable efficiency ranges.")
 
     # Systemic Problem Detection
+    profiler.begin("Vehicle issues & roadmap", rows=len(df_filtered))
     st.markdown("## 🔍 Systemic Problem Detection & Root Cause Analysis")
     
     # Vehicle-specific issues
@@ -670,8 +890,6 @@ if not df.empty:
     st.markdown("## 💡 Actionable Insights & Strategic Recommendations")
     
     # Calculate key insights
-    total_customers = df_filtered['customer_name'].nunique()
-    avg_repair_cost = df_filtered['invoice_total'].mean()
     most_problematic_make = vehicle_issues.loc[vehicle_issues['Total_Impact'].idxmax(), 'make'] if not vehicle_issues.empty else "N/A"
     worst_technician = efficiency_analysis.loc[efficiency_analysis['efficiency_deviation'].idxmax(), 'technician'] if not efficiency_analysis.empty else "N/A"
     
@@ -682,11 +900,11 @@ if not df.empty:
         <div class="insight-box">
             <h4>🎯 Key Performance Insights</h4>
             <ul>
-                <li><strong>Customer Base:</strong> {total_customers} unique customers affected</li>
-                <li><strong>Average Repair Cost:</strong> ${avg_repair_cost:.2f}</li>
+                <li><strong>Customer Base:</strong> {kpis.unique_customers} unique customers affected</li>
+                <li><strong>Average Repair Cost:</strong> ${kpis.avg_repair_cost:.2f}</li>
                 <li><strong>Most Problematic Make:</strong> {most_problematic_make}</li>
                 <li><strong>Technician Needing Training:</strong> {worst_technician}</li>
-                <li><strong>Potential Annual Savings:</strong> ${potential_savings * 12:,.2f}</li>
+                <li><strong>Potential Annual Savings:</strong> ${kpis.potential_savings * 12:,.2f}</li>
             </ul>
         </div>
         """, unsafe_allow_html=True)
@@ -715,10 +933,10 @@ if not df.empty:
         <div class="roadmap-box">
             <h4>📋 Phase 1: Immediate Actions (Week 1-2)</h4>
             <ul>
-                <li>🔧 Review all {len(misdiagnosis_data)} misdiagnosis cases</li>
+                <li>🔧 Review all {kpis.misdiagnosis_cases} misdiagnosis cases</li>
                 <li>👨‍🔧 Schedule training for {worst_technician}</li>
                 <li>📊 Implement diagnostic checklist system</li>
-                <li>💰 Expected Savings: ${potential_savings * 0.1:,.2f}</li>
+                <li>💰 Expected Savings: ${kpis.potential_savings * 0.1:,.2f}</li>
             </ul>
         </div>
         
@@ -728,7 +946,7 @@ if not df.empty:
                 <li>🎓 Complete technician training program</li>
                 <li>🔍 Implement quality control procedures</li>
                 <li>📈 Establish performance monitoring</li>
-                <li>💰 Expected Savings: ${potential_savings * 0.3:,.2f}</li>
+                <li>💰 Expected Savings: ${kpis.potential_savings * 0.3:,.2f}</li>
             </ul>
         </div>
         """, unsafe_allow_html=True)
@@ -741,7 +959,7 @@ if not df.empty:
                 <li>🏗️ Redesign diagnostic workflows</li>
                 <li>🤝 Implement technician mentoring</li>
                 <li>📱 Deploy digital diagnostic tools</li>
-                <li>💰 Expected Savings: ${potential_savings * 0.5:,.2f}</li>
+                <li>💰 Expected Savings: ${kpis.potential_savings * 0.5:,.2f}</li>
             </ul>
         </div>
         
@@ -751,80 +969,26 @@ if not df.empty:
                 <li>📊 Advanced analytics integration</li>
                 <li>🎯 Predictive maintenance systems</li>
                 <li>🌟 Continuous improvement culture</li>
-                <li>💰 Expected Savings: ${potential_savings:,.2f}</li>
+                <li>💰 Expected Savings: ${kpis.potential_savings:,.2f}</li>
             </ul>
         </div>
         """, unsafe_allow_html=True)
 
-    # Detailed Systemic Issues Analysis
-    st.markdown("## 🔍 Detailed Systemic Issues Analysis")
-    
-    if "complaint" in df_filtered.columns:
-        # Group by vehicle and analyze patterns
-        vehicle_groups = df_filtered.groupby(["make", "model", "year"])
-        
-        # Create a more sophisticated analysis
-        systemic_issues = []
-        for (make, model, year), group in vehicle_groups:
-            if len(group) >= 2:  # Only vehicles with multiple visits
-            complaints = group["complaint"].dropna().tolist()
-                total_loss = group["estimated_loss"].sum()
-                efficiency_loss = group["efficiency_loss"].sum()
-                misdiagnosis_count = group["suspected_misdiagnosis"].sum()
-                avg_repair_cost = group["invoice_total"].mean()
-                visit_frequency = len(group) / ((group["service_date"].max() - group["service_date"].min()).days / 365)
-                
-                if total_loss > 0 or efficiency_loss > 0 or misdiagnosis_count > 0:
-                    systemic_issues.append({
-                        'make': make,
-                        'model': model,
-                        'year': year,
-                        'total_loss': total_loss,
-                        'efficiency_loss': efficiency_loss,
-                        'misdiagnosis_count': misdiagnosis_count,
-                        'avg_repair_cost': avg_repair_cost,
-                        'visit_frequency': visit_frequency,
-                        'complaints': complaints
-                    })
-        
-        # Sort by total impact
-        systemic_issues.sort(key=lambda x: x['total_loss'] + x['efficiency_loss'], reverse=True)
-        
-        # Display top systemic issues
-        for i, issue in enumerate(systemic_issues[:5]):
-            total_impact = issue['total_loss'] + issue['efficiency_loss']
-            issue_title = f"{issue['year']} {issue['make']} {issue['model']}: ${total_impact:,.2f} total impact"
-            
-            with st.expander(issue_title):
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.markdown(f"""
-                    **Financial Impact Breakdown:**
-                    - Estimated Loss: ${issue['total_loss']:,.2f}
-                    - Efficiency Loss: ${issue['efficiency_loss']:,.2f}
-                    - Misdiagnosis Cases: {issue['misdiagnosis_count']}
-                    - Average Repair Cost: ${issue['avg_repair_cost']:,.2f}
-                    - Visit Frequency: {issue['visit_frequency']:.1f} visits/year
-                    """)
-                
-                with col2:
-                    st.markdown("**Common Complaints:**")
-                    complaint_counts = Counter(issue['complaints'])
-                    for complaint, count in complaint_counts.most_common(3):
-                        st.write(f"• {complaint} ({count} times)")
-                
-                # Generate AI insights
-                try:
-                    ai_summary = generate_smart_vehicle_summary(issue['make'], issue['model'], issue['year'], issue['complaints'])
-                    st.markdown("**AI Analysis:**")
-                    st.info(ai_summary)
-                    
-                    corrective_action = generate_corrective_action(issue['make'], issue['model'], issue['year'], issue['complaints'])
-                    st.markdown("**Recommended Action:**")
-                    st.success(corrective_action)
-                except:
-                    st.warning("AI analysis temporarily unavailable")
+    render_systemic_issues(df_filtered)
 
 else:
     st.warning("⚠️ No data available. Please seed and transform service records first.")
+
+# Render profile for this run: always logged, shown to admins only
+profiler.flush()
+if DASHBOARD_ADMIN_KEY and st.query_params.get("admin") == DASHBOARD_ADMIN_KEY:
+    with st.expander("🛠️ Render Profile (admin)"):
+        profile = profiler.summary()
+        st.caption(f"Total render time: {profile['total_ms']:,.0f} ms · logged to {RENDER_PROFILE_LOG}")
+        st.dataframe(pd.DataFrame(profile["sections"]), hide_index=True, use_container_width=True)
+        gpt_cache = response_cache.stats()
+        st.caption(
+            f"GPT response cache: {gpt_cache['hits']} hits, {gpt_cache['misses']} misses "
+            f"({gpt_cache['hit_rate']:.0%} hit rate), {gpt_cache['entries']} entries; "
+            f"{insight_index.reused} insights reused from similar vehicles"
+        )
@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server'
 import { createClient } from '@supabase/supabase-js'
+import { scoreRows } from '@/lib/scoring/client'
 
 export const dynamic = 'force-dynamic'
 
@@ -41,12 +42,24 @@ export async function GET(request: Request) {
       return NextResponse.json({ recommendations: [] })
     }
 
+    // Request model scores first so the service works while the recommendations are computed
+    const scoringRequest = scoreRows(data)
     const recommendations = generateActionRecommendations(data)
+    const scoring = await scoringRequest
 
     return NextResponse.json({ 
       recommendations,
       analysis_date: new Date().toISOString(),
-      data_points_analyzed: data.length
+      data_points_analyzed: data.length,
+      // null when the local scoring service (scoring_server.py) is not running
+      model_predictions: scoring && {
+        model: scoring.model,
+        flagged: scoring.predictions.filter(p => p.predicted_misdiagnosis > 0).length,
+        by_label: scoring.predictions.reduce((acc, p) => {
+          acc[p.label] = (acc[p.label] || 0) + 1
+          return acc
+        }, {} as Record<string, number>)
+      }
     })
 
   } catch (error) {
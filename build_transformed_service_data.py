@@ -8,6 +8,10 @@ from sklearn.cluster import KMeans
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+from core.daily_rollup import ROLLUP_KEYS, build_daily_rollup, diff_rollup, rollup_records
+from core.feature_store import write_snapshot
+from core.systemic import complaint_fingerprint, insight_scopes, top_systemic_vehicles, vehicle_key
+
 # Load environment variables safely
 env_path = pathlib.Path(__file__).parent / ".env"
 if not env_path.exists():
@@ -49,7 +53,8 @@ def load_service_data(shop_id=None, limit=None, csv_path="data/service_data.csv"
         print(f"ERROR: Could not load CSV file: {e}")
         return pd.DataFrame()
 
-def build_transformed_service_data(shop_id=None, batch_size=1000, labor_rate=80, csv_path="data/service_data.csv"):
+def build_transformed_service_data(shop_id=None, batch_size=1000, labor_rate=80, csv_path="data/service_data.csv",
+                                   with_insights=False, insights_top_n=5):
     """
     Build transformed service data with realistic calculations
     
@@ -58,6 +63,8 @@ def build_transformed_service_data(shop_id=None, batch_size=1000, labor_rate=80,
         batch_size: Number of records to process in each batch
         labor_rate: Hourly labor rate for loss calculations (default: $80/hour)
         csv_path: Path to CSV file to read from (default: data/service_data.csv)
+        with_insights: Also precompute AI insights for each shop's top systemic vehicles
+        insights_top_n: Number of systemic vehicles per shop to precompute insights for
     """
     df = load_service_data(shop_id or SHOP_ID, csv_path=csv_path)
     if df.empty:
@@ -374,6 +381,13 @@ def build_transformed_service_data(shop_id=None, batch_size=1000, labor_rate=80,
     # END OF OLD FINANCIAL MODEL - NOW USING DATA-DRIVEN MODEL
     # The estimated_loss column is set by the enhanced financial model above
 
+    # Materialise the engineered features for train_model and scoring
+    try:
+        snapshot = write_snapshot(df, shop_id=shop_id or SHOP_ID)
+        print(f"SUCCESS: Wrote feature snapshot {snapshot['id']} ({snapshot['rows']} rows)")
+    except Exception as e:
+        print(f"ERROR: Could not write feature snapshot: {e}")
+
     # Prepare records for Supabase
     records = df.to_dict(orient="records")
     
@@ -382,7 +396,7 @@ def build_transformed_service_data(shop_id=None, batch_size=1000, labor_rate=80,
     schema_columns = [
         'vin', 'service_date', 'invoice_total', 'labor_hours_billed', 'odometer_reading',
         'make', 'model', 'year', 'complaint', 'customer_name', 'customer_contact',
-        'diagnosis', 'recommended', 'parts_used', 'technician',
+        'diagnosis', 'recommended', 'service_performed', 'parts_used', 'technician',
         'efficiency_deviation', 'efficiency_loss', 'estimated_loss', 'repeat_45d', 
         'complaint_similarity', 'cluster_id', 'suspected_misdiagnosis', 'shop_id'
     ]
@@ -402,6 +416,9 @@ def build_transformed_service_data(shop_id=None, batch_size=1000, labor_rate=80,
                 record[key] = None
     
     save_transformed_data(filtered_records, shop_id or SHOP_ID, batch_size)
+    sync_daily_rollup(df, shop_id or SHOP_ID, batch_size)
+    if with_insights:
+        sync_vehicle_insights(df, insights_top_n)
 
     print("\n=== Label Distribution ===")
     print(df["suspected_misdiagnosis"].value_counts())
@@ -646,6 +663,145 @@ def save_transformed_data(records, shop_id, batch_size):
 
     print(f"SUCCESS: Total records saved: {total_inserted}/{len(records)}")
 
+def fetch_daily_rollup(shop_id, page_size=1000):
+    """Read the stored daily rollup for a shop, page by page (PostgREST caps each response)."""
+    rows = []
+    start = 0
+    while True:
+        query = supabase.table("daily_rollup").select("*")
+        if shop_id:
+            query = query.eq("shop_id", shop_id)
+        page = query.order("service_date").range(start, start + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return pd.DataFrame(rows)
+        start += page_size
+
+def sync_daily_rollup(df, shop_id, batch_size):
+    """
+    Bring the daily rollup (shop x day) in line with this run.
+
+    Only days whose counts or sums changed are upserted, and days that no
+    longer occur are deleted per shop in batches, so a run that touched a few
+    days writes a few rows.
+    """
+    print("Updating daily rollup...")
+    rollup = build_daily_rollup(df)
+
+    try:
+        existing = fetch_daily_rollup(shop_id)
+    except Exception as e:
+        print(f"WARNING: Could not read existing rollup, rewriting it: {e}")
+        existing = pd.DataFrame()
+
+    changed, stale = diff_rollup(rollup, existing)
+    records = rollup_records(changed)
+
+    upserted = 0
+    for i in range(0, len(records), batch_size):
+        batch = records[i:i + batch_size]
+        try:
+            supabase.table("daily_rollup").upsert(batch, on_conflict=",".join(ROLLUP_KEYS)).execute()
+            upserted += len(batch)
+        except Exception as e:
+            print(f"ERROR: Error upserting rollup batch {i//batch_size + 1}: {e}")
+
+    removed = 0
+    for shop, shop_stale in stale.groupby("shop_id"):
+        days = [record["service_date"] for record in rollup_records(shop_stale)]
+        for i in range(0, len(days), batch_size):
+            batch = days[i:i + batch_size]
+            try:
+                supabase.table("daily_rollup").delete().eq("shop_id", shop).in_("service_date", batch).execute()
+                removed += len(batch)
+            except Exception as e:
+                print(f"ERROR: Error removing stale rollup days for shop '{shop}': {e}")
+
+    print(f"SUCCESS: Daily rollup has {len(rollup)} rows ({upserted} upserted, {removed} removed, "
+          f"{len(rollup) - len(changed)} unchanged)")
+
+def sync_vehicle_insights(df, top_n=5):
+    """
+    Precompute AI summaries and corrective actions for each shop's top systemic vehicles.
+
+    Vehicles are picked with the dashboard's criteria (core.systemic), once over the
+    full history and once over the date window the dashboard opens on. Insights are
+    regenerated only when a vehicle's complaint fingerprint changed since the stored
+    row; vehicles that dropped out of a scope's top list are removed.
+    """
+    # Imported here so the pipeline runs without an OpenAI key when this stage is off
+    from core.gpt_summaries import CHAT_MODEL, generate_vehicle_insights_batch
+
+    print("Updating vehicle insights...")
+    shops = df.groupby(df["shop_id"].fillna("").astype(str)) if "shop_id" in df.columns else [("", df)]
+
+    for shop, shop_df in shops:
+        for scope, scope_df in insight_scopes(shop_df).items():
+            issues = top_systemic_vehicles(scope_df, n=top_n)
+            try:
+                stored = supabase.table("vehicle_insights").select("make,model,year,complaint_fingerprint") \
+                    .eq("shop_id", shop).eq("scope", scope).execute().data or []
+            except Exception as e:
+                print(f"WARNING: Could not read existing vehicle insights for shop '{shop}' ({scope}): {e}")
+                stored = []
+            stored_fingerprints = {
+                vehicle_key(row["make"], row["model"], row["year"]): row["complaint_fingerprint"] for row in stored
+            }
+
+            stale_issues = []
+            for issue in issues:
+                issue["key"] = vehicle_key(issue["make"], issue["model"], issue["year"])
+                issue["fingerprint"] = complaint_fingerprint(issue["complaints"])
+                if stored_fingerprints.get(issue["key"]) != issue["fingerprint"]:
+                    stale_issues.append(issue)
+
+            regenerated = 0
+            if stale_issues:
+                vehicles = [(i["make"], i["model"], i["year"], i["complaints"], i["diagnoses"], i["parts"]) for i in stale_issues]
+                insights = generate_vehicle_insights_batch(vehicles)
+                records = []
+                for issue, insight in zip(stale_issues, insights):
+                    if insight.get("fallback"):
+                        # Template stand-ins aren't stored, so the next run asks the API again
+                        print(f"WARNING: No insight generated for {issue['year']} {issue['make']} {issue['model']}")
+                        continue
+                    make, model, year = issue["key"]
+                    records.append({
+                        "shop_id": shop,
+                        "scope": scope,
+                        "make": make,
+                        "model": model,
+                        "year": year,
+                        "complaint_fingerprint": issue["fingerprint"],
+                        "complaint_count": int(issue["complaint_count"]),
+                        "total_impact": round(float(issue["total_impact"]), 2),
+                        "summary": insight["summary"],
+                        "corrective_action": insight["corrective_action"],
+                        "reused_from": insight.get("reused_from"),
+                        "model_name": CHAT_MODEL,
+                        "generated_at": pd.Timestamp.now(tz="UTC").isoformat(),
+                    })
+                try:
+                    if records:
+                        supabase.table("vehicle_insights").upsert(records, on_conflict="shop_id,scope,make,model,year").execute()
+                        regenerated = len(records)
+                except Exception as e:
+                    print(f"ERROR: Error saving vehicle insights for shop '{shop}' ({scope}): {e}")
+                    continue
+
+            current = {issue["key"] for issue in issues}
+            removed = 0
+            for make, model, year in set(stored_fingerprints) - current:
+                try:
+                    supabase.table("vehicle_insights").delete() \
+                        .match({"shop_id": shop, "scope": scope, "make": make, "model": model, "year": year}).execute()
+                    removed += 1
+                except Exception as e:
+                    print(f"ERROR: Error removing vehicle insight {year} {make} {model}: {e}")
+
+            print(f"SUCCESS: Shop '{shop}' ({scope}): {len(issues)} systemic vehicles ({regenerated} regenerated, "
+                  f"{len(issues) - len(stale_issues)} unchanged, {removed} removed)")
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
@@ -654,10 +810,13 @@ if __name__ == "__main__":
     parser.add_argument("--labor-rate", type=float, default=80.0, help="Hourly labor rate for calculations")
     parser.add_argument("--csv-path", default="data/service_data.csv", help="Path to CSV file to read from")
     parser.add_argument("--clear", action="store_true")
+    parser.add_argument("--with-insights", action="store_true", help="Precompute AI insights for top systemic vehicles")
+    parser.add_argument("--insights-top-n", type=int, default=5, help="Systemic vehicles per shop to precompute insights for")
     args = parser.parse_args()
 
     if args.clear:
         supabase.table("transformed_service_data").delete().execute()
         print("SUCCESS: Cleared transformed data for ALL shops")
 
-    build_transformed_service_data(args.shop_id, args.batch_size, args.labor_rate, args.csv_path)
+    build_transformed_service_data(args.shop_id, args.batch_size, args.labor_rate, args.csv_path,
+                                   with_insights=args.with_insights, insights_top_n=args.insights_top_n)
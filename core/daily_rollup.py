@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+# One rollup row per shop x day; category filters need the raw rows
+ROLLUP_KEYS = ["shop_id", "service_date"]
+
+# Additive measures summed from the transformed rows
+SUM_COLUMNS = [
+    "estimated_loss",
+    "efficiency_loss",
+    "efficiency_deviation",
+    "labor_hours_billed",
+    "invoice_total",
+    "repeat_45d",
+    "misdiagnosis_cases",
+    "misdiagnosis_loss",
+]
+MEASURE_COLUMNS = ["job_count"] + SUM_COLUMNS
+
+
+def day_bounds(start_date, end_date):
+    """
+    Whole-day bounds for an inclusive date range: midnight of the first day to
+    the last instant of the last day. Raw-row windows and rollup selections both
+    go through this so they cover the same days.
+    """
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+    return start, end
+
+
+def build_daily_rollup(df):
+    """
+    Aggregate transformed service rows into the daily rollup.
+
+    A missing shop is stored as "" so the key stays usable as a primary key.
+    Rows without a valid service date are dropped.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=ROLLUP_KEYS + MEASURE_COLUMNS)
+
+    work = pd.DataFrame(index=df.index)
+    work["shop_id"] = df["shop_id"].fillna("").astype(str) if "shop_id" in df.columns else ""
+    work["service_date"] = pd.to_datetime(df["service_date"], errors="coerce").dt.normalize()
+
+    for col in ["estimated_loss", "efficiency_loss", "efficiency_deviation",
+                "labor_hours_billed", "invoice_total", "repeat_45d"]:
+        work[col] = pd.to_numeric(df[col], errors="coerce").fillna(0) if col in df.columns else 0
+
+    if "suspected_misdiagnosis" in df.columns:
+        misdiagnosed = pd.to_numeric(df["suspected_misdiagnosis"], errors="coerce") == 1
+    else:
+        misdiagnosed = pd.Series(False, index=df.index)
+    work["misdiagnosis_cases"] = misdiagnosed.astype(int)
+    work["misdiagnosis_loss"] = np.where(misdiagnosed, work["estimated_loss"], 0.0)
+
+    work = work.dropna(subset=["service_date"])
+    return work.groupby(ROLLUP_KEYS, sort=True).agg(
+        job_count=("estimated_loss", "size"),
+        **{col: (col, "sum") for col in SUM_COLUMNS},
+    ).reset_index()
+
+
+def normalize_rollup(rollup):
+    """Coerce rollup rows read back from the database to the dtypes build_daily_rollup produces."""
+    if rollup.empty:
+        return pd.DataFrame(columns=ROLLUP_KEYS + MEASURE_COLUMNS)
+    rollup = rollup[[col for col in ROLLUP_KEYS + MEASURE_COLUMNS if col in rollup.columns]].copy()
+    rollup["shop_id"] = rollup["shop_id"].fillna("").astype(str)
+    rollup["service_date"] = pd.to_datetime(rollup["service_date"], errors="coerce").dt.normalize()
+    for col in MEASURE_COLUMNS:
+        rollup[col] = pd.to_numeric(rollup[col], errors="coerce").fillna(0) if col in rollup.columns else 0
+    return rollup.sort_values(ROLLUP_KEYS, ignore_index=True)
+
+
+def diff_rollup(new, existing):
+    """
+    Compare a freshly built rollup with the stored one.
+
+    Returns (changed, stale): rollup rows that are new or whose measures
+    differ, and the keys of stored rows that no longer exist.
+    """
+    existing = normalize_rollup(existing)
+    merged = new.merge(existing, on=ROLLUP_KEYS, how="outer", suffixes=("", "_old"), indicator=True)
+
+    # atol absorbs the DECIMAL rounding applied by the stored table
+    differs = merged["_merge"] == "left_only"
+    for col in MEASURE_COLUMNS:
+        differs |= ~np.isclose(merged[col].astype(float), merged[f"{col}_old"].astype(float), atol=0.01)
+    changed = merged[(merged["_merge"] != "right_only") & differs][ROLLUP_KEYS + MEASURE_COLUMNS]
+    stale = merged[merged["_merge"] == "right_only"][ROLLUP_KEYS]
+    return changed.reset_index(drop=True), stale.reset_index(drop=True)
+
+
+def rollup_records(rollup):
+    """Rollup rows (or bare keys) as JSON-serialisable dicts for Supabase."""
+    out = rollup.copy()
+    out["service_date"] = out["service_date"].dt.strftime("%Y-%m-%d")
+    for col in ["job_count", "repeat_45d", "misdiagnosis_cases"]:
+        if col in out.columns:
+            out[col] = out[col].astype(int)
+    return out.to_dict(orient="records")
+
+
+def select_rollup(rollup, start_date, end_date, shops=None):
+    """Rollup rows for the days in the inclusive range (see day_bounds), optionally limited to some shops."""
+    start, end = day_bounds(start_date, end_date)
+    days = rollup["service_date"]
+    mask = (days >= start) & (days <= end)
+    if shops is not None:
+        mask &= rollup["shop_id"].isin(shops)
+    return rollup[mask]
@@ -0,0 +1,185 @@
+"""
+Versioned feature snapshots shared by the transform pipeline, training and scoring.
+
+Every feature is declared once in FEATURES. build_transformed_service_data
+computes them and calls `write_snapshot`, which checks the frame against the
+catalogue, fixes each column's dtype and writes an immutable snapshot plus an
+entry in the manifest. train_model and scoring code call `load_snapshot`, so
+they read exactly the values the pipeline computed instead of recomputing
+them from a differently shaped CSV.
+"""
+import hashlib
+import json
+import os
+import pathlib
+from dataclasses import dataclass
+
+import pandas as pd
+
+FEATURE_STORE_DIR = str(pathlib.Path(__file__).parent.parent / "data" / "feature_store")
+# Bump when a feature's definition changes; snapshots from other versions are not loaded by default
+FEATURE_SET_VERSION = 1
+# Snapshots kept on disk; older ones are pruned when a new one is written
+SNAPSHOTS_TO_KEEP = 10
+
+ID_COLUMNS = ["shop_id", "vin", "service_date", "make", "model", "complaint", "technician"]
+# Identifies a service record across snapshots (features like complaint_similarity are recomputed every run)
+RECORD_KEY = ["shop_id", "vin", "service_date", "complaint"]
+TARGET = "suspected_misdiagnosis"
+# Value stored for missing categorical features, so training and scoring encode gaps identically
+MISSING_CATEGORY = "unknown"
+
+
+@dataclass(frozen=True)
+class Feature:
+    name: str
+    kind: str  # "numeric" or "categorical"
+    description: str
+
+
+FEATURES = [
+    Feature("invoice_total", "numeric", "Invoice total in dollars"),
+    Feature("labor_hours_billed", "numeric", "Labor hours billed on the job"),
+    Feature("odometer_reading", "numeric", "Odometer at check-in"),
+    Feature("year", "numeric", "Vehicle model year"),
+    Feature("vehicle_age", "numeric", "Current year minus model year"),
+    Feature("expected_hours", "numeric", "Mean labor hours for the job's complaint"),
+    Feature("efficiency_deviation", "numeric", "Labor hours billed minus expected hours"),
+    Feature("efficiency_loss", "numeric", "Hours beyond 120% of expected hours"),
+    Feature("tech_vs_expected_pct", "numeric", "Efficiency deviation as a percentage of expected hours"),
+    Feature("repeat_45d", "numeric", "1 if the VIN was seen within the previous 45 days"),
+    Feature("complaint_similarity", "numeric", "Mean TF-IDF cosine similarity to all complaints"),
+    Feature("cluster_id", "numeric", "KMeans cluster of efficiency loss and complaint similarity"),
+    Feature("vehicle_complexity_score", "numeric", "Mean labor hours for the make and model"),
+    Feature("tech_job_count", "numeric", "Jobs handled by the technician"),
+    Feature("revenue_per_hour", "numeric", "Invoice total per labor hour"),
+    Feature("is_weekend", "numeric", "1 if serviced on a Saturday or Sunday"),
+    Feature("risk_score", "numeric", "Count of efficiency, repeat, complexity and weekend risk flags"),
+    Feature("estimated_loss", "numeric", "Data-driven loss estimate from enhanced_financial_model"),
+    Feature("service_performed", "categorical", "Service performed on the job"),
+    Feature("job_complexity", "categorical", "Labor-hour band (Quick .. Overhaul)"),
+]
+FEATURE_KINDS = {feature.name: feature.kind for feature in FEATURES}
+
+# Inputs of the misdiagnosis model
+MODEL_NUMERIC_FEATURES = [
+    "efficiency_deviation", "efficiency_loss", "invoice_total", "labor_hours_billed",
+    "odometer_reading", "year", "repeat_45d", "complaint_similarity", "estimated_loss", "cluster_id",
+]
+MODEL_CATEGORICAL_FEATURES = ["service_performed"]
+
+
+def _manifest_path(store_dir):
+    return pathlib.Path(store_dir) / "manifest.json"
+
+
+def read_manifest(store_dir=FEATURE_STORE_DIR):
+    """Snapshot entries, oldest first."""
+    try:
+        with open(_manifest_path(store_dir)) as f:
+            return json.load(f)["snapshots"]
+    except FileNotFoundError:
+        return []
+
+
+def _write_manifest(snapshots, store_dir):
+    path = _manifest_path(store_dir)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"snapshots": snapshots}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def materialize(df):
+    """
+    Snapshot-ready frame: id columns, every catalogue feature and the target, with fixed dtypes.
+
+    Raises ValueError if the frame lacks a catalogue feature.
+    """
+    missing = [feature.name for feature in FEATURES if feature.name not in df.columns]
+    if missing:
+        raise ValueError(f"Frame is missing features: {', '.join(missing)}")
+
+    out = pd.DataFrame(index=df.index)
+    for col in ID_COLUMNS:
+        if col in df.columns:
+            out[col] = df[col]
+    for feature in FEATURES:
+        if feature.kind == "numeric":
+            out[feature.name] = pd.to_numeric(df[feature.name], errors="coerce").astype("float64")
+        else:
+            out[feature.name] = df[feature.name].astype(object).where(df[feature.name].notna(), MISSING_CATEGORY).astype(str)
+    if TARGET in df.columns:
+        out[TARGET] = pd.to_numeric(df[TARGET], errors="coerce").fillna(0).astype("int64")
+    return out.reset_index(drop=True)
+
+
+def write_snapshot(df, shop_id=None, store_dir=FEATURE_STORE_DIR, keep=SNAPSHOTS_TO_KEEP):
+    """Materialise `df` as a new immutable snapshot; returns its manifest entry."""
+    features = materialize(df)
+    store = pathlib.Path(store_dir)
+    store.mkdir(parents=True, exist_ok=True)
+
+    content_hash = hashlib.sha256(pd.util.hash_pandas_object(features, index=False).to_numpy().tobytes()).hexdigest()
+    created_at = pd.Timestamp.now(tz="UTC")
+    snapshot_id = f"v{FEATURE_SET_VERSION}-{created_at:%Y%m%dT%H%M%S}-{content_hash[:8]}"
+    path = store / f"{snapshot_id}.csv"
+    tmp_path = store / f"{snapshot_id}.csv.tmp"
+    features.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+    entry = {
+        "id": snapshot_id,
+        "path": path.name,
+        "feature_set_version": FEATURE_SET_VERSION,
+        "created_at": created_at.isoformat(),
+        "shop_id": shop_id,
+        "rows": len(features),
+        "content_hash": content_hash,
+        "columns": {col: str(dtype) for col, dtype in features.dtypes.items()},
+    }
+    snapshots = read_manifest(store_dir) + [entry]
+    for old in snapshots[:-keep] if keep else []:
+        (store / old["path"]).unlink(missing_ok=True)
+    _write_manifest(snapshots[-keep:] if keep else snapshots, store_dir)
+    return entry
+
+
+def resolve_snapshot(snapshot_id=None, store_dir=FEATURE_STORE_DIR):
+    """Manifest entry for `snapshot_id`, or the newest snapshot of the current feature set version."""
+    snapshots = read_manifest(store_dir)
+    if snapshot_id in (None, "latest"):
+        current = [s for s in snapshots if s["feature_set_version"] == FEATURE_SET_VERSION]
+        if not current:
+            raise FileNotFoundError(
+                f"No feature snapshot for version {FEATURE_SET_VERSION} in {store_dir}; "
+                "run build_transformed_service_data.py first"
+            )
+        return current[-1]
+    for entry in snapshots:
+        if entry["id"] == snapshot_id:
+            return entry
+    raise FileNotFoundError(f"Feature snapshot '{snapshot_id}' not found in {store_dir}")
+
+
+def load_snapshot(snapshot_id=None, columns=None, store_dir=FEATURE_STORE_DIR):
+    """
+    Read a snapshot (default: the latest) with the dtypes it was written with.
+
+    Returns (frame, manifest entry). `columns` limits the columns read.
+    """
+    entry = resolve_snapshot(snapshot_id, store_dir)
+    usecols = list(columns) if columns is not None else None
+    wanted = {col: dtype for col, dtype in entry["columns"].items() if usecols is None or col in usecols}
+    dates = [col for col, dtype in wanted.items() if dtype.startswith("datetime")]
+    df = pd.read_csv(
+        pathlib.Path(store_dir) / entry["path"],
+        usecols=usecols,
+        dtype={col: dtype for col, dtype in wanted.items() if col not in dates},
+        parse_dates=dates,
+        # Empty cells are missing values; other text (e.g. a service called "None") is read verbatim
+        keep_default_na=False,
+        na_values={col: [""] for col in wanted if FEATURE_KINDS.get(col) != "categorical"},
+        float_precision="round_trip",
+    )
+    return df, entry
@@ -0,0 +1,122 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+# Sidebar multiselect columns, in the order the dashboard applies them
+CATEGORY_COLUMNS = ("technician", "make", "complaint")
+
+# Sidebar date presets ending at the latest service date; the dashboard opens on DEFAULT_DATE_RANGE
+DATE_PRESET_OFFSETS = {
+    "30d": pd.DateOffset(days=30),
+    "6m": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+}
+DEFAULT_DATE_RANGE = "1y"
+
+
+def preset_dates(preset, min_date, max_date):
+    """(start, end) of a date preset ("30d", "6m", "1y" or "all") for data spanning min_date..max_date."""
+    end = max_date if pd.notna(max_date) else pd.Timestamp(dt.datetime.today())
+    if preset == "all":
+        start = min_date if pd.notna(min_date) else end - pd.DateOffset(years=10)
+    else:
+        start = end - DATE_PRESET_OFFSETS[preset]
+    return start, end
+
+
+class FilterIndex:
+    """
+    Precomputed row index for the dashboard sidebar filters.
+
+    Built once per dataset. Rows are kept in service-date order so a date
+    range is a contiguous slice found by binary search. Each technician,
+    make and complaint value gets a packed row bitmap (in the same date
+    order), so combining filters is a bitwise AND over the selected window
+    and yields a single array of row positions - no intermediate frames.
+    """
+
+    def __init__(self, df, date_col="service_date", loss_col="estimated_loss",
+                 category_columns=CATEGORY_COLUMNS):
+        self.n_rows = len(df)
+        self._n_bytes = (self.n_rows + 7) // 8
+
+        dates = pd.to_datetime(df[date_col], errors="coerce").to_numpy(dtype="datetime64[ns]")
+        # NaT sorts last, so undated rows sit after the searchable prefix
+        self.order = np.argsort(dates, kind="stable")
+        sorted_dates = dates[self.order]
+        self.dates = sorted_dates[~np.isnat(sorted_dates)]
+
+        if loss_col in df.columns:
+            loss = pd.to_numeric(df[loss_col], errors="coerce").fillna(0).to_numpy()
+            self.loss = loss[self.order]
+            self.max_loss = float(loss.max()) if len(loss) else 0.0
+        else:
+            self.loss = None
+            self.max_loss = 0.0
+
+        self.categories = {}
+        self.codes = {}
+        self.bitmaps = {}
+        self._lookup = {}
+        for col in category_columns:
+            if col not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[col], sort=True)
+            codes = codes[self.order]
+            self.categories[col] = uniques.tolist()
+            self.codes[col] = codes
+            self._lookup[col] = {value: i for i, value in enumerate(self.categories[col])}
+            self.bitmaps[col] = self._build_bitmaps(codes, len(uniques))
+
+    def _build_bitmaps(self, codes, n_values):
+        """One packed bitmap per category code, built in a single pass over the rows."""
+        bitmaps = np.zeros((n_values, self._n_bytes), dtype=np.uint8)
+        positions = np.flatnonzero(codes >= 0)
+        np.bitwise_or.at(
+            bitmaps,
+            (codes[positions], positions >> 3),
+            (0x80 >> (positions & 7)).astype(np.uint8),
+        )
+        return bitmaps
+
+    def date_window(self, start_date, end_date):
+        """Return the [lo, hi) slice of date-ordered rows within the inclusive range."""
+        start = np.datetime64(pd.Timestamp(start_date), "ns")
+        end = np.datetime64(pd.Timestamp(end_date), "ns")
+        lo = int(np.searchsorted(self.dates, start, side="left"))
+        hi = int(np.searchsorted(self.dates, end, side="right"))
+        return lo, max(lo, hi)
+
+    def _window_mask(self, lo, hi, filters):
+        """Intersect the selected category bitmaps over the window [lo, hi)."""
+        b0, b1 = lo >> 3, (hi + 7) >> 3
+        packed = None
+        for col, values in (filters or {}).items():
+            if col not in self.bitmaps:
+                continue
+            lookup = self._lookup[col]
+            codes = [lookup[v] for v in values if v in lookup]
+            col_bits = np.bitwise_or.reduce(self.bitmaps[col][codes, b0:b1], axis=0) \
+                if codes else np.zeros(b1 - b0, dtype=np.uint8)
+            packed = col_bits if packed is None else packed & col_bits
+
+        if packed is None:
+            return np.ones(hi - lo, dtype=bool)
+        offset = lo - (b0 << 3)
+        return np.unpackbits(packed)[offset:offset + (hi - lo)].view(bool)
+
+    def values_in(self, column, lo, hi, filters=None):
+        """Sorted distinct values of `column` among the rows selected by the window and filters."""
+        if column not in self.codes:
+            return []
+        codes = self.codes[column][lo:hi][self._window_mask(lo, hi, filters)]
+        present = np.bincount(codes[codes >= 0], minlength=len(self.categories[column]))
+        return [self.categories[column][i] for i in np.flatnonzero(present)]
+
+    def select(self, lo, hi, filters=None, min_loss=0):
+        """Row positions (into the indexed frame, in service-date order) matching every filter."""
+        mask = self._window_mask(lo, hi, filters)
+        if min_loss > 0 and self.loss is not None:
+            mask &= self.loss[lo:hi] >= min_loss
+        return self.order[lo:hi][mask]
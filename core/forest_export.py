@@ -0,0 +1,320 @@
+"""
+Flat, array-backed copy of the misdiagnosis pipeline for low-latency scoring.
+
+`export_forest` flattens the fitted preprocessor (imputer + scaler for numeric
+columns, one-hot encoding for categorical ones) and every tree of the forest
+into contiguous numpy arrays saved as one .npz file. `CompactForest` scores
+rows with numpy alone: all trees are walked together, one vectorised step per
+tree level, instead of a ColumnTransformer, a DataFrame and 200 per-tree
+calls. A single row passed as a dict skips pandas entirely (about 10 us to
+prepare) and is scored in about 0.3 ms, against about 45 ms through the
+pipeline (200 trees of depth up to 35, one core; `--verify` prints the figures
+for a given model). What remains is the tree walk, one numpy step per level
+of the row's deepest path. DataFrame input goes through pandas coercion
+and is slower per row. Large batches are still faster through
+MisdiagnosisScorer; this path is for per-request scoring.
+
+Predictions match `predict_misdiagnosis` exactly: inputs are prepared the same
+way (missing columns and unparseable values become 0), features are computed
+in float64 and cast to float32 as sklearn's trees do, and per-tree
+probabilities are summed in tree order before averaging.
+
+    python -m core.forest_export --verify latest
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.feature_store import load_snapshot
+from core.ml_model import LABEL_MAP, MODEL_DIR, MODEL_PATH, get_scorer, load_model
+
+COMPACT_MODEL_PATH = os.path.join(MODEL_DIR, "model_compact.npz")
+
+
+def _numeric_block(transformer, cols):
+    """(fill values, mean, scale) for a numeric sub-pipeline of imputer/scaler steps."""
+    fill = np.zeros(len(cols))
+    mean = np.zeros(len(cols))
+    scale = np.ones(len(cols))
+    steps = transformer.named_steps.values() if hasattr(transformer, "named_steps") else [transformer]
+    for step in steps:
+        name = type(step).__name__
+        if name == "SimpleImputer":
+            fill = np.asarray(step.statistics_, dtype=np.float64)
+        elif name == "StandardScaler":
+            if step.mean_ is not None:
+                mean = np.asarray(step.mean_, dtype=np.float64)
+            if step.scale_ is not None:
+                scale = np.asarray(step.scale_, dtype=np.float64)
+        elif step != "passthrough":
+            raise ValueError(f"Unsupported numeric preprocessing step: {name}")
+    return fill, mean, scale
+
+
+def _categorical_block(transformer, cols):
+    """(fill values, categories per column) for an imputer/one-hot sub-pipeline."""
+    fill = [None] * len(cols)
+    categories = None
+    for step in transformer.named_steps.values():
+        name = type(step).__name__
+        if name == "SimpleImputer":
+            fill = list(step.statistics_)
+        elif name == "OneHotEncoder":
+            if step.drop is not None:
+                raise ValueError("One-hot encoders with drop= are not supported")
+            categories = [list(c) for c in step.categories_]
+        else:
+            raise ValueError(f"Unsupported categorical preprocessing step: {name}")
+    if categories is None:
+        raise ValueError("Categorical pipeline has no OneHotEncoder")
+    return fill, categories
+
+
+def export_forest(model, path=COMPACT_MODEL_PATH):
+    """Flatten a fitted Pipeline(preprocessor, RandomForestClassifier) into `path` (.npz)."""
+    preprocessor = model.named_steps["preprocessor"]
+    forest = model.named_steps["classifier"]
+    if getattr(forest, "n_outputs_", 1) != 1:
+        raise ValueError("Only single-output forests can be exported")
+
+    num_cols, num_fill, num_mean, num_scale = [], [], [], []
+    cat_cols, cat_fill, categories = [], [], []
+    for _, transformer, cols in preprocessor.transformers_:
+        if transformer == "drop" or len(cols) == 0:
+            continue
+        steps = transformer.named_steps.values() if hasattr(transformer, "named_steps") else [transformer]
+        if any(type(step).__name__ == "OneHotEncoder" for step in steps):
+            fill, cats = _categorical_block(transformer, cols)
+            cat_cols.extend(cols)
+            cat_fill.extend(fill)
+            categories.extend(cats)
+        else:
+            fill, mean, scale = _numeric_block(transformer, cols)
+            num_cols.extend(cols)
+            num_fill.append(fill)
+            num_mean.append(mean)
+            num_scale.append(scale)
+    if getattr(preprocessor, "remainder", "drop") != "drop" and getattr(preprocessor, "_remainder", (None, None, []))[2]:
+        raise ValueError("ColumnTransformer remainder columns are not supported")
+
+    # All trees in one node table; child indices are global, leaves point at themselves
+    feature, threshold, left, right, missing_left, leaf_proba, roots = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        node_ids = np.arange(tree.node_count) + offset
+        feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        threshold.append(tree.threshold.astype(np.float64))
+        left.append(np.where(is_leaf, node_ids, tree.children_left + offset).astype(np.int64))
+        right.append(np.where(is_leaf, node_ids, tree.children_right + offset).astype(np.int64))
+        missing = getattr(tree, "missing_go_to_left", None)
+        missing_left.append(np.asarray(missing if missing is not None else np.zeros(tree.node_count), dtype=bool))
+        leaf_proba.append(tree.value[:, 0, :forest.n_classes_].astype(np.float64))
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += tree.node_count
+
+    flat_categories = [str(v) for cats in categories for v in cats]
+    np.savez(
+        path,
+        num_cols=np.array(num_cols, dtype=str),
+        num_fill=np.concatenate(num_fill) if num_fill else np.zeros(0),
+        num_mean=np.concatenate(num_mean) if num_mean else np.zeros(0),
+        num_scale=np.concatenate(num_scale) if num_scale else np.zeros(0),
+        cat_cols=np.array(cat_cols, dtype=str),
+        cat_fill=np.array([str(v) for v in cat_fill], dtype=str),
+        cat_values=np.array(flat_categories, dtype=str),
+        cat_offsets=np.cumsum([0] + [len(c) for c in categories]).astype(np.int64),
+        feature=np.concatenate(feature),
+        threshold=np.concatenate(threshold),
+        left=np.concatenate(left),
+        right=np.concatenate(right),
+        missing_left=np.concatenate(missing_left),
+        leaf_proba=np.concatenate(leaf_proba),
+        roots=np.array(roots, dtype=np.int64),
+        max_depth=np.array(max_depth),
+        classes=np.asarray(forest.classes_),
+    )
+    return path
+
+
+def _as_float(value):
+    """pd.to_numeric(errors="coerce") for one value, with missing or unparseable values as 0."""
+    if isinstance(value, str) and (not value.isascii() or "_" in value):
+        # float() accepts digit separators and non-ASCII digits; pandas doesn't
+        return 0.0
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if value != value else value
+
+
+def _is_missing(value):
+    """Whether Series.fillna would replace `value`."""
+    return pd.api.types.is_scalar(value) and bool(pd.isna(value))
+
+
+class CompactForest:
+    """Pure-numpy evaluator for a model written by export_forest."""
+
+    def __init__(self, path=COMPACT_MODEL_PATH):
+        data = np.load(path)
+        self.num_cols = data["num_cols"].tolist()
+        self.num_fill = data["num_fill"]
+        self.num_mean = data["num_mean"]
+        self.num_scale = data["num_scale"]
+        self.cat_cols = data["cat_cols"].tolist()
+        self.cat_fill = data["cat_fill"].tolist()
+        offsets = data["cat_offsets"]
+        values = data["cat_values"]
+        self.categories = [values[offsets[i]:offsets[i + 1]] for i in range(len(self.cat_cols))]
+        self.feature = data["feature"]
+        self.threshold = data["threshold"]
+        self.left = data["left"]
+        self.right = data["right"]
+        self.missing_left = data["missing_left"]
+        self.leaf_proba = data["leaf_proba"]
+        self.roots = data["roots"]
+        self.max_depth = int(data["max_depth"])
+        self.classes = data["classes"]
+        self.class_labels = {cls: LABEL_MAP.get(cls, f"Unknown ({cls})") for cls in self.classes.tolist()}
+        self.n_features = len(self.num_cols) + int(offsets[-1])
+
+        # Single-row fast path: one-hot positions by value, children side by side, leaf flags
+        self._onehot = [
+            {value: len(self.num_cols) + int(offsets[i]) + j for j, value in enumerate(values[offsets[i]:offsets[i + 1]].tolist())}
+            for i in range(len(self.cat_cols))
+        ]
+        self._children = np.stack([self.left, self.right], axis=1)
+        self._is_leaf = self.left == np.arange(len(self.left))
+
+    def _numeric(self, rows):
+        """Float64 numeric inputs, prepared like MisdiagnosisScorer (missing/unparseable -> 0)."""
+        values = np.column_stack([
+            pd.to_numeric(rows[col], errors="coerce").to_numpy(dtype=np.float64)
+            if col in rows.columns else np.zeros(len(rows))
+            for col in self.num_cols
+        ]) if self.num_cols else np.zeros((len(rows), 0))
+        return np.where(np.isnan(values), 0.0, values)
+
+    def _transform_record(self, record):
+        """transform() for one dict without pandas; same values, bit for bit."""
+        x = np.zeros(self.n_features)
+        numeric = np.array([_as_float(record.get(col, 0)) for col in self.num_cols], dtype=np.float64)
+        x[:len(self.num_cols)] = (numeric - self.num_mean) / self.num_scale
+        for col, onehot in zip(self.cat_cols, self._onehot):
+            value = record.get(col, 0)
+            position = onehot.get("0" if _is_missing(value) else str(value))
+            if position is not None:
+                x[position] = 1.0
+        return x.astype(np.float32)
+
+    def transform(self, rows):
+        """Preprocessed float32 feature matrix, exactly as the pipeline hands it to the forest."""
+        if isinstance(rows, dict):
+            return self._transform_record(rows).reshape(1, -1)
+        numeric = self._numeric(rows)
+        numeric = np.where(np.isnan(numeric), self.num_fill, numeric)
+        numeric = (numeric - self.num_mean) / self.num_scale
+        blocks = [numeric]
+        n = numeric.shape[0]
+        for col, fill, cats in zip(self.cat_cols, self.cat_fill, self.categories):
+            raw = rows[col] if col in rows.columns else pd.Series(0, index=rows.index)
+            raw = raw.fillna(0).astype(str).to_numpy()
+            blocks.append((raw[:, None] == cats[None, :]).astype(np.float64))
+        features = np.hstack(blocks) if len(blocks) > 1 else numeric
+        return features.reshape(n, -1).astype(np.float32)
+
+    def _predict_proba_record(self, record):
+        """
+        Probabilities for one dict. Each level only steps the trees that haven't
+        reached a leaf yet, so the walk stops at the row's deepest path instead
+        of max_depth.
+        """
+        x = self._transform_record(record)
+        nodes = self.roots.copy()
+        active = np.flatnonzero(~self._is_leaf[nodes])
+        while active.size:
+            current = nodes[active]
+            # Prepared features are never NaN, so the missing-value branch is not needed here
+            step = self._children[current, (x[self.feature[current]] > self.threshold[current]).view(np.int8)]
+            nodes[active] = step
+            active = active[~self._is_leaf[step]]
+        proba = np.cumsum(self.leaf_proba[nodes], axis=0)[-1]
+        return (proba / len(self.roots)).reshape(1, -1)
+
+    def predict_proba(self, rows):
+        """Class probabilities for a DataFrame of rows or a single row given as a dict."""
+        if isinstance(rows, dict):
+            return self._predict_proba_record(rows)
+        X = self.transform(rows)
+        n = X.shape[0]
+        row_index = np.arange(n)[:, None]
+        nodes = np.broadcast_to(self.roots, (n, len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            values = X[row_index, self.feature[nodes]]
+            go_left = np.where(np.isnan(values), self.missing_left[nodes], values <= self.threshold[nodes])
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        # cumsum adds trees strictly in order, reproducing the forest's running sum bit for bit
+        proba = np.cumsum(self.leaf_proba[nodes], axis=1)[:, -1]
+        return proba / len(self.roots)
+
+    def predict(self, rows):
+        return self.classes.take(np.argmax(self.predict_proba(rows), axis=1))
+
+    def score(self, df):
+        """Same output as MisdiagnosisScorer.score: a new frame of predictions indexed like `df`."""
+        preds = self.predict(df)
+        labels = pd.Series(preds, index=df.index).map(self.class_labels).fillna("Unknown")
+        return pd.DataFrame({"Predicted_Misdiagnosis": preds, "Prediction_Label": labels}, index=df.index)
+
+
+def verify(compact, model, df):
+    """Compare the compact evaluator with predict_misdiagnosis on `df`; returns (mismatches, timings)."""
+    start = time.perf_counter()
+    expected = get_scorer(model).score(df)["Predicted_Misdiagnosis"].to_numpy()
+    sklearn_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = compact.predict(df)
+    compact_seconds = time.perf_counter() - start
+
+    records = df.head(200).to_dict("records")
+    start = time.perf_counter()
+    for record in records:
+        compact.predict(record)
+    single_row_us = (time.perf_counter() - start) / max(len(records), 1) * 1e6
+
+    return int((expected != actual).sum()), {
+        "pipeline_batch_seconds": sklearn_seconds,
+        "compact_batch_seconds": compact_seconds,
+        "compact_single_row_us": single_row_us,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--out", default=COMPACT_MODEL_PATH)
+    parser.add_argument("--verify", help="Feature snapshot id ('latest') or CSV of rows to check predictions against predict_misdiagnosis")
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    export_forest(model, args.out)
+    print(f"SUCCESS: Exported {len(model.named_steps['classifier'].estimators_)} trees to {args.out}")
+
+    if args.verify:
+        compact = CompactForest(args.out)
+        rows = pd.read_csv(args.verify) if args.verify.endswith(".csv") else load_snapshot(args.verify)[0]
+        mismatches, timings = verify(compact, model, rows)
+        for name, value in timings.items():
+            print(f"{name:<24} {value:10.4f}")
+        if mismatches:
+            raise SystemExit(f"ERROR: {mismatches} predictions differ from predict_misdiagnosis")
+        print("SUCCESS: Predictions identical to predict_misdiagnosis")
@@ -1,8 +1,17 @@
 import os
+import re
+import json
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from core.insight_reuse import InsightIndex, complaint_counts, weighted_jaccard
+from core.insight_templates import template_corrective_action, template_summary
+from core.openai_client import CircuitBreaker, ResilientClient
+from core.prompt_context import build_vehicle_context, estimate_tokens
+from core.response_cache import ResponseCache
+
 # Load environment variables safely
 env_path = pathlib.Path(__file__).parent.parent / ".env"
 if not env_path.exists():
@@ -13,59 +22,464 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError(f"❌ OPENAI_API_KEY not found in .env at {env_path}")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Retries are handled by the wrapper below; OPENAI_BASE_URL can point at mock_openai_server.py
+client = OpenAI(
+    api_key=OPENAI_API_KEY,
+    base_url=os.getenv("OPENAI_BASE_URL") or None,
+    timeout=float(os.getenv("GPT_REQUEST_TIMEOUT", "30")),
+    max_retries=0,
+)
+
+# Rate-limited, retrying, circuit-breaking access shared by every call in this process
+api = ResilientClient(
+    client,
+    requests_per_minute=int(os.getenv("GPT_REQUESTS_PER_MINUTE", "300")),
+    max_retries=int(os.getenv("GPT_MAX_RETRIES", "3")),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("GPT_BREAKER_FAILURES", "5")),
+        reset_timeout=float(os.getenv("GPT_BREAKER_RESET_SECONDS", "30")),
+    ),
+)
+
+CHAT_MODEL = "gpt-4o-mini"
+
+# Estimated tokens of complaint/diagnosis/parts context per vehicle prompt
+PROMPT_CONTEXT_TOKENS = int(os.getenv("GPT_PROMPT_CONTEXT_TOKENS", "400"))
+
+# Persistent response cache shared by every process on this host
+GPT_CACHE_PATH = os.getenv("GPT_CACHE_PATH", str(pathlib.Path(__file__).parent.parent / "data" / "gpt_cache.sqlite"))
+GPT_CACHE_TTL_SECONDS = float(os.getenv("GPT_CACHE_TTL_HOURS", "168")) * 3600
+GPT_CACHE_MAX_ENTRIES = int(os.getenv("GPT_CACHE_MAX_ENTRIES", "5000"))
+response_cache = ResponseCache(GPT_CACHE_PATH, ttl_seconds=GPT_CACHE_TTL_SECONDS, max_entries=GPT_CACHE_MAX_ENTRIES)
+
+# Insights of near-identical vehicles (same make/model, similar complaint counts) are
+# reused instead of regenerated; a threshold above 1 disables reuse
+INSIGHT_REUSE_THRESHOLD = float(os.getenv("GPT_REUSE_SIMILARITY", "0.8"))
+insight_index = InsightIndex(GPT_CACHE_PATH, ttl_seconds=GPT_CACHE_TTL_SECONDS, max_entries=GPT_CACHE_MAX_ENTRIES)
+
+def _cache_key(prompt, max_tokens, temperature):
+    return response_cache.fingerprint(CHAT_MODEL, {"max_tokens": max_tokens, "temperature": temperature}, prompt)
+
+def _complete(prompt, max_tokens, temperature, fallback=None):
+    """
+    Blocking completion, served from the response cache when possible.
+    If the API call fails and `fallback` is given, its (uncached) text is returned instead.
+    """
+    key = _cache_key(prompt, max_tokens, temperature)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        response = api.chat_completion(
+            model=CHAT_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+    except Exception:
+        if fallback is None:
+            raise
+        return fallback()
+    text = (response.choices[0].message.content or "").strip()
+    if not text and fallback is not None:
+        return fallback()
+    response_cache.set(key, text)
+    return text
 
 def generate_issue_summary(complaints, make, model, year):
     if not complaints:
         return f"Issue affecting {year} {make} {model}"
+    context = build_vehicle_context(complaints, token_budget=PROMPT_CONTEXT_TOKENS // 2)
     prompt = f"""
     Create a concise, professional issue title for {year} {make} {model}
     based on these complaints. Be specific and relevant to a repair shop owner.
 
-    Complaints:
-    {complaints[:10]}
+{context}
+    """
+    return _complete(prompt, max_tokens=60, temperature=0.6, fallback=lambda: f"Issue affecting {year} {make} {model}")
+
+# Both per-vehicle insights come from one structured completion
+INSIGHT_FIELDS = ("summary", "corrective_action")
+INSIGHT_MAX_TOKENS = 400
+# Completion budget for the one retry of an insight cut off at INSIGHT_MAX_TOKENS
+INSIGHT_RETRY_MAX_TOKENS = 800
+INSIGHT_TEMPERATURE = 0.7
+NO_COMPLAINTS_INSIGHT = {
+    "summary": "No additional complaint context available.",
+    "corrective_action": "No corrective actions available.",
+}
+
+_INSIGHT_FIELDS_SPEC = """
+    - "summary": key systemic insights for a repair shop owner. Highlight recurring complaint themes,
+      potential business impact, and urgency.
+    - "corrective_action": a detailed corrective action plan for technicians. Address root causes
+      from the complaints and explain how to reduce comebacks and improve efficiency."""
+
+def _vehicle_insight_prompt(make, model, year, complaints, diagnoses=None, parts=None):
+    context = build_vehicle_context(complaints, diagnoses, parts, token_budget=PROMPT_CONTEXT_TOKENS)
+    return f"""
+    Analyze the service history of {year} {make} {model} and respond with a JSON object
+    with exactly these string fields:
+{_INSIGHT_FIELDS_SPEC}
+
+{context}
     """
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
+
+def _parse_insight(text):
+    """Both fields from a structured response; ValueError if either is missing."""
+    data = json.loads(text)
+    insight = {field: str(data.get(field) or "").strip() for field in INSIGHT_FIELDS}
+    if not all(insight.values()):
+        raise ValueError("Incomplete vehicle insight")
+    return insight
+
+def _partial_insight(buffer):
+    """Field values decoded so far from a streaming JSON response (missing fields are "")."""
+    insight = {}
+    for field in INSIGHT_FIELDS:
+        match = re.search(rf'"{field}"\s*:\s*"((?:[^"\\]|\\.)*)', buffer)
+        raw = match.group(1) if match else ""
+        # Drop a trailing escape sequence that hasn't fully arrived yet
+        for cut in range(0, min(len(raw), 6) + 1):
+            try:
+                insight[field] = json.loads(f'"{raw[:len(raw) - cut]}"')
+                break
+            except ValueError:
+                continue
+        else:
+            insight[field] = ""
+    return insight
+
+def _template_insight(make, model, year, complaints, diagnoses=None, parts=None):
+    """Locally generated stand-in for an insight the API couldn't provide (marked "fallback")."""
+    return {
+        "summary": template_summary(make, model, year, complaints, diagnoses, parts),
+        "corrective_action": template_corrective_action(make, model, year, complaints, diagnoses, parts),
+        "fallback": True,
+    }
+
+def _insight_cache_key(prompt):
+    return _cache_key(prompt, INSIGHT_MAX_TOKENS, INSIGHT_TEMPERATURE)
+
+def _cached_insight(key):
+    cached = response_cache.get(key)
+    if cached is None:
+        return None
+    try:
+        return _parse_insight(cached)
+    except ValueError:
+        return None
+
+def _reused_insight(make, model, year, complaints):
+    """
+    A stored insight for a near-identical vehicle of another year, labelled with its
+    source and similarity. The same year is skipped: that entry is this vehicle's own
+    insight from before its complaints changed.
+    """
+    if INSIGHT_REUSE_THRESHOLD > 1:
+        return None
+    match = insight_index.find_similar(make, model, complaints, INSIGHT_REUSE_THRESHOLD, exclude_year=year)
+    if match is None:
+        return None
+    insight, similarity, source_year = match
+    return {**insight, "reused_from": f"{source_year} {make} {model}", "similarity": round(similarity, 3)}
+
+def _store_insight(key, make, model, year, complaints, insight):
+    response_cache.set(key, json.dumps(insight))
+    insight_index.add(make, model, year, complaints, insight)
+
+def _request_insight(prompt, max_tokens=INSIGHT_MAX_TOKENS):
+    """
+    One structured completion, parsed. A reply cut off at the token limit is
+    requested again with INSIGHT_RETRY_MAX_TOKENS; ValueError if that is cut off too.
+    """
+    response = api.chat_completion(
+        model=CHAT_MODEL,
         messages=[{"role": "user", "content": prompt}],
-        max_tokens=60,
-        temperature=0.6,
+        max_tokens=max_tokens,
+        temperature=INSIGHT_TEMPERATURE,
+        response_format={"type": "json_object"},
     )
-    return response.choices[0].message.content.strip()
+    choice = response.choices[0]
+    if choice.finish_reason == "length":
+        if max_tokens >= INSIGHT_RETRY_MAX_TOKENS:
+            raise ValueError(f"Vehicle insight cut off at {max_tokens} tokens")
+        return _request_insight(prompt, INSIGHT_RETRY_MAX_TOKENS)
+    return _parse_insight(choice.message.content)
 
-def generate_smart_vehicle_summary(make, model, year, complaints):
+def generate_vehicle_insight(make, model, year, complaints, diagnoses=None, parts=None):
+    """
+    Summary and corrective action for one vehicle from a single structured completion.
+
+    Returns {"summary": ..., "corrective_action": ...}. The result is cached as
+    one entry; a reply cut off at the token limit is retried once with a larger
+    budget, and if the API call fails, both fields come from the local templates.
+    An insight reused from a similar vehicle also carries "reused_from" and "similarity".
+    """
     if not complaints:
-        return "No additional complaint context available."
-    prompt = f"""
-    Summarize key systemic insights for a repair shop owner about {year} {make} {model}.
-    Highlight recurring complaint themes, potential business impact, and urgency.
+        return dict(NO_COMPLAINTS_INSIGHT)
+    prompt = _vehicle_insight_prompt(make, model, year, complaints, diagnoses, parts)
+    key = _insight_cache_key(prompt)
+    cached = _cached_insight(key)
+    if cached is not None:
+        return cached
+    reused = _reused_insight(make, model, year, complaints)
+    if reused is not None:
+        return reused
+    try:
+        insight = _request_insight(prompt)
+    except Exception:
+        return _template_insight(make, model, year, complaints, diagnoses, parts)
+    _store_insight(key, make, model, year, complaints, insight)
+    return insight
 
-    Complaints:
-    {complaints[:15]}
+def stream_vehicle_insight(make, model, year, complaints, diagnoses=None, parts=None, timeout=20):
     """
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=200,
-        temperature=0.7,
+    Streaming variant of generate_vehicle_insight: yields {"summary", "corrective_action"}
+    snapshots as the structured response arrives; `timeout` bounds the HTTP request.
+    A response cut off at the token limit is requested again with a larger budget;
+    one that fails or breaks off is replaced by the templates.
+    """
+    if not complaints:
+        yield dict(NO_COMPLAINTS_INSIGHT)
+        return
+    prompt = _vehicle_insight_prompt(make, model, year, complaints, diagnoses, parts)
+    key = _insight_cache_key(prompt)
+    cached = _cached_insight(key)
+    if cached is None:
+        cached = _reused_insight(make, model, year, complaints)
+    if cached is not None:
+        yield cached
+        return
+    try:
+        stream = api.chat_completion(
+            model=CHAT_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=INSIGHT_MAX_TOKENS,
+            temperature=INSIGHT_TEMPERATURE,
+            response_format={"type": "json_object"},
+            stream=True,
+            timeout=timeout,
+        )
+    except Exception:
+        yield _template_insight(make, model, year, complaints, diagnoses, parts)
+        return
+    buffer = ""
+    snapshot = None
+    finish_reason = None
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+            if chunk.choices[0].delta.content:
+                buffer += chunk.choices[0].delta.content
+                partial_insight = _partial_insight(buffer)
+                if partial_insight != snapshot and any(partial_insight.values()):
+                    snapshot = partial_insight
+                    yield snapshot
+        if finish_reason == "length":
+            # Cut off at the token limit: ask again (blocking) with the larger budget
+            insight = _request_insight(prompt, INSIGHT_RETRY_MAX_TOKENS)
+        else:
+            insight = _parse_insight(buffer)
+    except Exception:
+        # A stream that breaks off (or ends unparseable) is replaced by the templates, not left half-written
+        yield _template_insight(make, model, year, complaints, diagnoses, parts)
+        return
+    _store_insight(key, make, model, year, complaints, insight)
+    if insight != snapshot:
+        yield insight
+
+def generate_smart_vehicle_summary(make, model, year, complaints, diagnoses=None, parts=None):
+    return generate_vehicle_insight(make, model, year, complaints, diagnoses, parts)["summary"]
+
+def generate_corrective_action(make, model, year, complaints, diagnoses=None, parts=None):
+    return generate_vehicle_insight(make, model, year, complaints, diagnoses, parts)["corrective_action"]
+
+# --- Cross-vehicle batching -------------------------------------------------
+
+# Prompt + completion tokens allowed per batched request
+BATCH_TOKEN_BUDGET = int(os.getenv("GPT_BATCH_TOKEN_BUDGET", "6000"))
+
+def _batch_item_payload(item_id, make, model, year, complaints, diagnoses=None, parts=None):
+    context = build_vehicle_context(complaints, diagnoses, parts, token_budget=PROMPT_CONTEXT_TOKENS)
+    return {"id": item_id, "vehicle": f"{year} {make} {model}", "context": context}
+
+def _batch_prompt(payloads):
+    return (
+        "For each vehicle below, write these fields for a repair shop:"
+        f"{_INSIGHT_FIELDS_SPEC}\n\n"
+        "Each vehicle's context lists its complaints, diagnoses and parts with how often each occurred.\n"
+        "Vehicles (JSON):\n"
+        f"{json.dumps(payloads, default=str)}\n\n"
+        'Respond with a JSON object of the form {"results": [{"id": <vehicle id>, "summary": "...", '
+        '"corrective_action": "..."}]} containing exactly one result per vehicle id.'
     )
-    return response.choices[0].message.content.strip()
 
-def generate_corrective_action(make, model, year, complaints):
-    if not complaints:
-        return "No corrective actions available."
-    prompt = f"""
-    Provide a detailed corrective action plan for technicians
-    working on {year} {make} {model}. Address root causes from these complaints
-    and explain how to reduce comebacks and improve efficiency.
+def _split_batches(payloads, token_budget):
+    """Greedily pack payloads so each request's prompt plus reserved answer tokens fits the budget."""
+    base = estimate_tokens(_batch_prompt([]))
+    batches, current, used = [], [], base
+    for payload in payloads:
+        cost = estimate_tokens(json.dumps(payload, default=str)) + INSIGHT_MAX_TOKENS
+        if current and used + cost > token_budget:
+            batches.append(current)
+            current, used = [], base
+        current.append(payload)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
 
-    Complaints:
-    {complaints[:15]}
+def _batch_results(text):
     """
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=200,
-        temperature=0.65,
+    The "results" items of a batch reply. If the JSON is cut off or malformed,
+    the complete objects before the damage are still returned.
+    """
+    try:
+        return json.loads(text).get("results", [])
+    except (TypeError, ValueError, AttributeError):
+        pass
+    match = re.search(r'"results"\s*:\s*\[', text or "")
+    if not match:
+        return []
+    decoder = json.JSONDecoder()
+    results = []
+    pos = match.end()
+    while True:
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(text) or text[pos] == "]":
+            return results
+        try:
+            item, pos = decoder.raw_decode(text, pos)
+        except ValueError:
+            return results
+        results.append(item)
+
+def _request_batch(payloads, max_tokens=None):
+    """
+    One JSON-mode completion for a batch; returns {id: insight} for the items it answered.
+
+    A reply cut off at the token limit keeps its complete items. The items it
+    lost are asked again in two halves (or alone), and an item cut off on its
+    own once more with the larger retry budget, before they are left to the
+    caller's fallback.
+    """
+    max_tokens = max_tokens or INSIGHT_MAX_TOKENS * len(payloads) + 50
+    response = api.chat_completion(
+        model=CHAT_MODEL,
+        messages=[{"role": "user", "content": _batch_prompt(payloads)}],
+        max_tokens=max_tokens,
+        temperature=INSIGHT_TEMPERATURE,
+        response_format={"type": "json_object"},
     )
-    return response.choices[0].message.content.strip()
+    choice = response.choices[0]
+    results = _batch_results(choice.message.content)
+    # The model may echo ids as strings ("3" for 3), so they are matched as text
+    wanted = {str(payload["id"]): payload["id"] for payload in payloads}
+    answered = {}
+    for result in results:
+        if not isinstance(result, dict) or str(result.get("id")) not in wanted:
+            continue
+        insight = {field: str(result.get(field) or "").strip() for field in INSIGHT_FIELDS}
+        if all(insight.values()):
+            answered[wanted[str(result["id"])]] = insight
+
+    missing = [payload for payload in payloads if payload["id"] not in answered]
+    if choice.finish_reason != "length" or not missing:
+        return answered
+    if len(missing) > 1:
+        retries = [(missing[:len(missing) // 2], None), (missing[len(missing) // 2:], None)]
+    elif len(payloads) > 1:
+        retries = [(missing, None)]
+    elif max_tokens < INSIGHT_RETRY_MAX_TOKENS + 50:
+        retries = [(missing, INSIGHT_RETRY_MAX_TOKENS + 50)]
+    else:
+        retries = []
+    for retry_payloads, retry_tokens in retries:
+        try:
+            answered.update(_request_batch(retry_payloads, retry_tokens))
+        except Exception:
+            # Whatever is still missing stays pending for the caller's next round
+            pass
+    return answered
+
+def generate_vehicle_insights_batch(vehicles, token_budget=None, max_retries=2, max_workers=4):
+    """
+    Generate the combined insight for many vehicles while packing several into each request.
+
+    Args:
+        vehicles: list of (make, model, year, complaints) tuples, optionally followed by
+            diagnoses and parts lists for extra context
+        token_budget: estimated prompt + completion tokens per request; batches are split to fit
+        max_retries: extra rounds for items a batch failed to answer; only those items are resent
+        max_workers: batches sent concurrently
+
+    Returns:
+        list aligned with `vehicles` of insight dicts (as from generate_vehicle_insight,
+        including reuse labels); like there, an item still unanswered after all retries
+        gets the uncached template insight, marked "fallback"
+    """
+    token_budget = token_budget or BATCH_TOKEN_BUDGET
+    results = [None] * len(vehicles)
+    keys = {}
+    pending = []
+    followers = {}  # item -> (earlier pending item it will reuse, similarity)
+
+    # Items share the single-vehicle cache entries, so batched and live calls reuse each other's work
+    for i, vehicle in enumerate(vehicles):
+        if not vehicle[3]:
+            results[i] = dict(NO_COMPLAINTS_INSIGHT)
+            continue
+        keys[i] = _insight_cache_key(_vehicle_insight_prompt(*vehicle))
+        cached = _cached_insight(keys[i]) or _reused_insight(vehicle[0], vehicle[1], vehicle[2], vehicle[3])
+        if cached is not None:
+            results[i] = cached
+            continue
+        # Near-duplicates within this run wait for the first similar vehicle's answer
+        leader = None
+        if INSIGHT_REUSE_THRESHOLD <= 1:
+            counts = complaint_counts(vehicle[3])
+            for payload in pending:
+                other = vehicles[payload["id"]]
+                if (str(other[0]).lower(), str(other[1]).lower()) != (str(vehicle[0]).lower(), str(vehicle[1]).lower()):
+                    continue
+                similarity = weighted_jaccard(counts, complaint_counts(other[3]))
+                if similarity >= INSIGHT_REUSE_THRESHOLD and (leader is None or similarity > leader[1]):
+                    leader = (payload["id"], similarity)
+        if leader is not None:
+            followers[i] = leader
+        else:
+            pending.append(_batch_item_payload(i, *vehicle))
+
+    def run(batch):
+        try:
+            return _request_batch(batch)
+        except Exception:
+            # Its items stay pending: retried in the next round, then given the templates
+            return {}
+
+    for _ in range(max_retries + 1):
+        if not pending:
+            break
+        batches = _split_batches(pending, token_budget)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+            for answered in executor.map(run, batches):
+                for i, insight in answered.items():
+                    results[i] = insight
+                    make, model, year, complaints = vehicles[i][:4]
+                    _store_insight(keys[i], make, model, year, complaints, insight)
+        pending = [payload for payload in pending if results[payload["id"]] is None]
+
+    for i, (leader, similarity) in followers.items():
+        if results[leader] is not None:
+            make, model, year = vehicles[leader][:3]
+            results[i] = {**results[leader], "reused_from": f"{year} {make} {model}", "similarity": round(similarity, 3)}
+            insight_index.reused += 1
+
+    for i, vehicle in enumerate(vehicles):
+        if results[i] is None:
+            results[i] = _template_insight(*vehicle)
+    return results
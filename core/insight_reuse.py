@@ -0,0 +1,111 @@
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+
+def complaint_counts(complaints):
+    """Complaint multiset with case and whitespace differences folded together."""
+    return Counter(" ".join(str(c).lower().split()) for c in complaints if c is not None and str(c).strip())
+
+
+def weighted_jaccard(a, b):
+    """Sum of per-complaint minimum counts over sum of maximum counts (1.0 = identical multisets)."""
+    keys = set(a) | set(b)
+    if not keys:
+        return 0.0
+    overlap = sum(min(a.get(k, 0), b.get(k, 0)) for k in keys)
+    union = sum(max(a.get(k, 0), b.get(k, 0)) for k in keys)
+    return overlap / union
+
+
+class InsightIndex:
+    """
+    Previously generated vehicle insights, searchable by make/model and complaint similarity.
+
+    Stored next to the response cache in the same SQLite file. `find_similar`
+    compares the weighted Jaccard similarity of complaint counts against every
+    insight for the same make and model (any year); entries expire after `ttl_seconds`.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_entries=5000):
+        self.path = pathlib.Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.reused = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS vehicle_insight_index (
+                    make TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    year TEXT NOT NULL,
+                    complaint_counts TEXT NOT NULL,
+                    insight TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_vehicle_insight_make_model ON vehicle_insight_index (make, model)"
+            )
+
+    @staticmethod
+    def _vehicle(make, model):
+        return str(make).strip().lower(), str(model).strip().lower()
+
+    def add(self, make, model, year, complaints, insight):
+        make, model = self._vehicle(make, model)
+        counts = json.dumps(complaint_counts(complaints), sort_keys=True)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM vehicle_insight_index WHERE make = ? AND model = ? AND year = ? AND complaint_counts = ?",
+                (make, model, str(year), counts),
+            )
+            self._conn.execute(
+                "INSERT INTO vehicle_insight_index (make, model, year, complaint_counts, insight, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (make, model, str(year), counts, json.dumps(insight), now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM vehicle_insight_index").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM vehicle_insight_index WHERE rowid IN "
+                    "(SELECT rowid FROM vehicle_insight_index ORDER BY created_at ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def find_similar(self, make, model, complaints, threshold, exclude_year=None):
+        """
+        Best stored insight for the same make/model whose complaint similarity is at
+        least `threshold`, as (insight, similarity, year); None if there is none.
+        Entries for `exclude_year` are skipped, so a vehicle whose complaints changed
+        isn't handed its own outdated insight.
+        """
+        counts = complaint_counts(complaints)
+        if not counts:
+            return None
+        make_key, model_key = self._vehicle(make, model)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT year, complaint_counts, insight FROM vehicle_insight_index "
+                "WHERE make = ? AND model = ? AND created_at >= ?",
+                (make_key, model_key, time.time() - self.ttl_seconds),
+            ).fetchall()
+
+        best = None
+        for year, stored_counts, insight in rows:
+            if exclude_year is not None and year == str(exclude_year):
+                continue
+            similarity = weighted_jaccard(counts, json.loads(stored_counts))
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (json.loads(insight), similarity, year)
+        if best is not None:
+            self.reused += 1
+        return best
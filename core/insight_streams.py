@@ -0,0 +1,77 @@
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+STREAMING = "streaming"
+DONE = "done"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+
+def stream_concurrently(jobs, on_update, timeout=20.0, max_workers=None):
+    """
+    Run several streaming text generators at once and report progress in the caller's thread.
+
+    Args:
+        jobs: dict mapping a key to a zero-argument callable that returns an iterator of text
+            chunks; a job may instead yield dict snapshots of structured output, each of
+            which replaces the value so far
+        on_update: callback(key, value_so_far, status), always invoked from the calling thread
+            (so it may safely touch Streamlit elements); status is one of
+            "streaming", "done", "timeout" or "error"
+        timeout: seconds each job may run, counted from launch; late jobs are reported
+            as timed out and their remaining output is discarded
+        max_workers: thread pool size (default: one thread per job)
+
+    Returns:
+        dict mapping each key to the text (or latest snapshot) received before it finished or timed out
+    """
+    texts = {key: "" for key in jobs}
+    if not jobs:
+        return texts
+
+    events = queue.Queue()
+    deadline = time.monotonic() + timeout
+
+    def worker(key, make_stream):
+        try:
+            for chunk in make_stream():
+                if time.monotonic() > deadline:
+                    events.put((key, None, TIMEOUT))
+                    return
+                events.put((key, chunk, STREAMING))
+            events.put((key, None, DONE))
+        except Exception:
+            events.put((key, None, ERROR))
+
+    pending = set(jobs)
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(jobs))
+    try:
+        for key, make_stream in jobs.items():
+            executor.submit(worker, key, make_stream)
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                key, chunk, status = events.get(timeout=min(remaining, 0.1))
+            except queue.Empty:
+                continue
+            if key not in pending:
+                continue
+            if isinstance(chunk, dict):
+                texts[key] = chunk
+            elif chunk is not None:
+                texts[key] += chunk
+            if status != STREAMING:
+                pending.discard(key)
+            on_update(key, texts[key], status)
+
+        for key in pending:
+            on_update(key, texts[key], TIMEOUT)
+    finally:
+        # Never wait on stragglers; their HTTP timeout ends them in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return texts
@@ -0,0 +1,36 @@
+from core.prompt_context import count_table
+
+# Prefix marking text that was not produced by the model
+FALLBACK_LABEL = "Automatic summary (AI unavailable):"
+
+
+def _top(values, n=3):
+    return ", ".join(f"{text} ({count}x)" for text, count in count_table(values)[:n])
+
+
+def template_summary(make, model, year, complaints, diagnoses=None, parts=None):
+    """Local stand-in for the AI vehicle summary, built from the complaint counts alone."""
+    table = count_table(complaints)
+    repeated = sum(count for _, count in table if count > 1)
+    text = (
+        f"{FALLBACK_LABEL} {year} {make} {model} has {len(complaints)} recorded complaints "
+        f"across {len(table)} distinct issues; most common: {_top(complaints)}."
+    )
+    if repeated:
+        text += f" {repeated} complaints repeat an earlier issue, which points to unresolved root causes."
+    if diagnoses:
+        text += f" Frequent diagnoses: {_top(diagnoses)}."
+    return text
+
+
+def template_corrective_action(make, model, year, complaints, diagnoses=None, parts=None):
+    """Local stand-in for the AI corrective action plan."""
+    table = count_table(complaints)
+    focus = table[0][0] if table else "the recurring complaint"
+    text = (
+        f"{FALLBACK_LABEL} For {year} {make} {model}, verify the root cause of \"{focus}\" before replacing parts, "
+        "confirm the repair with a road test, and check prior visits for the same complaint."
+    )
+    if parts:
+        text += f" Parts most often used on this vehicle: {_top(parts)}."
+    return text
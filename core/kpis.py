@@ -0,0 +1,131 @@
+from dataclasses import dataclass, asdict
+
+import numpy as np
+import pandas as pd
+
+# Targets the dashboard compares each headline metric against
+FIRST_TIME_FIX_TARGET = 85
+REVENUE_PER_HOUR_TARGET = 120
+PRODUCTIVITY_TARGET = 80
+SATISFACTION_TARGET = 90
+
+# Columns reduced in the single pass, in stacking order
+_KPI_COLUMNS = [
+    "estimated_loss",
+    "efficiency_loss",
+    "repeat_45d",
+    "invoice_total",
+    "labor_hours_billed",
+    "efficiency_deviation",
+    "suspected_misdiagnosis",
+]
+_LOSS, _EFF_LOSS, _REPEAT, _REVENUE, _HOURS, _DEVIATION, _MISDIAGNOSIS = range(len(_KPI_COLUMNS))
+
+
+@dataclass(frozen=True)
+class DashboardKPIs:
+    """Headline metrics for the currently selected rows. Rates are percentages."""
+    total_jobs: int
+    misdiagnosis_cases: int
+    misdiagnosis_rate: float
+    misdiagnosis_loss: float
+    efficiency_loss: float
+    estimated_loss: float
+    potential_savings: float
+    repeat_jobs: int
+    first_time_fix_rate: float
+    total_revenue: float
+    total_hours: float
+    revenue_per_hour: float
+    avg_efficiency_deviation: float
+    productivity_index: float
+    satisfaction_score: float
+    avg_repair_cost: float
+    unique_customers: int
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def compute_kpis(df):
+    """
+    Compute every headline dashboard metric in one pass over the selected rows.
+
+    The additive columns are stacked into a single float matrix and reduced
+    together; the misdiagnosis mask is evaluated once and reused.
+    """
+    n = len(df)
+    values = np.column_stack([
+        pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype=float)
+        if col in df.columns else np.zeros(n)
+        for col in _KPI_COLUMNS
+    ]) if n else np.zeros((0, len(_KPI_COLUMNS)))
+
+    totals = values.sum(axis=0)
+    misdiagnosed = values[:, _MISDIAGNOSIS] == 1
+    unique_customers = int(df["customer_name"].nunique()) if "customer_name" in df.columns else 0
+
+    return _kpis_from_totals(
+        total_jobs=n,
+        misdiagnosis_cases=int(misdiagnosed.sum()),
+        misdiagnosis_loss=float(values[misdiagnosed, _LOSS].sum()),
+        estimated_loss=float(totals[_LOSS]),
+        efficiency_loss=float(totals[_EFF_LOSS]),
+        repeat_jobs=int(totals[_REPEAT]),
+        total_revenue=float(totals[_REVENUE]),
+        total_hours=float(totals[_HOURS]),
+        deviation_sum=float(totals[_DEVIATION]),
+        unique_customers=unique_customers,
+    )
+
+
+def compute_kpis_from_rollup(rollup, unique_customers=0):
+    """
+    Same metrics as compute_kpis, answered from daily rollup rows (see core.daily_rollup).
+
+    Distinct customers are not additive, so the caller supplies that count.
+    """
+    totals = rollup[[
+        "job_count", "misdiagnosis_cases", "misdiagnosis_loss", "estimated_loss", "efficiency_loss",
+        "repeat_45d", "invoice_total", "labor_hours_billed", "efficiency_deviation",
+    ]].to_numpy(dtype=float).sum(axis=0) if len(rollup) else np.zeros(9)
+
+    return _kpis_from_totals(
+        total_jobs=int(totals[0]),
+        misdiagnosis_cases=int(totals[1]),
+        misdiagnosis_loss=float(totals[2]),
+        estimated_loss=float(totals[3]),
+        efficiency_loss=float(totals[4]),
+        repeat_jobs=int(totals[5]),
+        total_revenue=float(totals[6]),
+        total_hours=float(totals[7]),
+        deviation_sum=float(totals[8]),
+        unique_customers=unique_customers,
+    )
+
+
+def _kpis_from_totals(total_jobs, misdiagnosis_cases, misdiagnosis_loss, estimated_loss, efficiency_loss,
+                      repeat_jobs, total_revenue, total_hours, deviation_sum, unique_customers):
+    n = total_jobs
+    avg_deviation = deviation_sum / n if n else 0.0
+    repeat_rate = repeat_jobs / n * 100 if n else 0.0
+
+    return DashboardKPIs(
+        total_jobs=n,
+        misdiagnosis_cases=misdiagnosis_cases,
+        misdiagnosis_rate=misdiagnosis_cases / n * 100 if n else 0.0,
+        misdiagnosis_loss=misdiagnosis_loss,
+        efficiency_loss=efficiency_loss,
+        estimated_loss=estimated_loss,
+        potential_savings=estimated_loss + efficiency_loss,
+        repeat_jobs=repeat_jobs,
+        first_time_fix_rate=100 - repeat_rate if n else 0.0,
+        total_revenue=total_revenue,
+        total_hours=total_hours,
+        revenue_per_hour=total_revenue / total_hours if total_hours > 0 else 0.0,
+        avg_efficiency_deviation=avg_deviation,
+        productivity_index=max(0.0, 100 - avg_deviation * 20),
+        satisfaction_score=max(0.0, 100 - repeat_rate) if n else 0.0,
+        avg_repair_cost=total_revenue / n if n else 0.0,
+        unique_customers=unique_customers,
+    )
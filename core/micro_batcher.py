@@ -0,0 +1,138 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+
+class ScoringMetrics:
+    """Thread-safe request, batch and latency counters for a MicroBatcher."""
+
+    def __init__(self, window=10_000):
+        self.started_at = time.monotonic()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self.latencies_ms = deque(maxlen=window)
+        self.batch_rows = deque(maxlen=window)
+        self.score_ms = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_batch(self, n_requests, n_rows, score_seconds, latencies, failed=False):
+        with self._lock:
+            self.requests += n_requests
+            self.rows += n_rows
+            self.batches += 1
+            self.errors += n_requests if failed else 0
+            self.batch_rows.append(n_rows)
+            self.score_ms.append(score_seconds * 1000)
+            self.latencies_ms.extend(seconds * 1000 for seconds in latencies)
+
+    def snapshot(self):
+        """Counters since start, plus latency percentiles and batch sizes over the recent window."""
+        with self._lock:
+            uptime = time.monotonic() - self.started_at
+            latencies = np.array(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+            return {
+                "uptime_seconds": round(uptime, 1),
+                "requests": self.requests,
+                "rows": self.rows,
+                "batches": self.batches,
+                "errors": self.errors,
+                "requests_per_second": round(self.requests / uptime, 2) if uptime else 0.0,
+                "rows_per_second": round(self.rows / uptime, 2) if uptime else 0.0,
+                "mean_batch_rows": round(float(np.mean(self.batch_rows)), 2) if self.batch_rows else 0.0,
+                "mean_requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "mean_score_ms": round(float(np.mean(self.score_ms)), 3) if self.score_ms else 0.0,
+                "latency_ms": {
+                    "p50": round(float(np.percentile(latencies, 50)), 3),
+                    "p95": round(float(np.percentile(latencies, 95)), 3),
+                    "p99": round(float(np.percentile(latencies, 99)), 3),
+                    "max": round(float(latencies.max()), 3),
+                },
+            }
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent scoring requests into one model call.
+
+    `submit` queues a frame and returns a Future. A single worker thread takes
+    the first waiting request, keeps collecting for up to `window_ms` (or until
+    `max_batch_rows` rows are waiting), scores the concatenated frame with
+    `score_fn` and hands each request its own slice of the result.
+    """
+
+    def __init__(self, score_fn, window_ms=5.0, max_batch_rows=4096):
+        self.score_fn = score_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self.metrics = ScoringMetrics()
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, df):
+        """Queue `df` for scoring; the Future resolves to score_fn's output for exactly these rows."""
+        future = Future()
+        self._queue.put((df, future, time.perf_counter()))
+        return future
+
+    def score(self, df, timeout=None):
+        return self.submit(df).result(timeout)
+
+    def close(self):
+        self._stopped.set()
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self, first):
+        batch = [first]
+        rows = len(first[0])
+        deadline = time.perf_counter() + self.window
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch, rows
+
+    def _run(self):
+        while not self._stopped.is_set():
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, n_rows = self._collect(first)
+
+            frames = [df.reset_index(drop=True) for df, _, _ in batch]
+            start = time.perf_counter()
+            try:
+                scored = self.score_fn(pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0])
+                error = None
+            except Exception as e:
+                error = e
+            score_seconds = time.perf_counter() - start
+
+            offset = 0
+            for (df, future, _), frame in zip(batch, frames):
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(scored.iloc[offset:offset + len(frame)].set_index(df.index))
+                offset += len(frame)
+            done = time.perf_counter()
+            self.metrics.record_batch(len(batch), n_rows, score_seconds,
+                                      [done - submitted for _, _, submitted in batch], failed=error is not None)
@@ -1,7 +1,18 @@
+import hashlib
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+
 import joblib
+import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
 
-MODEL_PATH = "models/model.pkl"
+# Anchored to the repo root so the dashboard, scripts and scoring server share one model from any working directory
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+MODEL_PATH = os.path.join(MODEL_DIR, "model.pkl")
 
 # Human-readable labels
 LABEL_MAP = {
@@ -10,64 +21,292 @@ LABEL_MAP = {
     2: "Technician Inefficiency"
 }
 
-def load_model():
-    """Load the trained ML pipeline or model from disk."""
+def _resident_memory_bytes():
+    """Resident set size of this process, or None where it can't be read."""
     try:
-        model = joblib.load(MODEL_PATH)
-        return model
-    except Exception as e:
-        raise RuntimeError(f"Error loading model: {e}")
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+@dataclass
+class LoadedModel:
+    """A deserialised model artifact and what it took to load it."""
+    model: object
+    path: str
+    sha256: str
+    mtime: float
+    size: int
+    load_seconds: float
+    rss_delta_bytes: int
+    loaded_at: float
+    checked_at: float
+
+    def report(self):
+        rss = _resident_memory_bytes()
+        return {
+            "path": self.path,
+            "sha256": self.sha256[:12],
+            "size_mb": round(self.size / 1e6, 2),
+            "load_seconds": round(self.load_seconds, 3),
+            "rss_delta_mb": round(self.rss_delta_bytes / 1e6, 1) if self.rss_delta_bytes is not None else None,
+            "rss_mb": round(rss / 1e6, 1) if rss is not None else None,
+            "loaded_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.loaded_at)),
+        }
 
-def predict_misdiagnosis(df, model, show_features=False):
+class ModelRegistry:
     """
-    Predict misdiagnoses using either a Pipeline or a plain sklearn model.
-    Ensures predictions map correctly to 0/1/2 labels.
-    If show_features=True, returns the list of features actually used.
+    Process-wide cache of loaded model artifacts.
+
+    Each path is deserialised once per process and shared by every caller in it;
+    each worker process still holds its own copy (sklearn trees copy their node
+    arrays into private memory when unpickled, so memory mapping the file would
+    not share them). At most every `check_interval` seconds a lookup stats the file; a changed
+    mtime or size triggers a hash check, and a new hash reloads the artifact.
+    If the replacement can't be loaded (e.g. still being written) the previous
+    model keeps serving.
     """
+
+    def __init__(self, mmap_mode=None, check_interval=2.0):
+        self.mmap_mode = mmap_mode
+        self.check_interval = check_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _load(self, path, sha256, stat):
+        rss_before = _resident_memory_bytes()
+        start = time.perf_counter()
+        model = joblib.load(path, mmap_mode=self.mmap_mode)
+        load_seconds = time.perf_counter() - start
+        rss_after = _resident_memory_bytes()
+        now = time.time()
+        entry = LoadedModel(
+            model=model,
+            path=path,
+            sha256=sha256,
+            mtime=stat.st_mtime,
+            size=stat.st_size,
+            load_seconds=load_seconds,
+            rss_delta_bytes=rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+            loaded_at=now,
+            checked_at=now,
+        )
+        print(f"SUCCESS: Loaded model {path} ({sha256[:12]}) in {load_seconds:.2f}s, "
+              f"resident memory +{(entry.rss_delta_bytes or 0) / 1e6:.1f} MB")
+        return entry
+
+    def get_entry(self, path=MODEL_PATH):
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            now = time.time()
+            if entry is not None and now - entry.checked_at < self.check_interval:
+                return entry
+
+            stat = os.stat(path)
+            if entry is not None and (stat.st_mtime, stat.st_size) == (entry.mtime, entry.size):
+                entry.checked_at = now
+                return entry
+
+            sha256 = _file_sha256(path)
+            if entry is not None and sha256 == entry.sha256:
+                entry.mtime, entry.size, entry.checked_at = stat.st_mtime, stat.st_size, now
+                return entry
+
+            try:
+                entry = self._load(path, sha256, stat)
+            except Exception:
+                if entry is None:
+                    raise
+                print(f"WARNING: Could not reload replaced model {path}; keeping the loaded version")
+                entry.checked_at = now
+                return entry
+            self._entries[path] = entry
+            return entry
+
+    def get(self, path=MODEL_PATH):
+        return self.get_entry(path).model
+
+    def report(self):
+        """Load time and memory figures for every loaded artifact."""
+        with self._lock:
+            return [entry.report() for entry in self._entries.values()]
+
+# Shared by every caller in this process
+model_registry = ModelRegistry()
+
+def load_model(path=MODEL_PATH):
+    """Return the trained ML pipeline or model, loaded once per process and reloaded when the file changes."""
     try:
-        feature_names = None
-
-        # Case 1: Pipeline with ColumnTransformer
-        if hasattr(model, "named_steps") and "preprocessor" in model.named_steps:
-            preprocessor = model.named_steps["preprocessor"]
-            feature_names = []
-            for name, transformer, cols in preprocessor.transformers:
-                if transformer == "passthrough":
+        return model_registry.get(path)
+    except Exception as e:
+        raise RuntimeError(f"Error loading model: {e}")
+
+# Rows scored per chunk; bounds the size of every intermediate feature matrix
+SCORING_CHUNK_SIZE = 50_000
+
+def _input_columns(model, df):
+    """Raw input columns the model expects, in order."""
+    if hasattr(model, "feature_names_in_"):
+        return list(model.feature_names_in_)
+    if hasattr(model, "named_steps") and "preprocessor" in model.named_steps:
+        columns = []
+        for _, transformer, cols in model.named_steps["preprocessor"].transformers:
+            if transformer != "drop":
+                columns.extend(col for col in cols if col not in columns)
+        return columns
+    return df.select_dtypes(include=["number"]).columns.tolist()
+
+def _reported_feature_names(model, df):
+    """Feature list returned by predict_misdiagnosis(show_features=True); unchanged from before the scorer."""
+    # Case 1: Pipeline with ColumnTransformer
+    if hasattr(model, "named_steps") and "preprocessor" in model.named_steps:
+        feature_names = []
+        for _, transformer, cols in model.named_steps["preprocessor"].transformers:
+            if transformer == "passthrough":
+                feature_names.extend(cols)
+            else:
+                try:
+                    feature_names.extend(transformer.get_feature_names_out(cols).tolist())
+                except Exception:
                     feature_names.extend(cols)
-                else:
-                    try:
-                        feature_names.extend(transformer.get_feature_names_out(cols).tolist())
-                    except Exception:
-                        feature_names.extend(cols)
+        return feature_names
+    # Case 2: Plain classifier with feature_names_in_
+    if hasattr(model, "feature_names_in_"):
+        return model.feature_names_in_.tolist()
+    # Case 3: fallback
+    return df.select_dtypes(include=["number"]).columns.tolist()
+
+def _categorical_columns(model):
+    """Input columns routed through an encoder; everything else is scored as float."""
+    if not (hasattr(model, "named_steps") and "preprocessor" in model.named_steps):
+        return set()
+    categorical = set()
+    for _, transformer, cols in model.named_steps["preprocessor"].transformers:
+        steps = transformer.named_steps.values() if hasattr(transformer, "named_steps") else [transformer]
+        if any(type(step).__name__.endswith("Encoder") for step in steps):
+            categorical.update(cols)
+    return categorical
+
+class MisdiagnosisScorer:
+    """
+    Scores frames with one model using a feature plan compiled once.
+
+    The plan fixes the input column order, the default for columns a frame
+    lacks (0, as before) and each column's dtype. Frames are scored in
+    fixed-size chunks, optionally on several threads, into preallocated
+    arrays; the caller's frame is never modified.
+    """
 
-        # Case 2: Plain classifier with feature_names_in_
-        elif hasattr(model, "feature_names_in_"):
-            feature_names = model.feature_names_in_.tolist()
+    def __init__(self, model, chunk_size=SCORING_CHUNK_SIZE, n_jobs=1):
+        self.model = model
+        self.chunk_size = chunk_size
+        self.n_jobs = n_jobs
+        self.columns = None
+        self.dtypes = None
+        self.classes = list(model.classes_)
+        self.class_labels = {cls: LABEL_MAP.get(cls, f"Unknown ({cls})") for cls in self.classes}
 
-        # Case 3: fallback
+    def _compile(self, df):
+        # Models without recorded input names fall back to the numeric columns of the first frame
+        self.columns = _input_columns(self.model, df)
+        categorical = _categorical_columns(self.model)
+        self.dtypes = {col: object if col in categorical else "float64" for col in self.columns}
+
+    def feature_names(self, df=None):
+        if self.columns is None:
+            self._compile(df if df is not None else pd.DataFrame())
+        return list(self.columns)
+
+    def _features(self, df, start, stop):
+        """Model input for rows [start, stop), built column by column from the plan."""
+        chunk = df.iloc[start:stop]
+        features = {}
+        for col in self.columns:
+            if col not in chunk.columns:
+                features[col] = pd.Series(0, index=chunk.index, dtype=self.dtypes[col])
+            elif self.dtypes[col] == "float64":
+                features[col] = pd.to_numeric(chunk[col], errors="coerce").fillna(0).astype("float64")
+            else:
+                features[col] = chunk[col].fillna(0)
+        return pd.DataFrame(features, index=chunk.index, columns=self.columns)
+
+    def _predict_chunk(self, df, start, stop, out):
+        out[start:stop] = self.model.predict(self._features(df, start, stop))
+
+    def score(self, df, chunk_size=None, n_jobs=None):
+        """
+        Predictions for every row of `df` as a new frame with the same index and the
+        `Predicted_Misdiagnosis` and `Prediction_Label` columns.
+        """
+        if self.columns is None:
+            self._compile(df)
+        chunk_size = chunk_size or self.chunk_size
+        n_jobs = n_jobs or self.n_jobs
+        n = len(df)
+        preds = np.empty(n, dtype=np.asarray(self.classes).dtype)
+        bounds = [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+        if n_jobs != 1 and len(bounds) > 1:
+            # Threads share the model; forest prediction releases the GIL in its tree traversal
+            Parallel(n_jobs=n_jobs, prefer="threads")(
+                delayed(self._predict_chunk)(df, start, stop, preds) for start, stop in bounds
+            )
         else:
-            feature_names = df.select_dtypes(include=["number"]).columns.tolist()
+            for start, stop in bounds:
+                self._predict_chunk(df, start, stop, preds)
 
-    except Exception as e:
-        raise RuntimeError(f"Could not extract feature names: {e}")
+        labels = pd.Series(preds, index=df.index).map(self.class_labels).fillna("Unknown")
+        return pd.DataFrame({"Predicted_Misdiagnosis": preds, "Prediction_Label": labels}, index=df.index)
 
-    # Align DataFrame with expected features
-    X = df.copy()
-    X = X[[col for col in X.columns if col in feature_names]].copy()
-    for col in feature_names:
-        if col not in X.columns:
-            X[col] = 0
-    X = X.fillna(0)
+_scorers = weakref.WeakKeyDictionary()
+_scorers_lock = threading.Lock()
 
-    try:
-        preds = model.predict(X)
-        class_map = {cls: LABEL_MAP.get(cls, f"Unknown ({cls})") for cls in model.classes_}
-        df["Predicted_Misdiagnosis"] = preds
-        df["Prediction_Label"] = [class_map.get(p, "Unknown") for p in preds]
+def get_scorer(model):
+    """The scorer for `model`, created on first use and kept as long as the model is alive."""
+    with _scorers_lock:
+        scorer = _scorers.get(model)
+        if scorer is None:
+            scorer = _scorers[model] = MisdiagnosisScorer(model)
+        return scorer
+
+def predict_misdiagnosis(df, model, show_features=False, chunk_size=SCORING_CHUNK_SIZE, n_jobs=1):
+    """
+    Predict misdiagnoses using either a Pipeline or a plain sklearn model.
+    Ensures predictions map correctly to 0/1/2 labels.
 
-        if show_features:
-            return df, feature_names
-        return df
+    Returns a new frame: the input columns plus `Predicted_Misdiagnosis` and
+    `Prediction_Label`; `df` itself is left unchanged. For very large inputs use
+    get_scorer(model).score(df), which returns only the prediction columns.
+    If show_features=True, returns the list of features actually used.
+    """
+    try:
+        scorer = get_scorer(model)
+        scorer.feature_names(df)
+        feature_names = _reported_feature_names(model, df) if show_features else None
+    except Exception as e:
+        raise RuntimeError(f"Could not extract feature names: {e}")
 
+    try:
+        predictions = scorer.score(df, chunk_size=chunk_size, n_jobs=n_jobs)
     except Exception as e:
         raise RuntimeError(f"Prediction failed: {e}")
+
+    # Assigned by position: joining on the index would multiply rows with duplicate labels
+    result = df.drop(columns=predictions.columns, errors="ignore")
+    for col in predictions.columns:
+        result[col] = predictions[col].to_numpy()
+    if show_features:
+        return result, feature_names
+    return result
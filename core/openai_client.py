@@ -0,0 +1,198 @@
+import random
+import threading
+import time
+
+import openai
+
+# HTTP statuses worth retrying: rate limited, or a server-side failure
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the API while the circuit breaker is open."""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second refill a bucket of `capacity`.
+
+    `acquire` blocks until a token is available, or raises TimeoutError after `timeout` seconds.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                raise TimeoutError("Timed out waiting for the OpenAI rate limiter")
+            time.sleep(min(wait, 0.5))
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls and rejects calls for
+    `reset_timeout` seconds; then lets one trial call through (half-open) and
+    closes again if it succeeds.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = self.CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a call that says nothing about the API's health, freeing the half-open trial slot."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+def is_retryable(error):
+    """Rate limits, timeouts, connection errors and 5xx responses are retried; other API errors are not."""
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status in RETRYABLE_STATUS or status >= 500)
+
+
+def is_service_failure(error):
+    """Connection errors, timeouts, 429 and 5xx responses: failures that count against the breaker."""
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class ResilientClient:
+    """
+    Wraps an OpenAI client's chat completions with rate limiting, retries and a circuit breaker.
+
+    Every attempt first takes a token from the bucket. Retryable failures are
+    retried up to `max_retries` times with full-jitter exponential backoff
+    (honouring Retry-After when the server sends one). A call that still fails
+    with a connection error, timeout, 429 or 5xx counts against the breaker, as
+    does a stream that breaks off while being read; client errors (4xx) and the
+    local rate limiter timing out do not. While the breaker is open, calls raise
+    CircuitOpenError immediately so callers can fall back without waiting on the network.
+    """
+
+    def __init__(self, client, requests_per_minute=300, max_retries=3, base_delay=0.5, max_delay=8.0,
+                 breaker=None, acquire_timeout=30.0):
+        self.client = client
+        self.bucket = TokenBucket(requests_per_minute / 60.0, capacity=max(1, requests_per_minute // 10))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.acquire_timeout = acquire_timeout
+
+    def _backoff(self, attempt, error):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = _retry_after(error)
+        return min(self.max_delay, max(delay, retry_after)) if retry_after is not None else delay
+
+    def chat_completion(self, **kwargs):
+        """`client.chat.completions.create(**kwargs)` with the protections above."""
+        if not self.breaker.allow():
+            raise CircuitOpenError("OpenAI circuit breaker is open")
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.bucket.acquire(timeout=self.acquire_timeout)
+            except TimeoutError:
+                self.breaker.release()
+                raise
+            try:
+                response = self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                if attempt < self.max_retries and is_retryable(e):
+                    time.sleep(self._backoff(attempt, e))
+                    continue
+                if is_service_failure(e):
+                    self.breaker.record_failure()
+                elif getattr(e, "status_code", None) is not None:
+                    # The API answered (a client error), so it is healthy
+                    self.breaker.record_success()
+                else:
+                    self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return _BreakerStream(response, self.breaker) if kwargs.get("stream") else response
+
+
+class _BreakerStream:
+    """A streamed response that records a failure on the breaker if it breaks off mid-iteration."""
+
+    def __init__(self, stream, breaker):
+        self._stream = stream
+        self._breaker = breaker
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            if status is None or status == 429 or status >= 500:
+                self._breaker.record_failure()
+            raise
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
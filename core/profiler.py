@@ -0,0 +1,93 @@
+import json
+import pathlib
+import threading
+import time
+from datetime import datetime, timezone
+
+_active = threading.local()
+
+
+def note_cache_miss():
+    """
+    Call at the top of a cached function body. The body only runs on a miss,
+    so a profiled call that doesn't trigger this is counted as a cache hit.
+    """
+    profiler = getattr(_active, "profiler", None)
+    if profiler is not None and profiler.current is not None:
+        profiler.current["cache_misses"] += 1
+
+
+class RenderProfiler:
+    """
+    Lightweight per-rerun timing of dashboard sections.
+
+    Sections are checkpoints: `begin` closes the open section and starts the
+    next, so instrumenting a long script doesn't re-indent it. Each section
+    records wall time, rows processed and cache hits/misses; `flush` appends
+    the run as one JSON line to a local log.
+    """
+
+    def __init__(self, log_path=None):
+        self.log_path = pathlib.Path(log_path) if log_path else None
+        self.sections = []
+        self.current = None
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self._section_start = None
+        _active.profiler = self
+
+    def begin(self, name, rows=None):
+        self.end()
+        self.current = {"section": name, "wall_ms": 0.0, "rows": rows, "cache_hits": 0, "cache_misses": 0}
+        self._section_start = time.perf_counter()
+        return self.current
+
+    def end(self):
+        if self.current is None:
+            return
+        self.current["wall_ms"] = (time.perf_counter() - self._section_start) * 1000
+        self.sections.append(self.current)
+        self.current = None
+
+    def set_rows(self, rows):
+        if self.current is not None:
+            self.current["rows"] = rows
+
+    def add_cache_stats(self, hits=0, misses=0):
+        """Attribute externally counted cache lookups (e.g. the GPT response cache) to the open section."""
+        if self.current is not None:
+            self.current["cache_hits"] += hits
+            self.current["cache_misses"] += misses
+
+    def cached(self, fn, *args, **kwargs):
+        """Call a cached function inside the open section, counting a hit or a miss."""
+        _active.profiler = self
+        misses_before = self.current["cache_misses"] if self.current is not None else 0
+        result = fn(*args, **kwargs)
+        if self.current is not None and self.current["cache_misses"] == misses_before:
+            self.current["cache_hits"] += 1
+        return result
+
+    def total_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+    def summary(self):
+        return {
+            "started_at": self.started_at.isoformat(),
+            "total_ms": round(self.total_ms(), 1),
+            "sections": [
+                {**record, "wall_ms": round(record["wall_ms"], 1)} for record in self.sections
+            ],
+        }
+
+    def flush(self):
+        """Close the open section and append this run to the log. Logging failures never break rendering."""
+        self.end()
+        if not self.log_path:
+            return
+        try:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.summary()) + "\n")
+        except OSError:
+            pass
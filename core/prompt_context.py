@@ -0,0 +1,80 @@
+from collections import Counter
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken is optional; fall back to a character heuristic
+    _ENCODING = None
+
+# Share of the token budget offered to each section; unused budget rolls over to the next
+CONTEXT_SECTIONS = (
+    ("complaints", "Complaints", 0.6),
+    ("diagnoses", "Diagnoses recorded", 0.25),
+    ("parts", "Parts used", 0.15),
+)
+
+
+def estimate_tokens(text):
+    """Token count from the local tokenizer when available, else about four characters per token."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def count_table(values):
+    """
+    Deduplicate free-text values into (text, count) pairs, most frequent first.
+
+    Values are grouped case- and whitespace-insensitively; each group is shown
+    with its first spelling. Empty values are dropped.
+    """
+    counts = Counter()
+    spelling = {}
+    for value in values or []:
+        if value is None or (isinstance(value, float) and value != value):
+            continue
+        text = " ".join(str(value).split())
+        if not text:
+            continue
+        key = text.lower()
+        counts[key] += 1
+        spelling.setdefault(key, text)
+    return [(spelling[key], count) for key, count in counts.most_common()]
+
+
+def build_vehicle_context(complaints, diagnoses=None, parts=None, token_budget=400):
+    """
+    Prompt context for one vehicle: count tables of complaints, diagnoses and parts.
+
+    Rows are added most frequent first until each section's share of
+    `token_budget` is spent; trimmed sections end with a note of how many
+    distinct values were left out.
+    """
+    tables = {"complaints": count_table(complaints), "diagnoses": count_table(diagnoses), "parts": count_table(parts)}
+    sections = [(key, title, weight) for key, title, weight in CONTEXT_SECTIONS if tables[key]]
+
+    blocks = []
+    remaining = token_budget
+    remaining_weight = sum(weight for _, _, weight in sections)
+    for key, title, weight in sections:
+        allowance = remaining * weight / remaining_weight
+        remaining_weight -= weight
+
+        header = f"{title} (count x text):"
+        used = estimate_tokens(header)
+        lines = []
+        for text, count in tables[key]:
+            line = f"- {count} x {text}"
+            cost = estimate_tokens(line)
+            if lines and used + cost > allowance:
+                break
+            lines.append(line)
+            used += cost
+        omitted = len(tables[key]) - len(lines)
+        if omitted:
+            lines.append(f"- (+{omitted} less frequent)")
+            used += estimate_tokens(lines[-1])
+
+        blocks.append("\n".join([header] + lines))
+        remaining -= used
+    return "\n\n".join(blocks)
@@ -1,26 +1,58 @@
+import threading
 import requests
 import pandas as pd
 from datetime import datetime, timedelta
-from transformers import pipeline
+
+# Reviews per forward pass of the sentiment model
+SENTIMENT_BATCH_SIZE = 32
+SENTIMENT_MODEL = "distilbert/distilbert-base-uncased-finetuned-sst-2-english"
+SENTIMENT_REVISION = "714eb0f"  # pin revision for stability
+
+# One sentiment pipeline per process, shared by every ReviewIngestion
+_sentiment_analyzer = None
+_sentiment_lock = threading.Lock()
+
+def get_sentiment_analyzer():
+    """The process-wide sentiment pipeline, loaded on first use."""
+    global _sentiment_analyzer
+    if _sentiment_analyzer is None:
+        with _sentiment_lock:
+            if _sentiment_analyzer is None:
+                # Imported here so importing this module doesn't pay for transformers/torch
+                from transformers import pipeline
+                # ✅ Explicit model specification, pinned revision, forced to CPU
+                _sentiment_analyzer = pipeline(
+                    "sentiment-analysis",
+                    model=SENTIMENT_MODEL,
+                    revision=SENTIMENT_REVISION,
+                    device=-1           # -1 means always use CPU
+                )
+    return _sentiment_analyzer
+
+def warm_up_sentiment():
+    """Load the sentiment model and run one inference, for long-running services to call at startup."""
+    get_sentiment_analyzer()(["warm up"], truncation=True)
 
 class ReviewIngestion:
     def __init__(self, google_api_key=None, google_place_id=None,
                  yelp_api_key=None, yelp_business_id=None,
-                 bing_api_key=None, csv_path=None):
+                 bing_api_key=None, csv_path=None, sentiment_batch_size=SENTIMENT_BATCH_SIZE,
+                 warm_up=False):
         self.google_api_key = google_api_key
         self.google_place_id = google_place_id
         self.yelp_api_key = yelp_api_key
         self.yelp_business_id = yelp_business_id
         self.bing_api_key = bing_api_key
         self.csv_path = csv_path
+        self.sentiment_batch_size = sentiment_batch_size
+
+        # The model is loaded by the first add_sentiment call that has text to score, unless warmed up here
+        if warm_up:
+            warm_up_sentiment()
 
-        # ✅ Explicit model specification, pinned revision, forced to CPU
-        self.sentiment_analyzer = pipeline(
-            "sentiment-analysis",
-            model="distilbert/distilbert-base-uncased-finetuned-sst-2-english",
-            revision="714eb0f",  # pin revision for stability
-            device=-1           # -1 means always use CPU
-        )
+    @property
+    def sentiment_analyzer(self):
+        return get_sentiment_analyzer()
 
     def fetch_google_reviews(self, max_reviews=100):
         if not self.google_api_key or not self.google_place_id:
@@ -105,9 +137,24 @@ class ReviewIngestion:
         if df_reviews.empty:
             return df_reviews
 
-        df_reviews["Sentiment_Score"] = df_reviews["Review_Text"].apply(
-            lambda x: self.sentiment_analyzer(x)[0]["score"] if pd.notna(x) and str(x).strip() else 0
-        )
+        texts = df_reviews["Review_Text"].map(lambda x: str(x).strip() if pd.notna(x) else "")
+        # Each distinct text is scored once, shortest first so batches pad to similar lengths
+        unique_texts = sorted(set(texts[texts != ""]), key=len)
+
+        scores = {}
+        if unique_texts:
+            results = self.sentiment_analyzer(
+                unique_texts,
+                batch_size=self.sentiment_batch_size,
+                truncation=True,  # longer reviews are cut to the model's max length instead of failing
+            )
+            # Signed: +score for POSITIVE, -score for NEGATIVE
+            scores = {
+                text: result["score"] if result["label"].upper() == "POSITIVE" else -result["score"]
+                for text, result in zip(unique_texts, results)
+            }
+
+        df_reviews["Sentiment_Score"] = texts.map(scores).fillna(0).astype(float)
         return df_reviews
 
     def aggregate_reviews(self, df_reviews, lookback_days=180):
@@ -0,0 +1,88 @@
+import hashlib
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from core.daily_rollup import day_bounds
+from core.filter_index import DEFAULT_DATE_RANGE, preset_dates
+
+VEHICLE_KEYS = ["make", "model", "year"]
+
+
+def top_systemic_vehicles(df, n=5):
+    """
+    Vehicles with repeated visits and measurable impact, ranked by total impact.
+
+    One grouped aggregation over all vehicles; complaint lists are only built
+    for the `n` selected vehicles. Returns a list of dicts with the aggregate
+    columns plus `complaints` (list), `complaint_counts` (Counter) and, when
+    those columns exist, `diagnoses` and `parts` (lists) for prompt context.
+    """
+    vehicle_stats = df.groupby(VEHICLE_KEYS).agg(
+        visits=("service_date", "size"),
+        total_loss=("estimated_loss", "sum"),
+        efficiency_loss=("efficiency_loss", "sum"),
+        misdiagnosis_count=("suspected_misdiagnosis", "sum"),
+        avg_repair_cost=("invoice_total", "mean"),
+        complaint_count=("complaint", "count"),
+        first_visit=("service_date", "min"),
+        last_visit=("service_date", "max"),
+    ).reset_index()
+
+    # Visits per year; same-day visit spans fall back to the raw visit count
+    span_years = (vehicle_stats["last_visit"] - vehicle_stats["first_visit"]).dt.days / 365
+    vehicle_stats["visit_frequency"] = np.where(
+        span_years > 0, vehicle_stats["visits"] / span_years.where(span_years > 0), vehicle_stats["visits"]
+    )
+    vehicle_stats["total_impact"] = vehicle_stats["total_loss"] + vehicle_stats["efficiency_loss"]
+
+    # Only vehicles with multiple visits and some measurable impact
+    systemic_candidates = vehicle_stats[
+        (vehicle_stats["visits"] >= 2)
+        & ((vehicle_stats["total_loss"] > 0) | (vehicle_stats["efficiency_loss"] > 0) | (vehicle_stats["misdiagnosis_count"] > 0))
+    ]
+    top_systemic = systemic_candidates.nlargest(n, "total_impact")
+
+    # Complaint lists and counts only for the selected vehicles
+    top_keys = pd.MultiIndex.from_frame(top_systemic[VEHICLE_KEYS])
+    top_rows = df[pd.MultiIndex.from_frame(df[VEHICLE_KEYS]).isin(top_keys)]
+    text_columns = [col for col in ("complaint", "diagnosis", "parts_used") if col in df.columns]
+    top_text = top_rows.groupby(VEHICLE_KEYS)[text_columns].agg(lambda s: s.dropna().tolist())
+
+    systemic_issues = []
+    for issue in top_systemic.to_dict("records"):
+        key = (issue["make"], issue["model"], issue["year"])
+        texts = top_text.loc[key] if key in top_text.index else {}
+        complaints = texts.get("complaint", [])
+        issue["complaints"] = complaints
+        issue["complaint_counts"] = Counter(complaints)
+        issue["diagnoses"] = texts.get("diagnosis", [])
+        issue["parts"] = texts.get("parts_used", [])
+        systemic_issues.append(issue)
+    return systemic_issues
+
+
+def insight_scopes(df):
+    """
+    Row sets whose top systemic vehicles get precomputed insights, as {scope: frame}:
+    "all" for the full history and DEFAULT_DATE_RANGE for the window the dashboard
+    opens on (same preset and whole-day rule), so its default view finds them.
+    """
+    dates = pd.to_datetime(df["service_date"], errors="coerce")
+    start, end = day_bounds(*preset_dates(DEFAULT_DATE_RANGE, dates.min(), dates.max()))
+    return {"all": df, DEFAULT_DATE_RANGE: df[(dates >= start) & (dates <= end)]}
+
+
+def complaint_fingerprint(complaints):
+    """Order-independent fingerprint of a vehicle's complaints (text and counts)."""
+    counts = Counter(" ".join(str(c).lower().split()) for c in complaints)
+    payload = "\n".join(f"{complaint}\t{count}" for complaint, count in sorted(counts.items()))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def vehicle_key(make, model, year):
+    """Lookup key for stored per-vehicle insights; year is compared as text (2020.0 -> "2020")."""
+    if isinstance(year, (float, np.floating)) and float(year).is_integer():
+        year = int(year)
+    return (str(make), str(model), str(year))
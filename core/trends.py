@@ -0,0 +1,175 @@
+import threading
+
+import pandas as pd
+
+_SUM_COLUMNS = ["jobs", "deviation_sum", "misdiagnosis_cases"]
+
+
+class TrendEngine:
+    """
+    Rolling and exponentially weighted trends over the date-sorted daily series of each group.
+
+    Rows are first reduced to one row per group and day (jobs, summed efficiency
+    deviation, misdiagnosis cases). The rolling means are job-weighted over a
+    calendar window; the EWMs run over active days. Both are computed for all
+    groups at once with grouped window operations, and `update` extends the
+    series in place when new days arrive instead of recomputing history.
+    """
+
+    def __init__(self, group_cols=("shop_id",), window_days=28, span_days=14):
+        self.group_cols = list(group_cols)
+        self.window = pd.Timedelta(days=window_days)
+        self.alpha = 2 / (span_days + 1)
+        self.daily = None
+        self.trends = None
+
+    def _daily(self, df):
+        work = pd.DataFrame(index=df.index)
+        for col in self.group_cols:
+            work[col] = df[col].fillna("").astype(str) if col in df.columns else ""
+        work["date"] = pd.to_datetime(df["service_date"], errors="coerce").dt.normalize()
+        work["jobs"] = 1
+        work["deviation_sum"] = pd.to_numeric(df["efficiency_deviation"], errors="coerce").fillna(0)
+        work["misdiagnosis_cases"] = (pd.to_numeric(df["suspected_misdiagnosis"], errors="coerce") == 1).astype(int)
+        work = work.dropna(subset=["date"])
+        return work.groupby(self.group_cols + ["date"], sort=True)[_SUM_COLUMNS].sum().reset_index()
+
+    def _compute(self, daily, context=None, seed=None):
+        """
+        Trend rows for `daily`. `context` holds earlier daily rows still inside the
+        rolling window; `seed` holds each group's last EWM values before `daily` starts.
+        """
+        keys = self.group_cols + ["date"]
+        frame = pd.concat([context, daily], keys=["context", "new"], names=["_part", None]) \
+            if context is not None else pd.concat([daily], keys=["new"], names=["_part", None])
+        frame = frame.reset_index(level="_part").sort_values(keys).reset_index(drop=True)
+
+        # Frame is sorted by group then date, so the grouped result lines up row for row
+        rolled = frame.groupby(self.group_cols, sort=False).rolling(self.window, on="date")[_SUM_COLUMNS].sum()
+        rolled = rolled.to_numpy(dtype=float)
+        frame["rolling_efficiency"] = rolled[:, 1] / rolled[:, 0]
+        frame["rolling_misdiagnosis"] = rolled[:, 2] / rolled[:, 0]
+        frame = frame[frame["_part"] == "new"].drop(columns="_part")
+
+        frame["efficiency_deviation"] = frame["deviation_sum"] / frame["jobs"]
+        frame["misdiagnosis_rate"] = frame["misdiagnosis_cases"] / frame["jobs"]
+
+        # Seed rows carry the previous EWM value as their observation, so with
+        # adjust=False the recursion continues exactly where it stopped
+        ewm_input = frame[keys + ["efficiency_deviation", "misdiagnosis_rate"]]
+        if seed is not None and not seed.empty:
+            seed_rows = seed[keys + ["ewm_efficiency", "ewm_misdiagnosis"]].rename(columns={
+                "ewm_efficiency": "efficiency_deviation",
+                "ewm_misdiagnosis": "misdiagnosis_rate",
+            })
+            ewm_input = pd.concat([seed_rows.assign(_seed=True), ewm_input.assign(_seed=False)])
+        else:
+            ewm_input = ewm_input.assign(_seed=False)
+        ewm_input = ewm_input.sort_values(keys + ["_seed"], ascending=[True] * len(keys) + [False])
+        ewm_input = ewm_input.reset_index(drop=True)
+
+        ewm = ewm_input.groupby(self.group_cols, sort=False)[["efficiency_deviation", "misdiagnosis_rate"]] \
+            .ewm(alpha=self.alpha, adjust=False).mean()
+        ewm = ewm.reset_index(level=list(range(len(self.group_cols))), drop=True).sort_index()
+        ewm_input["ewm_efficiency"] = ewm["efficiency_deviation"]
+        ewm_input["ewm_misdiagnosis"] = ewm["misdiagnosis_rate"]
+        ewm_input = ewm_input[~ewm_input["_seed"]]
+
+        frame = frame.merge(ewm_input[keys + ["ewm_efficiency", "ewm_misdiagnosis"]], on=keys, how="left")
+        return frame.sort_values(keys).reset_index(drop=True)
+
+    def fit(self, df):
+        self.daily = self._daily(df)
+        self.trends = self._compute(self.daily)
+        return self
+
+    def update(self, new_rows):
+        """Fold newly arrived rows into the series, recomputing only from their first day onward."""
+        new_daily = self._daily(new_rows)
+        if new_daily.empty:
+            return self
+        if self.daily is None:
+            self.daily = new_daily
+            self.trends = self._compute(new_daily)
+            return self
+
+        keys = self.group_cols + ["date"]
+        cutoff = new_daily["date"].min()
+        self.daily = pd.concat([self.daily, new_daily]).groupby(keys, sort=True)[_SUM_COLUMNS].sum().reset_index()
+
+        before = self.daily[self.daily["date"] < cutoff]
+        context = before[before["date"] > cutoff - self.window]
+        kept = self.trends[self.trends["date"] < cutoff]
+        seed = kept.groupby(self.group_cols, sort=False).tail(1)
+
+        recomputed = self._compute(self.daily[self.daily["date"] >= cutoff], context=context, seed=seed)
+        self.trends = pd.concat([kept, recomputed]).sort_values(keys).reset_index(drop=True)
+        return self
+
+    def series(self, start_date, end_date, **group_values):
+        """Trend rows inside the inclusive date range, optionally restricted to group values."""
+        trends = self.trends
+        mask = (trends["date"] >= pd.Timestamp(start_date).normalize()) & (trends["date"] <= pd.Timestamp(end_date))
+        for col, values in group_values.items():
+            mask &= trends[col].isin(values if isinstance(values, (list, tuple, set)) else [values])
+        return trends[mask]
+
+
+class TrendStore:
+    """
+    Trend engines for the latest dataset version, shared across dashboard sessions.
+
+    A new version that only appends rows after the last known day (every earlier
+    row unchanged, including its misdiagnosis flag) is folded in with
+    `TrendEngine.update`; any other change rebuilds the engines.
+    """
+
+    def __init__(self, levels=None, **engine_kwargs):
+        self.levels = levels or {"shop": ("shop_id",), "technician": ("shop_id", "technician")}
+        self.engine_kwargs = engine_kwargs
+        self.version = None
+        self.engines = None
+        self._last_date = None
+        self._fingerprint = None
+        self._lock = threading.Lock()
+
+    def _rows_fingerprint(self, df, dates, mask):
+        """
+        Order-independent fingerprint of every input the engines read (group keys,
+        day and summed values) for the rows in `mask`.
+        """
+        columns = sorted({col for group_cols in self.levels.values() for col in group_cols})
+        work = pd.DataFrame({
+            col: df.loc[mask, col].fillna("").astype(str) if col in df.columns else "" for col in columns
+        }, index=df.index[mask])
+        work["date"] = dates[mask].dt.normalize()
+        work["efficiency_deviation"] = pd.to_numeric(df.loc[mask, "efficiency_deviation"], errors="coerce").fillna(0)
+        work["misdiagnosed"] = pd.to_numeric(df.loc[mask, "suspected_misdiagnosis"], errors="coerce") == 1
+        # uint64 sums wrap around, which keeps the multiset hash well defined
+        return int(mask.sum()), int(pd.util.hash_pandas_object(work, index=False).sum())
+
+    def get(self, data_version, df):
+        with self._lock:
+            if data_version == self.version and self.engines is not None:
+                return self.engines
+
+            dates = pd.to_datetime(df["service_date"], errors="coerce")
+            if self.engines is not None and self._last_date is not None:
+                appended_only = self._rows_fingerprint(df, dates, dates <= self._last_date) == self._fingerprint
+            else:
+                appended_only = False
+
+            if appended_only:
+                new_rows = df[dates > self._last_date]
+                for engine in self.engines.values():
+                    engine.update(new_rows)
+            else:
+                self.engines = {
+                    level: TrendEngine(group_cols, **self.engine_kwargs).fit(df)
+                    for level, group_cols in self.levels.items()
+                }
+
+            self.version = data_version
+            self._last_date = dates.max()
+            self._fingerprint = self._rows_fingerprint(df, dates, dates <= self._last_date)
+            return self.engines
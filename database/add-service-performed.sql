@@ -0,0 +1,5 @@
+-- Adds service_performed to transformed_service_data for tables created before it was a model input
+-- Written by build_transformed_service_data.py; read by the scoring service through the action-recommendations route
+-- Run this in your Supabase SQL editor, then re-run build_transformed_service_data.py to backfill it
+
+ALTER TABLE transformed_service_data ADD COLUMN IF NOT EXISTS service_performed TEXT;
@@ -0,0 +1,26 @@
+-- Daily rollup of transformed_service_data for long-range dashboard views
+-- One row per shop x day; maintained by build_transformed_service_data.py
+-- Run this in your Supabase SQL editor
+
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    shop_id TEXT NOT NULL DEFAULT '',
+    service_date DATE NOT NULL,
+
+    -- Additive measures
+    job_count INTEGER NOT NULL DEFAULT 0,
+    estimated_loss DECIMAL(14,2) NOT NULL DEFAULT 0,
+    efficiency_loss DECIMAL(14,4) NOT NULL DEFAULT 0,
+    efficiency_deviation DECIMAL(14,4) NOT NULL DEFAULT 0,
+    labor_hours_billed DECIMAL(12,2) NOT NULL DEFAULT 0,
+    invoice_total DECIMAL(14,2) NOT NULL DEFAULT 0,
+    repeat_45d INTEGER NOT NULL DEFAULT 0,
+    misdiagnosis_cases INTEGER NOT NULL DEFAULT 0,
+    misdiagnosis_loss DECIMAL(14,2) NOT NULL DEFAULT 0,
+
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    -- Upsert target for incremental updates; also serves per-shop range scans
+    PRIMARY KEY (shop_id, service_date)
+);
+
+ANALYZE daily_rollup;
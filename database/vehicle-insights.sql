@@ -0,0 +1,34 @@
+-- Precomputed AI insights for each shop's top systemic vehicles
+-- Maintained by build_transformed_service_data.py --with-insights; read by the dashboard
+-- Run this in your Supabase SQL editor
+
+CREATE TABLE IF NOT EXISTS vehicle_insights (
+    shop_id TEXT NOT NULL DEFAULT '',
+    make TEXT NOT NULL,
+    model TEXT NOT NULL,
+    year TEXT NOT NULL,
+
+    -- Fingerprint of the complaint set the insights were generated from
+    complaint_fingerprint TEXT NOT NULL,
+    complaint_count INTEGER NOT NULL DEFAULT 0,
+    total_impact DECIMAL(14,2) NOT NULL DEFAULT 0,
+
+    summary TEXT,
+    corrective_action TEXT,
+    model_name TEXT,
+    generated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    -- Upsert target; one insight row per shop and vehicle (scope is added to it below)
+    PRIMARY KEY (shop_id, make, model, year)
+);
+
+-- Set when the insight was reused from a near-identical vehicle instead of generated
+ALTER TABLE vehicle_insights ADD COLUMN IF NOT EXISTS reused_from TEXT;
+
+-- Row set the vehicle was ranked in: 'all' (full history) or the dashboard's default date preset ('1y');
+-- a vehicle can have one insight per scope
+ALTER TABLE vehicle_insights ADD COLUMN IF NOT EXISTS scope TEXT NOT NULL DEFAULT 'all';
+ALTER TABLE vehicle_insights DROP CONSTRAINT IF EXISTS vehicle_insights_pkey;
+ALTER TABLE vehicle_insights ADD PRIMARY KEY (shop_id, scope, make, model, year);
+
+ANALYZE vehicle_insights;
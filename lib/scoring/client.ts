@@ -0,0 +1,55 @@
+// Client for the local Python scoring service (scoring_server.py)
+
+const SCORING_SERVICE_URL = process.env.SCORING_SERVICE_URL || 'http://127.0.0.1:8090'
+const SCORING_TIMEOUT_MS = parseInt(process.env.SCORING_TIMEOUT_MS || '2000')
+// Matches MAX_REQUEST_ROWS in scoring_server.py
+const MAX_ROWS_PER_REQUEST = 10000
+
+export interface ModelPrediction {
+  predicted_misdiagnosis: number
+  label: string
+}
+
+export interface ScoringResult {
+  predictions: ModelPrediction[]
+  model: string
+}
+
+async function postRows(rows: Record<string, any>[]): Promise<ScoringResult> {
+  const response = await fetch(`${SCORING_SERVICE_URL}/score`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ rows }),
+    signal: AbortSignal.timeout(SCORING_TIMEOUT_MS),
+    cache: 'no-store'
+  })
+  if (!response.ok) {
+    throw new Error(`Scoring service returned ${response.status}`)
+  }
+  return response.json()
+}
+
+/**
+ * Model predictions for service rows (snake_case feature columns), in order.
+ * Returns null when the scoring service is not running or fails, so routes can
+ * respond without model scores instead of erroring.
+ */
+export async function scoreRows(rows: Record<string, any>[]): Promise<ScoringResult | null> {
+  if (rows.length === 0) {
+    return { predictions: [], model: '' }
+  }
+  try {
+    const chunks: Record<string, any>[][] = []
+    for (let i = 0; i < rows.length; i += MAX_ROWS_PER_REQUEST) {
+      chunks.push(rows.slice(i, i + MAX_ROWS_PER_REQUEST))
+    }
+    const results = await Promise.all(chunks.map(postRows))
+    return {
+      predictions: results.flatMap(result => result.predictions),
+      model: results[0].model
+    }
+  } catch (error) {
+    console.warn('Scoring service unavailable:', error)
+    return null
+  }
+}
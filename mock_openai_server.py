@@ -0,0 +1,147 @@
+"""
+Local OpenAI-compatible mock server for testing AI insight latency and failure handling offline.
+
+Serves POST /v1/chat/completions (plain, streaming and JSON mode) with
+configurable latency and injected failures. Point the app at it with:
+
+    python mock_openai_server.py --latency 0.5 --failure-rate 0.2
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=mock streamlit run app.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_TEXT = (
+    "Recurring complaints point to an unresolved root cause. Verify the diagnosis with a road test, "
+    "check prior visits for the same symptom, and confirm the repair before release to reduce comebacks."
+)
+
+
+class MockSettings:
+    def __init__(self, latency=0.2, jitter=0.1, token_delay=0.01, failure_rate=0.0, failure_status=429,
+                 outage_after=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_delay = token_delay
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.outage_after = outage_after
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+def _json_mode_content(prompt):
+    """
+    Structured answer: one result per vehicle id for a batched prompt, otherwise
+    a single vehicle insight.
+    """
+    insight = {"summary": MOCK_TEXT, "corrective_action": MOCK_TEXT}
+    if "Vehicles (JSON)" not in prompt:
+        return json.dumps(insight)
+    ids = [int(i) for i in re.findall(r'"id":\s*(\d+)', prompt)]
+    return json.dumps({"results": [{"id": i, **insight} for i in ids]})
+
+
+def make_handler(settings):
+    class MockHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send_json(200, {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model"}]})
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+            with settings.lock:
+                settings.requests += 1
+                count = settings.requests
+            time.sleep(max(0.0, settings.latency + random.uniform(-settings.jitter, settings.jitter)))
+
+            outage = settings.outage_after is not None and count > settings.outage_after
+            if outage or random.random() < settings.failure_rate:
+                status = 503 if outage else settings.failure_status
+                headers = {"Retry-After": "1"} if status == 429 else None
+                self._send_json(status, {"error": {"message": "mock failure", "type": "mock_error"}}, headers)
+                return
+
+            prompt = " ".join(m.get("content", "") for m in request.get("messages", []))
+            json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+            content = _json_mode_content(prompt) if json_mode else MOCK_TEXT
+            completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+            model = request.get("model", "gpt-4o-mini")
+
+            if request.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for word in re.findall(r"\S+\s*", content):
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(settings.token_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                return
+
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                          "total_tokens": (len(prompt) + len(content)) // 4},
+            })
+
+    return MockHandler
+
+
+def serve(host="127.0.0.1", port=8089, settings=None):
+    """Start the mock server; returns the server (call shutdown() to stop it) running on a daemon thread."""
+    server = ThreadingHTTPServer((host, port), make_handler(settings or MockSettings()))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before each response starts")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Random +/- seconds added to the latency")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds between streamed chunks")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--failure-status", type=int, default=429, help="HTTP status returned for injected failures")
+    parser.add_argument("--outage-after", type=int, help="Return 503 for every request after this many")
+    args = parser.parse_args()
+
+    settings = MockSettings(args.latency, args.jitter, args.token_delay, args.failure_rate,
+                            args.failure_status, args.outage_after)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(settings))
+    print(f"Mock OpenAI server listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
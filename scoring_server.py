@@ -0,0 +1,125 @@
+"""
+Long-running local scoring service for the misdiagnosis model.
+
+Keeps the model warm (core.ml_model's registry, which also picks up a
+retrained model.pkl) and coalesces concurrent requests into micro-batches, so
+the Next.js API routes can get model scores without spawning Python per request.
+
+    python scoring_server.py --port 8090 --window-ms 5
+
+    POST /score    {"rows": [{"efficiency_deviation": 1.2, ...}, ...]}
+                   -> {"predictions": [{"predicted_misdiagnosis": 0, "label": "..."}], "model": "<sha>"}
+    GET  /health   model status
+    GET  /metrics  request, batch, latency and throughput counters
+"""
+import argparse
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from core.micro_batcher import MicroBatcher
+from core.ml_model import MODEL_PATH, get_scorer, load_model, model_registry
+
+# Largest request accepted; bigger jobs should be scored offline
+MAX_REQUEST_ROWS = 10_000
+REQUEST_TIMEOUT = 30.0
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # socketserver's default listen backlog of 5 resets connections under concurrent load
+    request_queue_size = 256
+
+
+def make_handler(batcher, model_path=MODEL_PATH):
+    class ScoringHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.rstrip("/")
+            if path == "/metrics":
+                self._send_json(200, {**batcher.metrics.snapshot(), "models": model_registry.report()})
+            elif path == "/health":
+                try:
+                    entry = model_registry.get_entry(model_path)
+                    self._send_json(200, {"status": "ok", "model": entry.sha256[:12]})
+                except Exception as e:
+                    self._send_json(503, {"status": "unavailable", "error": str(e)})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/score":
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                rows = body["rows"] if isinstance(body, dict) else body
+                if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                    raise ValueError("'rows' must be a list of objects")
+            except (ValueError, KeyError) as e:
+                self._send_json(400, {"error": f"Invalid request: {e}"})
+                return
+            if len(rows) > MAX_REQUEST_ROWS:
+                self._send_json(413, {"error": f"At most {MAX_REQUEST_ROWS} rows per request"})
+                return
+            if not rows:
+                self._send_json(200, {"predictions": []})
+                return
+
+            try:
+                scored = batcher.score(pd.DataFrame.from_records(rows), timeout=REQUEST_TIMEOUT)
+            except Exception as e:
+                self._send_json(500, {"error": f"Scoring failed: {e}"})
+                return
+            self._send_json(200, {
+                "predictions": [
+                    {"predicted_misdiagnosis": int(pred), "label": label}
+                    for pred, label in zip(scored["Predicted_Misdiagnosis"], scored["Prediction_Label"])
+                ],
+                "model": model_registry.get_entry(model_path).sha256[:12],
+            })
+
+    return ScoringHandler
+
+
+def serve(host="127.0.0.1", port=8090, window_ms=5.0, max_batch_rows=4096, model_path=MODEL_PATH):
+    """Load the model, then serve until interrupted."""
+    load_model(model_path)
+    batcher = MicroBatcher(lambda df: get_scorer(load_model(model_path)).score(df),
+                           window_ms=window_ms, max_batch_rows=max_batch_rows)
+    server = ScoringServer((host, port), make_handler(batcher, model_path))
+    print(f"SUCCESS: Scoring {model_path} on http://{host}:{port} "
+          f"(window {window_ms:g} ms, up to {max_batch_rows} rows per batch)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("SCORING_SERVICE_PORT", "8090")))
+    parser.add_argument("--window-ms", type=float, default=5.0, help="How long to wait for more requests to batch")
+    parser.add_argument("--max-batch-rows", type=int, default=4096, help="Rows that end a batch early")
+    parser.add_argument("--model", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.window_ms, args.max_batch_rows, args.model)
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.daily_rollup import (
+    build_daily_rollup,
+    day_bounds,
+    diff_rollup,
+    normalize_rollup,
+    rollup_records,
+    select_rollup,
+)
+from core.filter_index import FilterIndex
+from core.kpis import compute_kpis, compute_kpis_from_rollup
+
+
+def _frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    days = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 500, n), unit="D")
+    # Some rows carry a time of day, which must not move them out of their day
+    times = pd.to_timedelta(rng.choice([0, 0, 9 * 3600, 17 * 3600 + 1800], n), unit="s")
+    return pd.DataFrame({
+        "shop_id": rng.choice(["shop-a", "shop-b", None], n),
+        "service_date": days + times,
+        "estimated_loss": rng.uniform(0, 900, n).round(2),
+        "efficiency_loss": rng.uniform(0, 300, n).round(2),
+        "repeat_45d": rng.integers(0, 2, n),
+        "invoice_total": rng.uniform(40, 1500, n).round(2),
+        "labor_hours_billed": rng.uniform(0.2, 8, n).round(1),
+        "efficiency_deviation": rng.normal(0, 1.5, n).round(4),
+        "suspected_misdiagnosis": rng.choice([0, 1, 2], n),
+        "customer_name": rng.choice([f"Customer {i}" for i in range(n // 3 + 1)], n),
+        "technician": rng.choice(["Alex", "Sam"], n),
+    })
+
+
+def _stored(rollup):
+    """The rollup as the dashboard reads it back from the table."""
+    return normalize_rollup(pd.DataFrame(rollup_records(rollup)))
+
+
+RANGES = [
+    ("2023-01-01", "2024-05-15"),
+    ("2023-06-01", "2023-06-01"),
+    ("2023-03-10 17:00", "2023-09-02 08:00"),
+    ("2024-01-01", "2024-12-31"),
+]
+
+
+@pytest.mark.parametrize("start, end", RANGES)
+def test_rollup_kpis_match_raw_rows(start, end):
+    df = _frame(3000).sort_values("service_date", ignore_index=True)
+    index = FilterIndex(df)
+    lo, hi = index.date_window(*day_bounds(start, end))
+    raw = df.iloc[index.select(lo, hi, {})]
+    rollup_rows = select_rollup(_stored(build_daily_rollup(df)), start, end)
+
+    assert rollup_rows["job_count"].sum() == len(raw)
+    expected = compute_kpis(raw).to_dict()
+    actual = compute_kpis_from_rollup(rollup_rows, expected["unique_customers"]).to_dict()
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        assert actual[key] == pytest.approx(value, rel=1e-9, abs=1e-6), key
+
+
+def test_rollup_reduces_rows():
+    df = _frame(3000)
+    rollup = build_daily_rollup(df)
+    assert len(rollup) < len(df) / 2
+    assert rollup["job_count"].sum() == len(df)
+    assert set(rollup["shop_id"]) == {"shop-a", "shop-b", ""}
+
+
+def test_select_by_shop():
+    df = _frame(500)
+    rollup = build_daily_rollup(df)
+    rows = select_rollup(rollup, "2023-01-01", "2024-12-31", ["shop-a"])
+    assert rows["job_count"].sum() == (df["shop_id"] == "shop-a").sum()
+
+
+def test_diff_only_touches_changed_days():
+    df = _frame(500)
+    stored = _stored(build_daily_rollup(df))
+
+    changed, stale = diff_rollup(build_daily_rollup(df), stored)
+    assert changed.empty and stale.empty
+
+    first_day = df["service_date"].dt.normalize().min()
+    edited = df[df["service_date"].dt.normalize() != first_day].copy()
+    last = edited["service_date"].idxmax()
+    edited.loc[last, "estimated_loss"] += 50
+    changed, stale = diff_rollup(build_daily_rollup(edited), stored)
+
+    assert len(changed) == 1
+    assert changed.loc[0, "service_date"] == edited.loc[last, "service_date"].normalize()
+    assert set(stale["service_date"]) == {first_day}
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.feature_store import (
+    FEATURES, MISSING_CATEGORY, load_snapshot, materialize, read_manifest, write_snapshot,
+)
+
+
+def _frame(n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "shop_id": "shop-a",
+        "vin": [f"VIN{i:05d}" for i in range(n)],
+        "service_date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 90, n), unit="D"),
+        "make": rng.choice(["Ford", "Honda"], n),
+        "model": rng.choice(["F-150", "Civic"], n),
+        "complaint": rng.choice(["Brake noise", "Rough idle"], n),
+        "technician": rng.choice(["Alex", "Sam"], n),
+        "suspected_misdiagnosis": rng.choice([0, 1, 2], n),
+    })
+    for feature in FEATURES:
+        if feature.kind == "numeric":
+            # Full-precision floats, so a lossy text round-trip would show
+            df[feature.name] = rng.normal(100, 30, n)
+        else:
+            df[feature.name] = rng.choice(["Brakes", "Oil change"], n)
+    df.loc[1, "invoice_total"] = np.nan
+    df.loc[2, "invoice_total"] = 1 / 3
+    df.loc[3, "service_performed"] = "None"
+    df.loc[4, "service_performed"] = None
+    df.loc[5, "service_performed"] = "NA"
+    df.loc[6, "job_complexity"] = np.nan
+    return df
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    df = _frame()
+    entry = write_snapshot(df, shop_id="shop-a", store_dir=tmp_path)
+    return df, entry, tmp_path
+
+
+def test_round_trip_matches_materialized_frame(snapshot):
+    df, entry, store_dir = snapshot
+    loaded, loaded_entry = load_snapshot(store_dir=store_dir)
+
+    assert loaded_entry == entry
+    pd.testing.assert_frame_equal(loaded, materialize(df), check_exact=True)
+    assert {col: str(dtype) for col, dtype in loaded.dtypes.items()} == entry["columns"]
+
+
+def test_categorical_text_is_kept_and_gaps_are_marked(snapshot):
+    _, _, store_dir = snapshot
+    loaded, _ = load_snapshot(store_dir=store_dir)
+
+    # Text pandas would read as missing by default stays text; only real gaps become MISSING_CATEGORY
+    assert loaded.loc[3, "service_performed"] == "None"
+    assert loaded.loc[5, "service_performed"] == "NA"
+    assert loaded.loc[4, "service_performed"] == MISSING_CATEGORY
+    assert loaded.loc[6, "job_complexity"] == MISSING_CATEGORY
+    assert loaded["service_performed"].notna().all()
+
+    assert np.isnan(loaded.loc[1, "invoice_total"])
+    assert loaded.loc[2, "invoice_total"] == 1 / 3
+
+
+def test_column_subset_and_snapshot_selection(snapshot):
+    df, first, store_dir = snapshot
+    second = write_snapshot(df.head(10), store_dir=store_dir)
+    assert [s["id"] for s in read_manifest(store_dir)] == [first["id"], second["id"]]
+
+    latest, entry = load_snapshot(columns=["vin", "service_performed", "invoice_total"], store_dir=store_dir)
+    assert entry["id"] == second["id"]
+    assert set(latest.columns) == {"vin", "service_performed", "invoice_total"}
+    assert len(latest) == 10
+
+    older, _ = load_snapshot(first["id"], columns=["service_performed"], store_dir=store_dir)
+    assert older.loc[3, "service_performed"] == "None"
+    with pytest.raises(FileNotFoundError):
+        load_snapshot("v1-missing", store_dir=store_dir)
+
+
+def test_missing_feature_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="service_performed"):
+        write_snapshot(_frame().drop(columns="service_performed"), store_dir=tmp_path)
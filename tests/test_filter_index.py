@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.filter_index import FilterIndex
+
+
+@pytest.fixture(scope="module")
+def df():
+    rng = np.random.default_rng(0)
+    n = 1000
+    df = pd.DataFrame({
+        "service_date": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 400, n), unit="D"),
+        "technician": rng.choice(["Ana", "Ben", "Cho", "Dev"], n).astype(object),
+        "make": rng.choice(["Ford", "Honda", "Toyota"], n),
+        "complaint": rng.choice(["noise", "leak", "no start", "vibration", "warning light"], n),
+        "estimated_loss": rng.uniform(0, 2000, n).round(2),
+    })
+    df.loc[rng.random(n) < 0.05, "technician"] = None
+    df.loc[rng.random(n) < 0.02, "service_date"] = pd.NaT
+    return df
+
+
+def _baseline(df, start, end, filters, min_loss):
+    """The dashboard's previous pandas mask chain."""
+    out = df[(df["service_date"] >= start) & (df["service_date"] <= end)]
+    for col, values in filters.items():
+        out = out[out[col].isin(values)]
+    if min_loss > 0:
+        out = out[out["estimated_loss"] >= min_loss]
+    return out
+
+
+CASES = [
+    ("2023-01-01", "2024-12-31", {}, 0),
+    ("2023-03-15", "2023-09-30", {"technician": ["Ana", "Cho"]}, 0),
+    ("2023-02-01", "2023-12-31", {"make": ["Ford"], "complaint": ["leak", "noise"]}, 500),
+    ("2023-06-01", "2023-06-30", {"technician": ["Ben"], "make": ["Honda", "Toyota"]}, 0),
+    ("2023-05-01", "2023-08-01", {"technician": ["Nobody"]}, 0),
+    ("2025-01-01", "2025-12-31", {}, 0),
+]
+
+
+@pytest.mark.parametrize("start,end,filters,min_loss", CASES)
+def test_select_matches_pandas_mask(df, start, end, filters, min_loss):
+    index = FilterIndex(df)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    lo, hi = index.date_window(start, end)
+
+    selected = index.select(lo, hi, filters, min_loss=min_loss)
+    expected = _baseline(df, start, end, filters, min_loss)
+
+    assert sorted(df.index[selected]) == sorted(expected.index)
+
+
+@pytest.mark.parametrize("start,end,filters,min_loss", CASES)
+def test_values_in_matches_sorted_unique(df, start, end, filters, min_loss):
+    index = FilterIndex(df)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    lo, hi = index.date_window(start, end)
+    expected = _baseline(df, start, end, filters, 0)
+
+    for col in ("technician", "make", "complaint"):
+        assert index.values_in(col, lo, hi, filters) == sorted(expected[col].dropna().unique().tolist())
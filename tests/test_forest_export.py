@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+
+from core.forest_export import CompactForest, export_forest
+from core.ml_model import MisdiagnosisScorer
+from train_model import build_preprocessor
+
+NUMERIC = ["efficiency_deviation", "invoice_total", "labor_hours_billed"]
+CATEGORICAL = ["service_performed", "make"]
+
+
+def _rows(n, seed):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "efficiency_deviation": rng.normal(size=n),
+        "invoice_total": rng.uniform(50, 900, size=n).round(2),
+        "labor_hours_billed": rng.uniform(0.5, 6, size=n).round(1),
+        "service_performed": rng.choice(["brakes", "oil change", "alignment", "unknown"], size=n),
+        "make": rng.choice(["Ford", "Honda", "Toyota"], size=n),
+    })
+    for col in NUMERIC:
+        df.loc[rng.random(n) < 0.1, col] = np.nan
+    return df
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    X = _rows(400, seed=0)
+    y = np.where(X["efficiency_deviation"].fillna(0) > 0.5, 2,
+                 np.where(X["invoice_total"].fillna(0) > 600, 1, 0))
+    model = Pipeline([
+        ("preprocessor", build_preprocessor(NUMERIC, CATEGORICAL)),
+        ("classifier", RandomForestClassifier(n_estimators=25, random_state=0)),
+    ]).fit(X, y)
+    path = tmp_path_factory.mktemp("compact") / "model_compact.npz"
+    export_forest(model, path)
+    return model, CompactForest(path)
+
+
+@pytest.fixture
+def test_rows():
+    df = _rows(300, seed=1)
+    # Unseen and missing categories and an unparseable number, as the API might send them
+    df.loc[0, "service_performed"] = "transmission flush"
+    df.loc[2, "make"] = np.nan
+    df["invoice_total"] = df["invoice_total"].astype(object)
+    df.loc[1, "invoice_total"] = "n/a"
+    return df
+
+
+def _model_input(df):
+    """Rows as MisdiagnosisScorer feeds them to the pipeline: numbers coerced (bad or missing -> 0),
+    categories with missing -> 0, absent columns -> 0."""
+    out = pd.DataFrame(index=df.index)
+    for col in NUMERIC:
+        out[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype("float64") if col in df.columns else 0.0
+    for col in CATEGORICAL:
+        out[col] = df[col].fillna(0) if col in df.columns else 0
+    return out
+
+
+@pytest.mark.parametrize("drop", [None, "labor_hours_billed"])
+def test_predict_proba_matches_pipeline_bit_for_bit(exported, test_rows, drop):
+    model, compact = exported
+    rows = test_rows.drop(columns=drop) if drop else test_rows
+    expected = model.predict_proba(_model_input(rows))
+
+    np.testing.assert_array_equal(compact.predict_proba(rows), expected)
+    # Same classes the scorer predicts for the same rows
+    np.testing.assert_array_equal(
+        model.classes_[expected.argmax(axis=1)], MisdiagnosisScorer(model).score(rows)["Predicted_Misdiagnosis"]
+    )
+
+
+@pytest.mark.parametrize("drop", [None, "labor_hours_billed"])
+def test_score_matches_scorer(exported, test_rows, drop):
+    model, compact = exported
+    rows = test_rows.drop(columns=drop) if drop else test_rows
+    pd.testing.assert_frame_equal(compact.score(rows), MisdiagnosisScorer(model).score(rows))
+
+
+def test_single_row_dicts_match_frame(exported, test_rows):
+    _, compact = exported
+    rows = test_rows.head(60).copy()
+    # Values the pandas-free dict path must coerce exactly like pd.to_numeric / fillna
+    rows.loc[3, "invoice_total"] = "1_000"
+    rows.loc[4, "invoice_total"] = " 250.5 "
+    rows.loc[6, "invoice_total"] = None
+    rows.loc[7, "service_performed"] = None
+    expected = compact.predict_proba(rows)
+    for position, record in enumerate(rows.to_dict("records")):
+        np.testing.assert_array_equal(compact.predict_proba(record), expected[[position]])
+
+    record = rows.iloc[0].to_dict()
+    del record["labor_hours_billed"], record["make"]
+    np.testing.assert_array_equal(
+        compact.predict_proba(record), compact.predict_proba(rows.iloc[[0]].drop(columns=["labor_hours_billed", "make"]))
+    )
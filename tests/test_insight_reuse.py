@@ -0,0 +1,73 @@
+import pytest
+
+from core.insight_reuse import InsightIndex, complaint_counts, weighted_jaccard
+
+BRAKES = ["Brake noise"] * 3 + ["Check engine light"]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = InsightIndex(tmp_path / "cache.sqlite")
+    index.add("Honda", "Civic", 2011, BRAKES, {"summary": "2011 brakes"})
+    index.add("Honda", "Civic", 2014, ["Brake noise"] * 2 + ["AC not cooling"] * 2, {"summary": "2014 mixed"})
+    index.add("Ford", "F-150", 2018, BRAKES, {"summary": "ford"})
+    return index
+
+
+def test_weighted_jaccard():
+    a = complaint_counts(BRAKES)
+    assert weighted_jaccard(a, a) == 1.0
+    assert weighted_jaccard(a, complaint_counts(["Brake noise"] * 3)) == pytest.approx(3 / 4)
+    assert weighted_jaccard(a, complaint_counts(["AC not cooling"])) == 0.0
+    assert weighted_jaccard({}, {}) == 0.0
+
+
+def test_counts_fold_case_and_whitespace():
+    assert complaint_counts(["Brake  noise", " brake noise", None, " "]) == {"brake noise": 2}
+
+
+@pytest.mark.parametrize("complaints, threshold, expected", [
+    (BRAKES, 1.0, ("2011 brakes", 1.0)),
+    (["brake NOISE"] * 3, 0.75, ("2011 brakes", 0.75)),   # similarity exactly at the threshold
+    (["brake NOISE"] * 3, 0.76, None),
+    (["Brake noise"] * 2 + ["AC not cooling"], 0.5, ("2014 mixed", 0.75)),  # best of two candidates
+    (["Rough idle"], 0.1, None),
+    ([], 0.0, None),
+])
+def test_find_similar_thresholds(index, complaints, threshold, expected):
+    match = index.find_similar("HONDA", " civic ", complaints, threshold)
+    if expected is None:
+        assert match is None
+    else:
+        insight, similarity, _ = match
+        assert (insight["summary"], similarity) == pytest.approx(expected)
+
+
+def test_find_similar_is_per_make_and_model(index):
+    insight, _, year = index.find_similar("Ford", "F-150", BRAKES, 0.9)
+    assert (insight["summary"], year) == ("ford", "2018")
+    assert index.find_similar("Ford", "Ranger", BRAKES, 0.0) is None
+
+
+def test_exclude_year_skips_the_vehicles_own_entries(index):
+    _, _, year = index.find_similar("Honda", "Civic", BRAKES, 0.5)
+    assert year == "2011"
+
+    # Excluding its own year (given as int or text) falls through to the next best match
+    for excluded in (2011, "2011"):
+        insight, similarity, year = index.find_similar("Honda", "Civic", BRAKES, 0.3, exclude_year=excluded)
+        assert (insight["summary"], year) == ("2014 mixed", "2014")
+        assert similarity == pytest.approx(2 / 6)
+    assert index.find_similar("Honda", "Civic", BRAKES, 0.5, exclude_year=2011) is None
+
+
+def test_expired_entries_are_ignored(tmp_path):
+    index = InsightIndex(tmp_path / "cache.sqlite", ttl_seconds=-1)
+    index.add("Honda", "Civic", 2011, BRAKES, {"summary": "old"})
+    assert index.find_similar("Honda", "Civic", BRAKES, 0.0) is None
+
+
+def test_reused_counts_matches_only(index):
+    index.find_similar("Honda", "Civic", BRAKES, 0.9)
+    index.find_similar("Honda", "Civic", ["Rough idle"], 0.9)
+    assert index.reused == 1
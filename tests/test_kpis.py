@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.kpis import compute_kpis
+
+
+def _frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "estimated_loss": rng.uniform(0, 900, n).round(2),
+        "efficiency_loss": rng.uniform(0, 300, n).round(2),
+        "repeat_45d": rng.integers(0, 2, n),
+        "invoice_total": rng.uniform(40, 1500, n).round(2),
+        "labor_hours_billed": rng.uniform(0.2, 8, n).round(1),
+        "efficiency_deviation": rng.normal(0, 1.5, n),
+        "suspected_misdiagnosis": rng.choice([0, 1, 2], n),
+        "customer_name": rng.choice([f"Customer {i}" for i in range(n // 3 + 1)], n),
+    })
+
+
+def _baseline(df):
+    """The per-metric formulas the dashboard computed inline before compute_kpis."""
+    total_misdiagnosis = len(df[df["suspected_misdiagnosis"] == 1])
+    total_jobs = len(df)
+    total_efficiency_loss = df["efficiency_loss"].sum()
+    total_estimated_loss = df["estimated_loss"].sum()
+    repeat_jobs = df["repeat_45d"].sum()
+    total_revenue = df["invoice_total"].sum()
+    total_hours = df["labor_hours_billed"].sum()
+    return {
+        "total_jobs": total_jobs,
+        "misdiagnosis_cases": total_misdiagnosis,
+        "misdiagnosis_rate": total_misdiagnosis / total_jobs * 100 if total_jobs > 0 else 0,
+        "misdiagnosis_loss": df[df["suspected_misdiagnosis"] == 1]["estimated_loss"].sum(),
+        "efficiency_loss": total_efficiency_loss,
+        "estimated_loss": total_estimated_loss,
+        "potential_savings": total_estimated_loss + total_efficiency_loss,
+        "repeat_jobs": repeat_jobs,
+        "first_time_fix_rate": (total_jobs - repeat_jobs) / total_jobs * 100 if total_jobs > 0 else 0,
+        "total_revenue": total_revenue,
+        "total_hours": total_hours,
+        "revenue_per_hour": total_revenue / total_hours if total_hours > 0 else 0,
+        "productivity_index": max(0, 100 - df["efficiency_deviation"].mean() * 20),
+        "satisfaction_score": max(0, 100 - repeat_jobs / total_jobs * 100) if total_jobs > 0 else 0,
+        "avg_repair_cost": df["invoice_total"].mean(),
+        "unique_customers": df["customer_name"].nunique(),
+    }
+
+
+@pytest.mark.parametrize("n", [1, 7, 2500])
+def test_matches_per_metric_formulas(n):
+    df = _frame(n, seed=n)
+    kpis = compute_kpis(df).to_dict()
+    for name, expected in _baseline(df).items():
+        assert kpis[name] == pytest.approx(expected, rel=1e-9, abs=1e-9), name
+
+
+def test_empty_selection_is_all_zero():
+    kpis = compute_kpis(_frame(10).iloc[:0])
+    assert kpis.total_jobs == 0
+    assert kpis.misdiagnosis_rate == 0
+    assert kpis.revenue_per_hour == 0
+    assert kpis.first_time_fix_rate == 0
@@ -0,0 +1,67 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.micro_batcher import MicroBatcher
+
+
+def _echo(df):
+    # Output rows are derived from their input rows, so a misrouted slice shows
+    return pd.DataFrame({"request": df["request"], "value": df["value"] * 2}, index=df.index)
+
+
+def _request(i):
+    n = i % 5  # includes empty requests
+    # Every request reuses labels 0..n-1; some are shuffled or duplicated
+    index = np.random.default_rng(i).permutation(n) if i % 3 else [0] * n
+    return pd.DataFrame({"request": i, "value": np.arange(n, dtype=float) + 100 * i}, index=index)
+
+
+def _submit_concurrently(batcher, requests):
+    futures = [None] * len(requests)
+    barrier = threading.Barrier(len(requests))
+
+    def submit(i):
+        barrier.wait()
+        futures[i] = batcher.submit(requests[i])
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [future.result(timeout=10) for future in futures]
+
+
+@pytest.mark.parametrize("max_batch_rows", [4096, 7])
+def test_each_caller_gets_its_own_rows(max_batch_rows):
+    batcher = MicroBatcher(_echo, window_ms=50, max_batch_rows=max_batch_rows)
+    requests = [_request(i) for i in range(40)]
+    try:
+        results = _submit_concurrently(batcher, requests)
+    finally:
+        batcher.close()
+
+    for request, result in zip(requests, results):
+        pd.testing.assert_frame_equal(result, _echo(request))
+    metrics = batcher.metrics.snapshot()
+    assert metrics["requests"] == len(requests)
+    # Requests shared batches, so the slicing was exercised
+    assert metrics["batches"] < len(requests)
+
+
+def test_scoring_error_reaches_every_caller_in_the_batch():
+    def fail(df):
+        raise ValueError("model unavailable")
+
+    batcher = MicroBatcher(fail, window_ms=50)
+    try:
+        futures = [batcher.submit(_request(i)) for i in range(1, 4)]
+        for future in futures:
+            with pytest.raises(ValueError, match="model unavailable"):
+                future.result(timeout=10)
+    finally:
+        batcher.close()
+    assert batcher.metrics.snapshot()["errors"] == 3
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from core.ml_model import predict_misdiagnosis
+
+NUMERIC = ["efficiency_deviation", "invoice_total"]
+CATEGORICAL = ["service_performed"]
+
+
+@pytest.fixture(scope="module")
+def model():
+    rng = np.random.default_rng(0)
+    n = 200
+    X = pd.DataFrame({
+        "efficiency_deviation": rng.normal(size=n),
+        "invoice_total": rng.uniform(50, 900, size=n),
+        "service_performed": rng.choice(["brakes", "oil change", "alignment"], size=n),
+    })
+    y = np.where(X["efficiency_deviation"] > 0.5, 2, np.where(X["invoice_total"] > 600, 1, 0))
+    preprocessor = ColumnTransformer([
+        ("num", Pipeline([("imputer", SimpleImputer(strategy="median")), ("scaler", StandardScaler())]), NUMERIC),
+        ("cat", Pipeline([
+            ("imputer", SimpleImputer(strategy="most_frequent")),
+            ("onehot", OneHotEncoder(handle_unknown="ignore")),
+        ]), CATEGORICAL),
+    ])
+    return Pipeline([
+        ("preprocessor", preprocessor),
+        ("classifier", RandomForestClassifier(n_estimators=10, random_state=0)),
+    ]).fit(X, y)
+
+
+def test_duplicate_index_keeps_one_row_per_input(model):
+    # pd.concat without ignore_index leaves duplicate labels
+    part = pd.DataFrame({
+        "efficiency_deviation": [1.2, -0.3],
+        "invoice_total": [120.0, 750.0],
+        "service_performed": ["brakes", "alignment"],
+    })
+    df = pd.concat([part, part.iloc[:1]])
+    assert list(df.index) == [0, 1, 0]
+
+    result = predict_misdiagnosis(df, model)
+
+    assert len(result) == len(df)
+    assert list(result.index) == list(df.index)
+    expected = model.predict(df[NUMERIC + CATEGORICAL])
+    np.testing.assert_array_equal(result["Predicted_Misdiagnosis"].to_numpy(), expected)
+    assert "Predicted_Misdiagnosis" not in df.columns
+
+
+def test_existing_prediction_columns_are_replaced(model):
+    df = pd.DataFrame({
+        "efficiency_deviation": [0.0, 2.0],
+        "invoice_total": [100.0, 100.0],
+        "service_performed": ["oil change", "brakes"],
+        "Predicted_Misdiagnosis": [-1, -1],
+    }, index=[5, 5])
+
+    result = predict_misdiagnosis(df, model)
+
+    assert list(result.columns).count("Predicted_Misdiagnosis") == 1
+    assert (result["Predicted_Misdiagnosis"] >= 0).all()
+    assert result["Prediction_Label"].notna().all()
+
+
+def test_show_features_reports_the_same_list_as_before(model):
+    df = pd.DataFrame({
+        "efficiency_deviation": [0.4],
+        "invoice_total": [300.0],
+        "service_performed": ["brakes"],
+        "customer_name": ["A"],
+    })
+    _, features = predict_misdiagnosis(df, model, show_features=True)
+    assert features == NUMERIC + CATEGORICAL
+
+    # A plain classifier reports the columns it was fitted on
+    plain = RandomForestClassifier(n_estimators=5, random_state=0).fit(
+        pd.DataFrame({"invoice_total": [1.0, 2.0, 3.0], "efficiency_deviation": [0.0, 1.0, 2.0]}), [0, 1, 2])
+    result, features = predict_misdiagnosis(df, plain, show_features=True)
+    assert features == ["invoice_total", "efficiency_deviation"]
+    assert len(result) == 1
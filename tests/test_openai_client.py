@@ -0,0 +1,142 @@
+import time
+
+import pytest
+
+openai = pytest.importorskip("openai")
+
+from core.openai_client import CircuitBreaker, CircuitOpenError, ResilientClient
+from mock_openai_server import MockSettings, serve
+
+MESSAGES = [{"role": "user", "content": "Summarise this vehicle"}]
+
+
+@pytest.fixture
+def mock_api():
+    settings = MockSettings(latency=0, jitter=0, token_delay=0)
+    server = serve(port=0, settings=settings)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    yield settings, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def _client(base_url, max_retries=3, failure_threshold=2, reset_timeout=0.2, **kwargs):
+    # The SDK's own retries are off so every attempt the mock sees comes from ResilientClient
+    sdk = openai.OpenAI(base_url=base_url, api_key="mock", max_retries=0, timeout=5)
+    breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+    return ResilientClient(sdk, requests_per_minute=6000, max_retries=max_retries, base_delay=0, max_delay=0,
+                           breaker=breaker, **kwargs)
+
+
+def _call(client):
+    return client.chat_completion(model="gpt-4o-mini", messages=MESSAGES)
+
+
+@pytest.mark.parametrize("status", [408, 409, 429, 500, 503])
+def test_retryable_statuses_are_retried(mock_api, status):
+    settings, base_url = mock_api
+    settings.failure_rate, settings.failure_status = 1.0, status
+    client = _client(base_url, max_retries=3, failure_threshold=10)
+
+    with pytest.raises(openai.APIStatusError) as error:
+        _call(client)
+    assert error.value.status_code == status
+    assert settings.requests == 4
+
+
+@pytest.mark.parametrize("status", [400, 401, 404, 422])
+def test_client_errors_are_not_retried_or_counted(mock_api, status):
+    settings, base_url = mock_api
+    settings.failure_rate, settings.failure_status = 1.0, status
+    client = _client(base_url, max_retries=3, failure_threshold=1)
+
+    with pytest.raises(openai.APIStatusError):
+        _call(client)
+    assert settings.requests == 1
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    assert client.breaker.failures == 0
+
+
+def test_retry_recovers_from_transient_failures(mock_api):
+    settings, base_url = mock_api
+    settings.failure_rate = 1.0
+    client = _client(base_url, max_retries=3)
+
+    # Every attempt after the second one succeeds
+    original = client.client.chat.completions.create
+    def create(**kwargs):
+        if settings.requests >= 2:
+            settings.failure_rate = 0.0
+        return original(**kwargs)
+    client.client.chat.completions.create = create
+
+    response = _call(client)
+    assert response.choices[0].message.content
+    assert settings.requests == 3
+    assert client.breaker.failures == 0
+
+
+def test_breaker_opens_on_outage_then_half_opens(mock_api):
+    settings, base_url = mock_api
+    settings.outage_after = 1
+    client = _client(base_url, max_retries=1, failure_threshold=2, reset_timeout=0.2)
+
+    _call(client)
+    for _ in range(2):
+        with pytest.raises(openai.APIStatusError):
+            _call(client)
+    assert client.breaker.state == CircuitBreaker.OPEN
+    assert settings.requests == 1 + 2 * 2
+
+    # Open: rejected without touching the network
+    with pytest.raises(CircuitOpenError):
+        _call(client)
+    assert settings.requests == 5
+
+    # Half-open: one trial; failing it reopens the breaker at once
+    time.sleep(0.25)
+    with pytest.raises(openai.APIStatusError):
+        _call(client)
+    assert client.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        _call(client)
+
+    # Half-open again after the outage ends: a successful trial closes it
+    settings.outage_after = None
+    time.sleep(0.25)
+    assert _call(client).choices[0].message.content
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def _half_open(client):
+    client.breaker.record_failure()
+    client.breaker.record_failure()
+    time.sleep(0.25)
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+
+def test_limiter_timeout_releases_the_trial_slot(mock_api):
+    settings, base_url = mock_api
+    client = _client(base_url, max_retries=0, acquire_timeout=0.01)
+    client.bucket.tokens = 0
+    client.bucket.rate = 0.01
+    _half_open(client)
+
+    with pytest.raises(TimeoutError):
+        _call(client)
+    assert settings.requests == 0
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    # The trial slot is free again for the next caller
+    assert client.breaker.allow()
+
+
+def test_local_errors_release_the_trial_slot(mock_api):
+    settings, base_url = mock_api
+    client = _client(base_url, max_retries=0)
+    _half_open(client)
+
+    with pytest.raises(TypeError):
+        client.chat_completion(model="gpt-4o-mini", messages=MESSAGES, not_an_argument=True)
+    assert settings.requests == 0
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    assert client.breaker.allow()
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from core.daily_rollup import day_bounds
+from core.filter_index import DEFAULT_DATE_RANGE, FilterIndex, preset_dates
+from core.systemic import complaint_fingerprint, insight_scopes, top_systemic_vehicles, vehicle_key
+
+
+def _frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    vehicles = [("Honda", "Civic", 2011), ("Ford", "F-150", 2018), ("Jeep", "Grand Cherokee", 2020),
+                ("VW", "Jetta", 2005), ("Nissan", "Altima", 2022), ("Toyota", "Camry", 2015),
+                ("Hyundai", "Elantra", 2009), ("Kia", "Soul", 2016)]
+    picked = rng.integers(0, len(vehicles), n)
+    return pd.DataFrame({
+        "shop_id": "shop-a",
+        "make": [vehicles[i][0] for i in picked],
+        "model": [vehicles[i][1] for i in picked],
+        "year": [vehicles[i][2] for i in picked],
+        "service_date": pd.Timestamp("2021-08-05") + pd.to_timedelta(rng.integers(0, 4 * 365, n), unit="D"),
+        "complaint": rng.choice(["Brake noise", "Check engine light", "AC not cooling", "Rough idle"], n),
+        "estimated_loss": rng.uniform(0, 900, n).round(2),
+        "efficiency_loss": rng.uniform(0, 300, n).round(2),
+        "suspected_misdiagnosis": rng.choice([0, 1, 2], n),
+        "invoice_total": rng.uniform(40, 1500, n).round(2),
+    })
+
+
+def _stored_keys(issues):
+    return {(vehicle_key(i["make"], i["model"], i["year"]), complaint_fingerprint(i["complaints"])) for i in issues}
+
+
+def test_default_dashboard_view_hits_precomputed_insights():
+    df = _frame(400)
+    stored = set()
+    for scope_df in insight_scopes(df).values():
+        stored |= _stored_keys(top_systemic_vehicles(scope_df, n=5))
+
+    # What the dashboard ranks when it opens: the default preset, no other filters
+    dashboard = df.sort_values("service_date", ignore_index=True)
+    index = FilterIndex(dashboard)
+    start, end = preset_dates(DEFAULT_DATE_RANGE, dashboard["service_date"].min(), dashboard["service_date"].max())
+    lo, hi = index.date_window(*day_bounds(start, end))
+    in_view = top_systemic_vehicles(dashboard.iloc[index.select(lo, hi, {})], n=5)
+
+    assert in_view
+    assert _stored_keys(in_view) <= stored
+    # The full-history ranking alone does not cover the default view
+    assert not _stored_keys(in_view) <= _stored_keys(top_systemic_vehicles(df, n=5))
+
+
+def test_insight_scopes():
+    df = _frame(300)
+    scopes = insight_scopes(df)
+    assert set(scopes) == {"all", DEFAULT_DATE_RANGE}
+    assert len(scopes["all"]) == len(df)
+    window = scopes[DEFAULT_DATE_RANGE]["service_date"]
+    assert window.min() >= df["service_date"].max() - pd.DateOffset(years=1)
+    assert window.max() == df["service_date"].max()
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.trends import TrendEngine, TrendStore
+
+
+def _frame(n, seed=0, start="2024-01-01", days=240):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "shop_id": rng.choice(["shop-a", "shop-b"], n),
+        "technician": rng.choice(["Alex", "Sam", "Jo", None], n),
+        "service_date": pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, n), unit="D"),
+        "efficiency_deviation": rng.normal(0, 1.5, n),
+        "suspected_misdiagnosis": rng.choice([0, 1, 2], n),
+    })
+
+
+def _assert_same_trends(actual, expected):
+    pd.testing.assert_frame_equal(
+        actual.reset_index(drop=True), expected.reset_index(drop=True),
+        check_dtype=False, check_exact=False, rtol=1e-9, atol=1e-12,
+    )
+
+
+@pytest.mark.parametrize("group_cols", [("shop_id",), ("shop_id", "technician")])
+@pytest.mark.parametrize("cutoff", ["2024-03-01", "2024-08-10"])
+def test_update_matches_full_refit(group_cols, cutoff):
+    df = _frame(2000)
+    # A group that only appears after the cutoff
+    df.loc[df.index[-25:], "shop_id"] = "shop-c"
+    df.loc[df.index[-25:], "service_date"] = pd.Timestamp("2024-08-20")
+
+    dates = df["service_date"]
+    old, new = df[dates < cutoff], df[dates >= cutoff]
+
+    incremental = TrendEngine(group_cols).fit(old)
+    # New rows arrive in two deliveries, the second overlapping the first's days
+    incremental.update(new.iloc[::2]).update(new.iloc[1::2])
+    full = TrendEngine(group_cols).fit(df)
+
+    _assert_same_trends(incremental.trends, full.trends)
+    _assert_same_trends(incremental.daily, full.daily)
+
+
+def test_store_appends_new_days_and_rebuilds_on_edits():
+    df = _frame(1500)
+    store = TrendStore()
+    first = store.get("v1", df)
+    shop_engine = first["shop"]
+
+    appended = pd.concat([df, _frame(200, seed=1, start="2024-08-28", days=30)], ignore_index=True)
+    engines = store.get("v2", appended)
+    assert engines["shop"] is shop_engine
+    _assert_same_trends(engines["shop"].trends, TrendEngine(("shop_id",)).fit(appended).trends)
+
+    # Flipping an existing row's flag changes history, so the engines are rebuilt
+    edited = appended.copy()
+    row = edited.index[0]
+    edited.loc[row, "suspected_misdiagnosis"] = 1 - int(edited.loc[row, "suspected_misdiagnosis"] == 1)
+    engines = store.get("v3", edited)
+    assert engines["shop"] is not shop_engine
+    _assert_same_trends(engines["shop"].trends, TrendEngine(("shop_id",)).fit(edited).trends)
+
+
+def test_series_range_and_group_filter():
+    engine = TrendEngine(("shop_id", "technician")).fit(_frame(800))
+    rows = engine.series("2024-02-01", "2024-02-29", shop_id="shop-a", technician=["Alex", "Sam"])
+    assert not rows.empty
+    assert rows["date"].between(pd.Timestamp("2024-02-01"), pd.Timestamp("2024-02-29")).all()
+    assert set(rows["shop_id"]) == {"shop-a"}
+    assert set(rows["technician"]) <= {"Alex", "Sam"}
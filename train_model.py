@@ -1,39 +1,72 @@
+import os
+import copy
+import json
+import shutil
+import time
+from contextlib import contextmanager
+
+import numpy as np
 import pandas as pd
 import joblib
+from threadpoolctl import threadpool_limits
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import StratifiedKFold, cross_validate
-from sklearn.metrics import classification_report
+from sklearn.model_selection import StratifiedKFold, cross_validate, train_test_split
+from sklearn.metrics import classification_report, f1_score
 
-DATA_PATH = "data/transformed_service_data.csv"
-MODEL_PATH = "models/model.pkl"
+from core.feature_store import MODEL_CATEGORICAL_FEATURES, MODEL_NUMERIC_FEATURES, RECORD_KEY, TARGET, load_snapshot
+from core.ml_model import MODEL_DIR, MODEL_PATH
 
-def train_model():
-    print("🔧 Loading transformed data...")
-    df = pd.read_csv(DATA_PATH)
+# Pipeline fit cache older versions kept; CV folds never hit it, so it is removed on the next training run
+LEGACY_PREPROCESSOR_CACHE_DIR = os.path.join(MODEL_DIR, ".preprocessor_cache")
+CV_FOLDS = 5
+# Fingerprints of the service records the saved model was trained on, for incremental updates
+TRAINED_ROWS_PATH = os.path.join(MODEL_DIR, "trained_rows.npy")
+# Written by tune_model.py; its best_params are used with --tuned
+TUNING_REPORT_PATH = os.path.join(MODEL_DIR, "tuning_report.json")
+DEFAULT_CLASSIFIER_PARAMS = {"n_estimators": 200}
 
-    target_col = "Suspected_Misdiagnosis"
-    if target_col not in df.columns:
-        raise ValueError(f"Target column '{target_col}' not found in dataset")
+def resolve_parallelism(n_jobs=-1, cv_jobs=None, cv_folds=CV_FOLDS):
+    """
+    Split the core budget between folds and trees so nested parallelism never oversubscribes.
 
-    y = df[target_col]
+    Returns (total, cv_jobs, tree_jobs): folds run `cv_jobs` at a time, each fold's
+    forest gets `tree_jobs` cores (cv_jobs * tree_jobs <= total), and the final fit uses all `total`.
+    """
+    cores = joblib.cpu_count()
+    total = cores if n_jobs is None or n_jobs < 0 else max(1, min(n_jobs, cores))
+    cv_jobs = min(cv_folds, total) if cv_jobs is None else max(1, min(cv_jobs, cv_folds, total))
+    return total, cv_jobs, max(1, total // cv_jobs)
 
-    numeric_features = [
-        "Efficiency_Deviation", "Efficiency_Loss", "Invoice total",
-        "Labor hours billed", "Odometer reading", "Year",
-        "Repeat_45d", "Complaint_Similarity", "Estimated_Loss", "Cluster_ID"
-    ]
-    categorical_features = [col for col in df.columns if col.startswith("ServicePerformed_")]
-    X = df[numeric_features + categorical_features]
+@contextmanager
+def _phase(timings, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
 
-    # Show class distribution
-    print("\n=== Class Distribution ===")
-    print(y.value_counts())
+def load_training_data(snapshot=None):
+    """
+    Feature matrix, target and the numeric/categorical feature lists from a feature
+    store snapshot (default: the latest), plus the snapshot's id.
+    """
+    numeric_features = list(MODEL_NUMERIC_FEATURES)
+    categorical_features = list(MODEL_CATEGORICAL_FEATURES)
+    df, entry = load_snapshot(snapshot, columns=numeric_features + categorical_features + [TARGET])
 
-    # Preprocessing
+    if TARGET not in df.columns:
+        raise ValueError(f"Target column '{TARGET}' not found in snapshot {entry['id']}")
+
+    y = df[TARGET]
+    X = df[numeric_features + categorical_features]
+    return X, y, numeric_features, categorical_features, entry["id"]
+
+def build_preprocessor(numeric_features, categorical_features):
+    """Unfitted imputation/scaling/one-hot ColumnTransformer for the model's inputs."""
     numeric_transformer = Pipeline(steps=[
         ("imputer", SimpleImputer(strategy="mean")),
         ("scaler", StandardScaler())
@@ -42,25 +75,80 @@ def train_model():
         ("imputer", SimpleImputer(strategy="most_frequent")),
         ("encoder", OneHotEncoder(handle_unknown="ignore"))
     ])
-    preprocessor = ColumnTransformer(
+    return ColumnTransformer(
         transformers=[
             ("num", numeric_transformer, numeric_features),
             ("cat", categorical_transformer, categorical_features),
         ]
     )
 
+def load_tuned_params(path=TUNING_REPORT_PATH):
+    """Best forest parameters found by tune_model.py."""
+    with open(path) as f:
+        return json.load(f)["best_params"]
+
+def _record_fingerprints(snapshot_id):
+    """
+    One 64-bit hash per snapshot row of its record identity (RECORD_KEY), in snapshot
+    order, used to find records the model hasn't seen. Feature values can't be used:
+    dataset-wide features are recomputed on every pipeline run.
+    """
+    ids, _ = load_snapshot(snapshot_id, columns=RECORD_KEY)
+    return pd.util.hash_pandas_object(ids[RECORD_KEY], index=False).to_numpy()
+
+def _save_model(model, trained_rows):
+    """Write the model (uncompressed, memory-mappable) and its trained-row fingerprints atomically."""
+    tmp_path = f"{MODEL_PATH}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, MODEL_PATH)
+    with open(f"{TRAINED_ROWS_PATH}.tmp", "wb") as f:
+        np.save(f, np.unique(trained_rows))
+    os.replace(f"{TRAINED_ROWS_PATH}.tmp", TRAINED_ROWS_PATH)
+
+def train_model(n_jobs=-1, cv_jobs=None, snapshot=None, classifier_params=None):
+    """
+    Cross-validate and train the misdiagnosis model, then save it to MODEL_PATH.
+
+    Args:
+        n_jobs: cores to use (-1 = all)
+        cv_jobs: folds evaluated concurrently (default: as many as the cores allow)
+        snapshot: feature store snapshot id to train on (default: the latest)
+        classifier_params: RandomForestClassifier parameters (default: DEFAULT_CLASSIFIER_PARAMS)
+
+    Returns:
+        dict of seconds spent in each phase
+    """
+    timings = {}
+    total_jobs, cv_jobs, tree_jobs = resolve_parallelism(n_jobs, cv_jobs)
+
+    print("🔧 Loading feature snapshot...")
+    with _phase(timings, "load"):
+        X, y, numeric_features, categorical_features, snapshot_id = load_training_data(snapshot)
+    print(f"Training on feature snapshot {snapshot_id} ({len(X)} rows)")
+
+    # Show class distribution
+    print("\n=== Class Distribution ===")
+    print(y.value_counts())
+
+    classifier_params = {**DEFAULT_CLASSIFIER_PARAMS, **(classifier_params or {})}
+    print(f"Forest parameters: {classifier_params}")
+
     # Full model pipeline
     model = Pipeline(steps=[
-        ("preprocessor", preprocessor),
-        ("classifier", RandomForestClassifier(n_estimators=200, random_state=42))
+        ("preprocessor", build_preprocessor(numeric_features, categorical_features)),
+        ("classifier", RandomForestClassifier(**classifier_params, random_state=42, n_jobs=tree_jobs))
     ])
+    shutil.rmtree(LEGACY_PREPROCESSOR_CACHE_DIR, ignore_errors=True)
 
     # Stratified K-Fold cross-validation
-    skf = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
+    skf = StratifiedKFold(n_splits=CV_FOLDS, shuffle=True, random_state=42)
     scoring = ["precision_macro", "recall_macro", "f1_macro", "accuracy"]
 
-    print("\n🔧 Performing 5-Fold Cross-Validation...")
-    cv_results = cross_validate(model, X, y, cv=skf, scoring=scoring, return_train_score=False)
+    print(f"\n🔧 Performing {CV_FOLDS}-Fold Cross-Validation "
+          f"({cv_jobs} folds at a time x {tree_jobs} cores per forest)...")
+    # BLAS threads are pinned to one per worker so fold x tree parallelism is the only level
+    with _phase(timings, "cross_validation"), threadpool_limits(limits=1):
+        cv_results = cross_validate(model, X, y, cv=skf, scoring=scoring, return_train_score=False, n_jobs=cv_jobs)
 
     # Results
     print("\n✅ Cross-Validation Results")
@@ -69,11 +157,14 @@ def train_model():
               f"± {cv_results[f'test_{metric}'].std():.3f}")
 
     # Train on full dataset
-    print("\n🔧 Training final model on full dataset...")
-    model.fit(X, y)
+    print(f"\n🔧 Training final model on full dataset ({total_jobs} cores)...")
+    model.set_params(classifier__n_jobs=total_jobs)
+    with _phase(timings, "final_fit"):
+        model.fit(X, y)
 
     # Evaluate on full dataset
-    y_pred = model.predict(X)
+    with _phase(timings, "evaluate"):
+        y_pred = model.predict(X)
     print("\n=== Classification Report (on full dataset) ===")
     print(classification_report(y, y_pred, zero_division=0))
 
@@ -84,9 +175,133 @@ def train_model():
     print("\n=== Top 10 Most Important Features ===")
     print(importances.sort_values(ascending=False).head(10))
 
-    # Save model
-    joblib.dump(model, MODEL_PATH)
+    # Serving code decides its own parallelism
+    model.set_params(classifier__n_jobs=None)
+    model.feature_snapshot_ = snapshot_id
+
+    # Save model uncompressed (memory-mappable) and swap it in atomically so
+    # processes hot-reloading MODEL_PATH never read a partial file
+    with _phase(timings, "save"):
+        _save_model(model, _record_fingerprints(snapshot_id))
     print(f"\n✅ Final model saved to {MODEL_PATH}")
 
+    print("\n=== Phase Timings ===")
+    for name, seconds in timings.items():
+        print(f"{name:<18} {seconds:8.2f}s")
+    return timings
+
+def update_model(n_new_trees=20, validation_fraction=0.25, tolerance=0.01, n_jobs=-1, snapshot=None,
+                 min_new_rows=200, max_trees=400):
+    """
+    Incrementally update the saved model with records it hasn't been trained on.
+
+    The saved preprocessor is kept as is; `n_new_trees` trees are warm-started
+    onto the forest using only the new records. The candidate replaces the current
+    model only if its macro F1 on a holdout of the new records, which neither model
+    has seen, is no more than `tolerance` below the current model's. Once the
+    candidate is accepted every new record, held-out ones included, counts as
+    trained. Fewer than `min_new_rows` new records leave the model as it is, and
+    a forest that would grow past `max_trees` needs a full retrain (train_model).
+
+    Returns:
+        dict with the outcome, both validation scores and per-phase timings
+    """
+    timings = {}
+    total_jobs, _, _ = resolve_parallelism(n_jobs, cv_jobs=1)
+
+    with _phase(timings, "load"):
+        X, y, _, _, snapshot_id = load_training_data(snapshot)
+        current = joblib.load(MODEL_PATH)
+        try:
+            seen = np.load(TRAINED_ROWS_PATH)
+        except FileNotFoundError:
+            print(f"ERROR: {TRAINED_ROWS_PATH} not found; run a full retrain first")
+            return {"status": "no_baseline", "timings": timings}
+        fingerprints = _record_fingerprints(snapshot_id)
+        is_new = ~np.isin(fingerprints, seen)
+
+    # A model trained on a different feature set can't take trees fit on these columns
+    if list(getattr(current, "feature_names_in_", X.columns)) != list(X.columns):
+        print("WARNING: Saved model was trained on different features; run a full retrain instead")
+        return {"status": "features_changed", "timings": timings}
+
+    n_new = int(is_new.sum())
+    print(f"🔧 {n_new} new records in snapshot {snapshot_id} since the last training run")
+    if n_new == 0:
+        return {"status": "up_to_date", "timings": timings}
+    if n_new < min_new_rows:
+        print(f"Fewer than {min_new_rows} new records; keeping the current model until more arrive")
+        return {"status": "too_few_new_rows", "timings": timings}
+
+    classifier = current.named_steps["classifier"]
+    if classifier.n_estimators + n_new_trees > max_trees:
+        print(f"WARNING: Forest already has {classifier.n_estimators} trees (limit {max_trees}); "
+              f"run a full retrain instead")
+        return {"status": "tree_limit", "timings": timings}
+    new_rows = np.flatnonzero(is_new)
+    y_new = y.iloc[new_rows]
+    update_rows, holdout_rows = train_test_split(
+        new_rows, test_size=validation_fraction, random_state=42,
+        stratify=y_new if y_new.value_counts().min() >= 2 else None,
+    )
+    X_update, y_update = X.iloc[update_rows], y.iloc[update_rows]
+    X_val, y_val = X.iloc[holdout_rows], y.iloc[holdout_rows]
+    # Every warm-started tree must be fit on the full set of classes to stay compatible with the forest
+    if set(y_update.unique()) != set(classifier.classes_):
+        print("WARNING: New records don't cover every class; run a full retrain instead")
+        return {"status": "classes_missing", "timings": timings}
+
+    with _phase(timings, "warm_start_fit"):
+        # deepcopy, not sklearn's clone, which would discard the fit
+        candidate = copy.deepcopy(current)
+        forest = candidate.named_steps["classifier"]
+        forest.set_params(warm_start=True, n_estimators=forest.n_estimators + n_new_trees, n_jobs=total_jobs)
+        forest.fit(candidate.named_steps["preprocessor"].transform(X_update), y_update)
+        forest.set_params(warm_start=False, n_jobs=None)
+        candidate.feature_snapshot_ = snapshot_id
+
+    with _phase(timings, "validation_gate"):
+        current_f1 = f1_score(y_val, current.predict(X_val), average="macro", zero_division=0)
+        candidate_f1 = f1_score(y_val, candidate.predict(X_val), average="macro", zero_division=0)
+    print(f"Validation macro F1: current {current_f1:.3f}, candidate {candidate_f1:.3f} "
+          f"({len(y_val)} rows, {forest.n_estimators} trees)")
+
+    if candidate_f1 + tolerance < current_f1:
+        print("WARNING: Candidate failed the validation gate; keeping the current model")
+        status = "rejected"
+    else:
+        with _phase(timings, "save"):
+            # Records no longer in the snapshot drop out of the trained set; the holdout
+            # has done its job and is not offered to the next update again
+            _save_model(candidate, fingerprints)
+        print(f"✅ Updated model saved to {MODEL_PATH}")
+        status = "accepted"
+
+    for name, seconds in timings.items():
+        print(f"{name:<18} {seconds:8.2f}s")
+    return {"status": status, "current_f1": current_f1, "candidate_f1": candidate_f1, "timings": timings}
+
 if __name__ == "__main__":
-    train_model()
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Cores to use (-1 = all)")
+    parser.add_argument("--cv-jobs", type=int, help="Folds evaluated concurrently (default: as many as the cores allow)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Add trees trained on new rows only, gated on validation F1, instead of a full retrain")
+    parser.add_argument("--new-trees", type=int, default=20, help="Trees added per incremental update")
+    parser.add_argument("--min-new-rows", type=int, default=200,
+                        help="New records needed before an incremental update runs")
+    parser.add_argument("--max-trees", type=int, default=400,
+                        help="Forest size past which incremental updates stop and a full retrain is needed")
+    parser.add_argument("--gate-tolerance", type=float, default=0.01,
+                        help="Largest macro F1 drop an incremental update may cause")
+    parser.add_argument("--snapshot", help="Feature store snapshot id to train on (default: the latest)")
+    parser.add_argument("--tuned", action="store_true", help=f"Use the best parameters from {TUNING_REPORT_PATH}")
+    args = parser.parse_args()
+
+    if args.incremental:
+        update_model(n_new_trees=args.new_trees, tolerance=args.gate_tolerance, n_jobs=args.n_jobs,
+                     snapshot=args.snapshot, min_new_rows=args.min_new_rows, max_trees=args.max_trees)
+    else:
+        train_model(n_jobs=args.n_jobs, cv_jobs=args.cv_jobs, snapshot=args.snapshot,
+                    classifier_params=load_tuned_params() if args.tuned else None)
@@ -0,0 +1,258 @@
+"""
+Budget-aware hyperparameter search for the misdiagnosis forest using successive halving.
+
+Candidates are sampled from PARAM_GRID and all scored with a small resource
+(a fraction of each fold's training rows, or a small number of trees). Each
+round keeps the best 1/factor of the candidates and multiplies the resource by
+`factor`, until one candidate is left, the full resource is reached or the
+wall-clock budget runs out: a round that would overrun it is not started, and
+within a round a candidate whose fits would end past the deadline is not started.
+
+The preprocessor is fit once per fold and the transformed folds are cached on
+disk, so every candidate fit only grows a forest. (candidate, fold) fits run in
+parallel. The best configuration and a per-round timing and score report are
+written to TUNING_REPORT_PATH; `python train_model.py --tuned` trains with it.
+
+    python tune_model.py --budget 600 --resource n_samples
+"""
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import joblib
+from joblib import Parallel, delayed
+from threadpoolctl import threadpool_limits
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score
+from sklearn.model_selection import StratifiedKFold
+
+from train_model import (
+    CV_FOLDS, MODEL_DIR, TUNING_REPORT_PATH, _phase, build_preprocessor, load_training_data,
+    resolve_parallelism,
+)
+
+PARAM_GRID = {
+    "n_estimators": [100, 200, 400],
+    "max_depth": [None, 8, 16, 24],
+    "min_samples_leaf": [1, 2, 5],
+    "max_features": ["sqrt", 0.5],
+    "class_weight": [None, "balanced", "balanced_subsample"],
+}
+# Trees used by the final round when tree count is the halving resource
+MAX_TREES = 400
+# Preprocessed CV folds, keyed by the training rows; repeated searches on one snapshot reuse them
+FOLD_CACHE_DIR = os.path.join(MODEL_DIR, ".fold_cache")
+
+
+def _preprocess_folds(X, y, numeric_features, categorical_features, n_folds):
+    """Per fold: (X_train, y_train, X_test, y_test) with the preprocessor fit on that fold's training rows."""
+    folds = []
+    skf = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=42)
+    for train_idx, test_idx in skf.split(X, y):
+        preprocessor = build_preprocessor(numeric_features, categorical_features)
+        X_train = preprocessor.fit_transform(X.iloc[train_idx])
+        X_test = preprocessor.transform(X.iloc[test_idx])
+        if hasattr(X_train, "toarray"):
+            X_train, X_test = X_train.toarray(), X_test.toarray()
+        folds.append((
+            np.ascontiguousarray(X_train, dtype=np.float32), y.to_numpy()[train_idx],
+            np.ascontiguousarray(X_test, dtype=np.float32), y.to_numpy()[test_idx],
+        ))
+    return folds
+
+
+def sample_candidates(n_candidates, resource, seed=42):
+    """Up to `n_candidates` distinct parameter sets from PARAM_GRID (tree count excluded when it is the resource)."""
+    grid = {k: v for k, v in PARAM_GRID.items() if not (resource == "n_estimators" and k == "n_estimators")}
+    combos = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(combos), size=min(n_candidates, len(combos)), replace=False)
+    return [combos[i] for i in sorted(picks)]
+
+
+def _fit_and_score(params, fold, resource, amount, seed=42):
+    """Macro F1 of one candidate on one cached fold with `amount` of the resource, and the fit time."""
+    X_train, y_train, X_test, y_test = fold
+    if resource == "n_samples" and amount < len(y_train):
+        # Same row subset for every candidate, so a round compares like with like
+        rows = np.random.default_rng(seed).permutation(len(y_train))[:amount]
+        X_train, y_train = X_train[rows], y_train[rows]
+    if resource == "n_estimators":
+        params = {**params, "n_estimators": amount}
+    start = time.perf_counter()
+    model = RandomForestClassifier(**params, random_state=42, n_jobs=1).fit(X_train, y_train)
+    score = f1_score(y_test, model.predict(X_test), average="macro", zero_division=0)
+    return score, time.perf_counter() - start
+
+
+def _tree_count(params, resource, amount):
+    """Trees one fit of a candidate grows."""
+    return amount if resource == "n_estimators" else params.get("n_estimators", 100)
+
+
+def successive_halving(folds, candidates, resource="n_samples", min_resource=None, factor=3,
+                       budget_seconds=600.0, n_jobs=-1, deadline=None):
+    """
+    Run the halving rounds over cached `folds`.
+
+    Returns (rounds, survivors): one report dict per completed round and the
+    candidates (with scores) still in the running, best first.
+    """
+    n_train = min(len(fold[1]) for fold in folds)
+    max_resource = n_train if resource == "n_samples" else MAX_TREES
+    if min_resource is None:
+        min_resource = max(200, n_train // factor ** 3) if resource == "n_samples" else 25
+    min_resource = min(min_resource, max_resource)
+    deadline = deadline or time.monotonic() + budget_seconds
+    total_jobs, _, _ = resolve_parallelism(n_jobs, cv_jobs=1)
+
+    rounds = []
+    survivors = [{"params": params} for params in candidates]
+    amount = min_resource
+    while True:
+        trees = [_tree_count(candidate["params"], resource, amount) for candidate in survivors]
+        tree_seconds = [0.0]
+        if rounds:
+            # Estimate from the last round's cost per tree; trees take longer to grow on more rows
+            last = rounds[-1]
+            scale = amount / last["resource"] if resource == "n_samples" else 1.0
+            tree_seconds = [last["fit_seconds"] / last["trees"] * scale]
+            estimate = last["seconds"] / last["trees"] * scale * sum(trees) * len(folds)
+            if time.monotonic() + estimate > deadline:
+                print(f"WARNING: Stopping before round {len(rounds) + 1}: it would take ~{estimate:.0f}s "
+                      f"with {deadline - time.monotonic():.0f}s of budget left")
+                break
+
+        # Candidates are dispatched one at a time as workers free up, best first, and one whose fits
+        # would end past the deadline is not started. Tree counts differ, so fit time is estimated
+        # per tree, from the fits finished so far or else the last round's
+        start = time.perf_counter()
+        fold_waves = -(-len(folds) // total_jobs)
+
+        def dispatch():
+            for i, candidate in enumerate(survivors):
+                if i and time.monotonic() + tree_seconds[-1] * trees[i] * fold_waves > deadline:
+                    return
+                for fold in folds:
+                    yield delayed(_fit_and_score)(candidate["params"], fold, resource, amount)
+
+        scored, scores, fit_seconds, fit_trees = [], [], 0.0, 0
+        with threadpool_limits(limits=1):
+            for score, fit in Parallel(n_jobs=total_jobs, pre_dispatch="n_jobs", return_as="generator")(dispatch()):
+                scores.append(score)
+                fit_seconds += fit
+                fit_trees += trees[len(scored)]
+                tree_seconds.append(fit_seconds / fit_trees)
+                if len(scores) == len(folds):
+                    candidate = survivors[len(scored)]
+                    candidate.update(score=float(np.mean(scores)), score_std=float(np.std(scores)), resource=amount)
+                    scored.append(candidate)
+                    scores = []
+        seconds = time.perf_counter() - start
+
+        partial = len(scored) < len(survivors)
+        survivors = sorted(scored, key=lambda c: c["score"], reverse=True)
+        rounds.append({
+            "round": len(rounds) + 1,
+            "candidates": len(survivors),
+            "resource": amount,
+            "seconds": seconds,
+            "fit_seconds": fit_seconds,
+            "trees": fit_trees,
+            "best_score": survivors[0]["score"],
+            "best_params": survivors[0]["params"],
+            "partial": partial,
+        })
+        print(f"Round {len(rounds)}: {len(survivors):>3} candidates x {len(folds)} folds at "
+              f"{resource}={amount:<6} {seconds:7.1f}s  best macro F1 {survivors[0]['score']:.3f}")
+
+        if partial:
+            print(f"WARNING: Budget ran out during round {len(rounds)}; ranking the candidates scored so far")
+            break
+        if len(survivors) == 1 or amount >= max_resource:
+            break
+        survivors = survivors[:max(1, len(survivors) // factor)]
+        amount = min(max_resource, amount * factor)
+    return rounds, survivors
+
+
+def tune_model(budget_seconds=600.0, resource="n_samples", n_candidates=48, factor=3, n_jobs=-1, snapshot=None):
+    """
+    Search forest parameters within `budget_seconds` and write the report to TUNING_REPORT_PATH.
+
+    Returns:
+        the report dict (best parameters, score, rounds and phase timings)
+    """
+    started = time.monotonic()
+    deadline = started + budget_seconds
+    timings = {}
+
+    with _phase(timings, "load"):
+        X, y, numeric_features, categorical_features, snapshot_id = load_training_data(snapshot)
+
+    # Cached by data and feature lists, so repeated searches on one snapshot skip preprocessing
+    with _phase(timings, "preprocess_folds"):
+        memory = joblib.Memory(FOLD_CACHE_DIR, verbose=0)
+        folds = memory.cache(_preprocess_folds)(X, y, numeric_features, categorical_features, CV_FOLDS)
+
+    candidates = sample_candidates(n_candidates, resource)
+    print(f"🔧 Successive halving over {resource}: {len(candidates)} candidates, factor {factor}, "
+          f"budget {budget_seconds:.0f}s, snapshot {snapshot_id}")
+    with _phase(timings, "search"):
+        rounds, survivors = successive_halving(folds, candidates, resource=resource, factor=factor,
+                                               n_jobs=n_jobs, deadline=deadline)
+
+    best = survivors[0]
+    best_params = dict(best["params"])
+    if resource == "n_estimators":
+        best_params["n_estimators"] = best["resource"]
+    report = {
+        "best_params": best_params,
+        "best_score": best["score"],
+        "best_score_std": best["score_std"],
+        "scored_at_resource": best["resource"],
+        "resource": resource,
+        "factor": factor,
+        "snapshot": snapshot_id,
+        "budget_seconds": budget_seconds,
+        "elapsed_seconds": time.monotonic() - started,
+        "rounds": rounds,
+        "finalists": [{"params": c["params"], "score": c["score"], "score_std": c["score_std"]}
+                      for c in survivors[:5]],
+        "timings": timings,
+    }
+
+    tmp_path = f"{TUNING_REPORT_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, TUNING_REPORT_PATH)
+
+    print("\n✅ Best configuration")
+    print(f"{best_params}  macro F1 {best['score']:.3f} ± {best['score_std']:.3f} "
+          f"({resource}={best['resource']})")
+    print("\n=== Rounds ===")
+    print(pd.DataFrame(rounds)[["round", "candidates", "resource", "seconds", "fit_seconds", "best_score", "partial"]]
+          .to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print("\n=== Phase Timings ===")
+    for name, seconds in timings.items():
+        print(f"{name:<18} {seconds:8.2f}s")
+    print(f"\nReport saved to {TUNING_REPORT_PATH}; train with: python train_model.py --tuned")
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=float, default=600.0, help="Wall-clock budget in seconds")
+    parser.add_argument("--resource", choices=["n_samples", "n_estimators"], default="n_samples",
+                        help="What each halving round gives the surviving candidates more of")
+    parser.add_argument("--candidates", type=int, default=48, help="Configurations sampled from the grid")
+    parser.add_argument("--factor", type=int, default=3, help="Keep 1/factor of the candidates per round")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Cores to use (-1 = all)")
+    parser.add_argument("--snapshot", help="Feature store snapshot id to tune on (default: the latest)")
+    args = parser.parse_args()
+
+    tune_model(args.budget, args.resource, args.candidates, args.factor, args.n_jobs, args.snapshot)